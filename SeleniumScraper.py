@@ -1,91 +1,133 @@
-import json
 import os
-import re
 import time
-from typing import Optional, Dict, Any
-from urllib.parse import unquote
+from typing import Optional
 
 import requests
-import undetected_chromedriver as uc
-from selenium.common.exceptions import TimeoutException, StaleElementReferenceException
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.webdriver.support.ui import WebDriverWait
 
-SEARCH_NUMBER = "25386"
-SEARCH_TYPE = "HRB"
-SEARCH_TOWN = "alle"
+from handelsregister.egress import bind_default
+from handelsregister.engine import BACKEND_BROWSER, EngineConfig, SearchEngine, BrowserBackend
+from handelsregister.jsonl import JsonlWriter, jsonl_to_legacy
+from handelsregister.metrics import get_metrics, write_from_env
+from handelsregister.throttle import mount_throttled
+from handelsregister.utils import (
+    SEARCH_NUMBER,
+    SEARCH_TYPE,
+    SEARCH_TOWN,
+    SESSION_COOKIES_FILE,
+    filename_from_content_disposition,
+    load_session_cookies,
+)
+from handelsregister.waits import StepTimer
+
+# Wejście "przeglądarkowe": wyszukiwanie przez wspólny silnik (handelsregister.engine, backend browser)
+# + zapis wyników do result.json i pobieranie plików POST-em na cookies sesji.
 OUTPUT_JSON = "result.json"
-SESSION_COOKIES_FILE = "session_cookies.json"
 
-_captured_requests = []
 
-def build_driver() -> uc.Chrome:
-    """Konfiguracja sterownika Chrome - TYLKO do przechwytywania requestów, NIE pobiera plików."""
-    options = uc.ChromeOptions()
-    options.add_argument("--disable-blink-features=AutomationControlled")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--window-size=1280,720")
-    #options.add_argument("--headless")  # Odkomentuj dla trybu bezokienkowego
+DOWNLOAD_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Content-Type": "application/x-www-form-urlencoded",
+    "Origin": "https://www.handelsregister.de",
+    "Accept": "*/*",
+    "Accept-Language": "de-DE,de;q=0.9,en-US;q=0.8,en;q=0.7",
+}
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
 
-    driver = uc.Chrome(options=options)
 
-    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+def build_cookie_session(cookies_file: str = SESSION_COOKIES_FILE) -> Optional[requests.Session]:
+    """Tworzy sesję requests z cookies zapisanymi z sesji Selenium (None jeśli brak cookies)."""
+    cookies_list = load_session_cookies(cookies_file)
+    if not cookies_list:
+        return None
 
-    try:
-        driver.execute_cdp_cmd("Network.enable", {})
-    except Exception:
-        pass
+    session = mount_throttled(requests.Session())
+    bind_default(session)
+    # Konwertujemy cookies z formatu Selenium do formatu requests
+    for cookie in cookies_list:
+        session.cookies.set(cookie["name"], cookie["value"])
+    return session
 
-    return driver
 
-def wait_for_loading_gone(driver, timeout=10):
-    try:
-        WebDriverWait(driver, timeout).until(
-            EC.invisibility_of_element_located((By.CLASS_NAME, "ui-icon-loading"))
-        )
-        # Czasami jest też blokada całego ekranu
-        WebDriverWait(driver, timeout).until(
-            EC.invisibility_of_element_located((By.ID, "j_idt15:statusDialog"))
-        )
-    except Exception:
-        pass  # Jeśli nie znaleziono loadera, to znaczy że go nie ma, idziemy dalej
+def stream_post_download(
+    session: requests.Session,
+    post_url: str,
+    post_params: dict,
+    output_path: str = None,
+    output_dir: str = "",
+    timeout: int = 30,
+) -> tuple[int, Optional[str], int]:
+    """
+    Wykonuje POST pobierający plik i zapisuje body na dysk kawałkami (bez buforowania całości w pamięci).
+    Zapis idzie do pliku .part, który po zakończeniu jest atomowo podmieniany na docelowy.
 
+    Returns:
+        tuple: (status_code, final_path lub None, liczba zapisanych bajtów)
+    """
+    headers = dict(DOWNLOAD_HEADERS)
+    headers["Referer"] = post_url.split("?")[0]  # URL bez parametrów query
+    metrics = get_metrics()
+
+    with metrics.span("stream_post_download"), session.post(
+        post_url,
+        data=post_params,
+        headers=headers,
+        allow_redirects=True,
+        timeout=timeout,
+        stream=True,
+    ) as response:
+        if response.status_code != 200:
+            return response.status_code, None, 0
+
+        # Próbujemy wyciągnąć nazwę pliku z Content-Disposition
+        content_disposition = response.headers.get("Content-Disposition", "")
+        filename = filename_from_content_disposition(content_disposition)
+
+        # Jeśli nie mamy nazwy z Content-Disposition, używamy podanej lub generujemy
+        if not filename:
+            if output_path:
+                filename = os.path.basename(output_path)
+            else:
+                # Generujemy nazwę na podstawie timestampu
+                filename = f"download_{int(time.time() * 1000)}.xml"
 
-def save_session_cookies(driver, cookies_file: str = SESSION_COOKIES_FILE):
-    """Zapisuje cookies z aktywnej sesji Selenium do pliku JSON."""
-    try:
-        cookies = driver.get_cookies()
-        os.makedirs(os.path.dirname(cookies_file) or ".", exist_ok=True)
-        with open(cookies_file, "w", encoding="utf-8") as f:
-            json.dump(cookies, f, indent=2, ensure_ascii=False)
-        print(f"✅ Zapisano {len(cookies)} cookies do {cookies_file}")
-        return True
-    except Exception as e:
-        print(f"⚠️ Błąd przy zapisywaniu cookies: {e}")
-        return False
+        # Ustalamy pełną ścieżkę do zapisu
+        if output_path:
+            final_path = output_path
+        else:
+            # Używamy nazwy z Content-Disposition w katalogu docelowym
+            final_path = os.path.join(output_dir, os.path.basename(filename))
 
+        # Tworzymy katalog jeśli potrzeba
+        os.makedirs(os.path.dirname(final_path) or ".", exist_ok=True)
 
-def load_session_cookies(cookies_file: str = SESSION_COOKIES_FILE):
-    """Ładuje cookies z pliku JSON."""
-    try:
-        if not os.path.exists(cookies_file):
-            return []
-        with open(cookies_file, "r", encoding="utf-8") as f:
-            cookies = json.load(f)
-        return cookies if isinstance(cookies, list) else []
-    except Exception as e:
-        print(f"⚠️ Błąd przy ładowaniu cookies: {e}")
-        return []
+        # Zapisujemy plik strumieniowo
+        size = 0
+        part_path = final_path + ".part"
+        try:
+            with open(part_path, "wb") as f:
+                for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                    if chunk:
+                        f.write(chunk)
+                        size += len(chunk)
+            os.replace(part_path, final_path)
+        finally:
+            # Zerwany strumień nie zostawia niedokończonego .part
+            if os.path.exists(part_path):
+                os.remove(part_path)
+        metrics.inc("download_bytes_total", size)
+
+        if content_disposition:
+            print(f"   📄 Nazwa z Content-Disposition: {content_disposition}")
+        return response.status_code, final_path, size
 
 
 def download_file_with_post(
     post_url: str,
     post_params: dict,
     output_path: str = None,
-    cookies_file: str = SESSION_COOKIES_FILE
+    cookies_file: str = SESSION_COOKIES_FILE,
+    session: Optional[requests.Session] = None,
+    output_dir: str = "",
 ) -> tuple[bool, Optional[str]]:
     """
     Pobiera plik używając POST request z zapisanymi cookies z sesji Selenium.
@@ -95,83 +137,31 @@ def download_file_with_post(
         post_params: Słownik z parametrami POST (jak z przechwyconego requestu)
         output_path: Ścieżka do zapisania pliku (opcjonalnie - jeśli None, użyje nazwy z Content-Disposition)
         cookies_file: Plik z zapisanymi cookies (domyślnie session_cookies.json)
+        session: Współdzielona sesja requests (keep-alive); jeśli None, cookies są ładowane z cookies_file
+        output_dir: Katalog dla nazwy z Content-Disposition (gdy output_path jest None)
     
     Returns:
         tuple: (success: bool, filename: str lub None)
     """
     try:
-        cookies_list = load_session_cookies(cookies_file)
-        if not cookies_list:
-            print(f"⚠️ Brak zapisanych cookies w {cookies_file}. Najpierw uruchom scrapowanie.")
-            return False, None
-        
-        # Konwertujemy cookies z formatu Selenium do formatu requests
-        cookies_dict = {cookie["name"]: cookie["value"] for cookie in cookies_list}
-        
-        headers = {
-            "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
-            "Content-Type": "application/x-www-form-urlencoded",
-            "Referer": post_url.split("?")[0],  # URL bez parametrów query
-            "Origin": "https://www.handelsregister.de",
-            "Accept": "*/*",
-            "Accept-Language": "de-DE,de;q=0.9,en-US;q=0.8,en;q=0.7",
-        }
-        
-        # Wykonujemy POST request
-        response = requests.post(
-            post_url,
-            data=post_params,
-            cookies=cookies_dict,
-            headers=headers,
-            allow_redirects=True,
-            timeout=30
-        )
-        
-        if response.status_code == 200:
-            # Próbujemy wyciągnąć nazwę pliku z Content-Disposition
-            content_disposition = response.headers.get("Content-Disposition", "")
-            filename = None
-            
-            if content_disposition:
-                # Parsujemy: attachment;filename="SN-Chemnitz_HRB_25386+SI-20251210175648.xml"
-                filename_match = re.search(r'filename[^;=\n]*=(([\'"]).*?\2|[^;\n]*)', content_disposition)
-                if filename_match:
-                    filename = filename_match.group(1).strip('"\'')
-                    # Dekodujemy URL encoding jeśli potrzeba
-                    try:
-                        filename = unquote(filename)
-                    except:
-                        pass
-            
-            # Jeśli nie mamy nazwy z Content-Disposition, używamy podanej lub generujemy
-            if not filename:
-                if output_path:
-                    filename = os.path.basename(output_path)
-                else:
-                    # Generujemy nazwę na podstawie timestampu
-                    filename = f"download_{int(time.time())}.xml"
-            
-            # Ustalamy pełną ścieżkę do zapisu
-            if output_path:
-                final_path = output_path
-            else:
-                # Używamy nazwy z Content-Disposition w bieżącym katalogu
-                final_path = filename
-            
-            # Tworzymy katalog jeśli potrzeba
-            os.makedirs(os.path.dirname(final_path) or ".", exist_ok=True)
-            
-            # Zapisujemy plik
-            with open(final_path, "wb") as f:
-                f.write(response.content)
-            
-            print(f"✅ Pobrano plik: {final_path} ({len(response.content)} bajtów)")
-            if content_disposition:
-                print(f"   📄 Nazwa z Content-Disposition: {content_disposition}")
+        if session is None:
+            session = build_cookie_session(cookies_file)
+            if session is None:
+                print(f"⚠️ Brak zapisanych cookies w {cookies_file}. Najpierw uruchom scrapowanie.")
+                return False, None
+
+        with get_metrics().span("download_file_with_post"):
+            status_code, final_path, size = stream_post_download(
+                session, post_url, post_params, output_path=output_path, output_dir=output_dir
+            )
+
+        if status_code == 200:
+            print(f"✅ Pobrano plik: {final_path} ({size} bajtów)")
             return True, final_path
         else:
-            print(f"❌ Błąd pobierania: Status {response.status_code}")
-            if response.status_code == 440:
+            print(f"❌ Błąd pobierania: Status {status_code}")
+            if status_code == 440:
+                get_metrics().inc("session_expired_total")
                 print("⚠️ Sesja wygasła! Uruchom ponownie scrapowanie, aby odświeżyć cookies.")
             return False, None
             
@@ -180,508 +170,51 @@ def download_file_with_post(
         return False, None
 
 
-def inject_request_interceptor(driver):
-    """
-    Wstrzykuje JavaScript do przechwytywania PrimeFaces.addSubmitParam i XMLHttpRequest.
-    Przechwytuje parametry PRZED faktycznym wysłaniem requestu (podobne do Filter po stronie serwera).
-    """
-    interceptor_script = """
-    (function() {
-        window._capturedRequests = window._capturedRequests || [];
-        
-        // Przechwytujemy PrimeFaces.addSubmitParam
-        if (window.PrimeFaces && window.PrimeFaces.addSubmitParam) {
-            const originalAddSubmitParam = window.PrimeFaces.addSubmitParam;
-            window.PrimeFaces.addSubmitParam = function(formId, params) {
-                // Zapisujemy parametry przed faktycznym submitem
-                const capturedData = {
-                    formId: formId,
-                    params: params,
-                    url: window.location.href.split('#')[0],
-                    timestamp: new Date().toISOString()
-                };
-                window._capturedRequests.push(capturedData);
-                
-                // Wywołujemy oryginalną funkcję (żeby strona działała normalnie)
-                return originalAddSubmitParam.apply(this, arguments);
-            };
-        }
-        
-        const originalXHROpen = XMLHttpRequest.prototype.open;
-        const originalXHRSend = XMLHttpRequest.prototype.send;
-        
-        XMLHttpRequest.prototype.open = function(method, url, async, user, password) {
-            this._interceptedMethod = method;
-            this._interceptedUrl = url;
-            return originalXHROpen.apply(this, arguments);
-        };
-        
-        XMLHttpRequest.prototype.send = function(data) {
-            // Sprawdzamy czy to POST request do handelsregister.de
-            if (this._interceptedMethod === 'POST' && 
-                this._interceptedUrl && 
-                this._interceptedUrl.includes('handelsregister.de')) {
-                
-                // Parsujemy post data
-                let postParams = {};
-                if (data) {
-                    const params = data.split('&');
-                    for (let param of params) {
-                        if (param.includes('=')) {
-                            const [key, value] = param.split('=');
-                            try {
-                                postParams[decodeURIComponent(key)] = decodeURIComponent(value);
-                            } catch(e) {
-                                postParams[key] = value;
-                            }
-                        }
-                    }
-                }
-                
-                // Zapisujemy przechwycony request
-                const capturedRequest = {
-                    url: this._interceptedUrl,
-                    method: this._interceptedMethod,
-                    post_data: data || '',
-                    post_parameters: postParams,
-                    headers: {},
-                    timestamp: new Date().toISOString()
-                };
-                
-                window._capturedRequests.push(capturedRequest);
-                
-                this.abort();
-                return;
-            }
-            
-            return originalXHRSend.apply(this, arguments);
-        };
-        
-        if (window.fetch) {
-            const originalFetch = window.fetch;
-            window.fetch = function(url, options) {
-                if (options && options.method === 'POST' && 
-                    url && url.includes('handelsregister.de')) {
-                    
-                    // Sprawdzamy czy to request dla SI
-                    const isSIRequest = options.body && options.body.includes('Global.Dokumentart.SI');
-                    
-                    if (isSIRequest) {
-                        let postParams = {};
-                        if (options.body) {
-                            const params = options.body.split('&');
-                            for (let param of params) {
-                                if (param.includes('=')) {
-                                    const [key, value] = param.split('=');
-                                    try {
-                                        postParams[decodeURIComponent(key)] = decodeURIComponent(value);
-                                    } catch(e) {
-                                        postParams[key] = value;
-                                    }
-                                }
-                            }
-                        }
-                        
-                        const capturedRequest = {
-                            url: url,
-                            method: 'POST',
-                            post_data: options.body || '',
-                            post_parameters: postParams,
-                            headers: options.headers || {},
-                            timestamp: new Date().toISOString(),
-                            document_type: "SI"
-                        };
-                        
-                        window._capturedRequests.push(capturedRequest);
-                        
-                        // Anulujemy request
-                        return Promise.reject(new Error('Request intercepted and aborted'));
-                    }
-                }
-                
-                return originalFetch.apply(this, arguments);
-            };
-        }
-    })();
-    """
-    
-    try:
-        driver.execute_script(interceptor_script)
-    except Exception as e:
-        print(f"⚠️ Błąd przy wstrzykiwaniu interceptor: {e}")
-
-
-def get_captured_requests(driver) -> list:
-    """Pobiera przechwycone requesty z JavaScript (podobne do UrlHistory.getStore())."""
-    try:
-        captured = driver.execute_script("return window._capturedRequests || [];")
-        return captured if captured else []
-    except Exception:
-        return []
-
-
-def extract_params_from_onclick(onclick: str, link_id: str, current_url: str) -> Optional[dict]:
+def run_full_flow(
+    target_url: str,
+    search_type: str = SEARCH_TYPE,
+    search_number: str = SEARCH_NUMBER,
+    search_town: str = SEARCH_TOWN,
+    output_json: str = OUTPUT_JSON,
+    headless: bool = False,
+) -> None:
     """
-    Wyciąga parametry POST z onclick BEZ wykonywania kliknięcia.
-    NIE KLIKA - tylko parsuje JavaScript z onclick.
-    Zwraca dict z URL i parametrami POST.
+    Wyszukiwanie w przeglądarce (domyślnie z widocznym oknem) i zapis wierszy do result.jsonl / result.json.
+    Każda strona wyników trafia od razu do JSONL; legacy result.json powstaje także po awarii.
     """
+    config = EngineConfig(
+        target_url,
+        search_type,
+        search_number,
+        search_town,
+        backend=BACKEND_BROWSER,
+        headless=headless,
+        error_screenshot="error_debug.png",
+    )
+    backend = BrowserBackend(config)
+    engine = SearchEngine(config, backend, StepTimer("run_full_flow"))
+    writer = JsonlWriter(jsonl_path(output_json), index=True, truncate=True)
     try:
-        if not onclick or "PrimeFaces" not in onclick or "Global.Dokumentart.SI" not in onclick:
-            return None
-        
-        # Wyciągamy form name z onclick
-        form_match = re.search(r"submit\(['\"]([^'\"]+)['\"]\)", onclick)
-        form_name = form_match.group(1) if form_match else "ergebnissForm"
-        
-        # Budujemy słownik parametrów POST na podstawie onclick
-        post_params = {}
-        
-        # Wyciągamy wszystkie parametry z onclick (wszystkie pary key:value)
-        all_params_match = re.findall(r"'([^']+)':\s*'([^']*)'", onclick)
-        for key, value in all_params_match:
-            # Usuwamy spacje z klucza (czasami jest spacja po dwukropku)
-            key = key.strip()
-            post_params[key] = value
-        
-        # Tworzymy dict z parametrami requestu
-        return {
-            "url": current_url.split("#")[0],
-            "method": "POST",
-            "post_data": "&".join([f"{k}={v}" for k, v in post_params.items()]),
-            "post_parameters": post_params,
-            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
-            "document_type": "SI",
-        }
-        
-    except Exception as e:
-        print(f"⚠️ Błąd przy wyciąganiu parametrów z onclick: {e}")
-        return None
-
-
-def capture_request_from_onclick(driver, link_element, clear_before: bool = False) -> Optional[dict]:
-    """
-    Przechwytuje POST request wywoływany przez onclick PRZED jego faktycznym wysłaniem.
-    Używa wstrzykniętego JavaScript do przechwycenia requestu i anulowania go.
-    Zwraca dict z URL i parametrami POST.
-    """
-    global _captured_requests
-    
-    try:
-        link_id = link_element.get_attribute("id")
-        if not link_id:
-            return None
-
-        before_count = len(get_captured_requests(driver))
-
-        if clear_before:
-            driver.execute_script("window._capturedRequests = [];")
-            before_count = 0
-
-        driver.execute_script("arguments[0].click();", link_element)
-        
-        # Czekamy krótko na przechwycenie
-        time.sleep(2)
-
-        captured_list = get_captured_requests(driver)
-        new_requests = captured_list[before_count:]
-        
-        for req in new_requests:
-            if (req.get("method") == "POST" and 
-                "handelsregister.de" in req.get("url", "") and 
-                link_id in req.get("post_data", "")):
-
-                _captured_requests.append(req)
-                return req
-
-        for req in captured_list:
-            if (req.get("method") == "POST" and 
-                "handelsregister.de" in req.get("url", "") and 
-                link_id in req.get("post_data", "")):
-
-                if req not in _captured_requests:
-                    _captured_requests.append(req)
-                    return req
-        
-        return None
-        
-    except Exception as e:
-        print(f"⚠️ Błąd przy przechwytywaniu requestu: {e}")
-        return None
-
-
-def reconstruct_download_url(driver, link_element, onclick: str) -> tuple[Optional[str], Optional[dict], Optional[dict]]:
-    """
-    Wyciąga parametry POST z onclick BEZ wykonywania kliknięcia i BEZ pobierania pliku.
-    TYLKO parsuje JavaScript z onclick - NIE KLIKA!
-    Zwraca tuple: (base_url, post_params_dict, captured_request_dict)
-    """
-    try:
-        current_url = driver.current_url.split("#")[0]
-        link_id = link_element.get_attribute("id") or ""
-        
-        # Wyciągamy parametry z onclick BEZ klikania
-        captured_request = extract_params_from_onclick(onclick, link_id, current_url)
-        
-        if captured_request:
-            url = captured_request.get("url")
-            post_params = captured_request.get("post_parameters", {})
-            return url, post_params, captured_request
-        
-        return None, None, None
-        
-    except Exception as e:
-        print(f"⚠️ Błąd przy wyciąganiu parametrów z onclick: {e}")
-        return None, None, None
-
-
-def extract_link_info(link_element, driver=None) -> Dict[str, Any]:
-    """
-    Wyciąga szczegółowe informacje o linku, w tym rzeczywisty URL dla linków z href="#".
-    Dla PrimeFaces linków z onclick, próbuje wyciągnąć parametry z JavaScript.
-    Jeśli podano driver, próbuje przechwycić rzeczywisty URL do pobrania.
-    """
-    try:
-        href = link_element.get_attribute("href") or "#"
-        text = link_element.text.strip()
-        title = link_element.get_attribute("title") or ""
-        onclick = link_element.get_attribute("onclick") or ""
-        id_attr = link_element.get_attribute("id") or ""
-        
-        # Sprawdzamy różne atrybuty, które mogą zawierać URL
-        data_url = link_element.get_attribute("data-url") or link_element.get_attribute("data-href")
-        formaction = link_element.get_attribute("formaction")
-        
-        link_info = {
-            "href": href,
-            "text": text,
-            "title": title,
-            "id": id_attr,
-            "onclick": onclick[:500] if onclick else "",  # Pierwsze 500 znaków onclick
-            "data_url": data_url,
-            "formaction": formaction,
-        }
-        
-        # Jeśli href to "#", próbujemy wyciągnąć więcej informacji
-        if href == "#" or href.startswith("javascript:") or (href and "#" in href and href.endswith("#")):
-            # Dla PrimeFaces - wyciągamy ID elementu i parametry z onclick
-            if id_attr:
-                link_info["element_id"] = id_attr
-                
-            # Próbujemy wyciągnąć parametry z onclick (dla PrimeFaces)
-            if "PrimeFaces" in onclick:
-                property_match = re.search(r"'property':\s*'([^']+)'", onclick)
-                if property_match:
-                    link_info["property"] = property_match.group(1)
-
-                form_match = re.search(r"submit\(['\"]([^'\"]+)['\"]\)", onclick)
-                if form_match:
-                    link_info["form_name"] = form_match.group(1)
-
-        actual_url = href
-        if data_url:
-            actual_url = data_url
-        elif formaction:
-            actual_url = formaction
-        elif href != "#" and not href.startswith("javascript:") and not (href.endswith("#") and "#" in href):
-            actual_url = href
-
-        if driver and "PrimeFaces" in onclick and "Global.Dokumentart.SI" in onclick:
-            try:
-                base_url, post_params, captured_request = reconstruct_download_url(driver, link_element, onclick)
-                if base_url and post_params:
-                    link_info["request_url"] = base_url
-                    actual_url = base_url
-                    
-                    # Szczegółowe informacje o POST request
-                    link_info["request"] = {
-                        "method": "POST",
-                        "url": base_url,
-                        "content_type": "application/x-www-form-urlencoded",
-                        "parameters": post_params,
-                    }
-                    
-                    # Jeśli przechwyciliśmy rzeczywisty request, dodajemy szczegóły z pełnymi danymi
-                    if captured_request:
-                        link_info["captured_request"] = {
-                            "url": captured_request.get("url"),
-                            "method": captured_request.get("method"),
-                            "post_data": captured_request.get("post_data"),  # Surowy string POST data
-                            "post_parameters": captured_request.get("post_parameters"),  # Parsowane parametry
-                            "timestamp": captured_request.get("timestamp"),
-                            "document_type": captured_request.get("document_type", "SI"),
-                        }
-                    
-                    # Dodatkowo: URL z parametrami jako GET (dla informacji, choć faktycznie to POST)
-                    get_params = "&".join([f"{k}={v}" for k, v in post_params.items()])
-                    link_info["request_url_with_params"] = f"{base_url}?{get_params}"
-            except Exception as e:
-                print(f"⚠️ Błąd przy przechwytywaniu requestu dla linku {id_attr}: {e}")
-        
-        link_info["actual_url"] = actual_url
-        
-        return link_info
-        
-    except Exception as e:
-        return {
-            "href": "#",
-            "text": "",
-            "title": "",
-            "error": str(e),
-            "actual_url": "#"
-        }
-
-
-def run_full_flow(target_url: str, download_dir: str = "") -> None:
-    driver = None
-    try:
-        driver = build_driver()
-        wait = WebDriverWait(driver, 10)
-        driver.get(target_url)
-
-        inject_request_interceptor(driver)
-
-        print("NORMAL SUCHE")
-        normale_suche = wait.until(
-            EC.element_to_be_clickable((By.ID, "naviForm:normaleSucheLink"))
-        )
-        normale_suche.click()
-        wait_for_loading_gone(driver)
-
-        # 3. Wypełnianie formularza (INPUT DATA)
-        print(f"SEARCH PAGE")
-
-        # HRB #
-        register_label = wait.until(EC.element_to_be_clickable((By.ID, "form:registerArt_label")))
-        register_label.click()
-        time.sleep(1)
-        hrb_option = wait.until(EC.element_to_be_clickable((By.XPATH, f"//li[contains(text(), '{SEARCH_TYPE}')]")))
-        hrb_option.click()
-        wait_for_loading_gone(driver)
-        time.sleep(1)
-
-        # NUMBER
-        register_input = wait.until(EC.presence_of_element_located((By.ID, "form:registerNummer")))
-        register_input.clear()
-        register_input.send_keys(SEARCH_NUMBER)
-
-        # ALL #
-        register_label1 = wait.until(EC.element_to_be_clickable((By.ID, "form:registergericht_label")))
-        register_label1.click()
-        time.sleep(2)
-        town_option = wait.until(EC.element_to_be_clickable((By.XPATH, f"//ul[@id='form:registergericht_items']//li[@data-label='{SEARCH_TOWN}']")))
-        town_option.click()
-        wait_for_loading_gone(driver)
-        time.sleep(1)
-
-        # Opcjonalnie: Ustawienie 100 wyników
-        try:
-            per_page_label = driver.find_element(By.ID, "form:ergebnisseProSeite_label")
-            per_page_label.click()
-            per_page_100 = wait.until(EC.element_to_be_clickable((By.XPATH, "//li[contains(@data-label, '100')]")))
-            per_page_100.click()
-            wait_for_loading_gone(driver)
-        except Exception:
-            print("⚠️ Nie udało się zmienić liczby wyników na 100, zostawiam domyślną.")
-
-        # 4. Kliknięcie SZUKAJ
-        suche_btn = driver.find_element(By.ID, "form:btnSuche")
-        driver.execute_script("arguments[0].click();", suche_btn)
-
-        wait.until(EC.presence_of_element_located((By.ID, "ergebnissForm:selectedSuchErgebnisFormTable_data")))
-        wait_for_loading_gone(driver)
-
-        # Zapisujemy cookies z aktywnej sesji (potrzebne do późniejszego pobierania plików)
-        save_session_cookies(driver)
-
-        rows = driver.find_elements(By.XPATH, "//tbody[@id='ergebnissForm:selectedSuchErgebnisFormTable_data']/tr")
-
-        collected_links = []
-
-        for row_index, row in enumerate(rows):
-            try:
-                si_links = row.find_elements(
-                    By.XPATH, 
-                    f".//a[contains(@onclick, 'Global.Dokumentart.SI')]"
-                )
-                
-                row_data = {
-                    "row_number": row_index,
-                    "row_display": row_index + 1,
-                    "si_links": []
-                }
-
-                for link in si_links:
-                    try:
-                        onclick = link.get_attribute("onclick") or ""
-                        if "Global.Dokumentart.SI" not in onclick:
-                            continue
-
-                        # Sprawdzamy czy ID ma poprawny format z numerem wiersza
-                        link_id = link.get_attribute("id") or ""
-                        expected_id_pattern = f"ergebnissForm:selectedSuchErgebnisFormTable:{row_index}:"
-                        if expected_id_pattern not in link_id:
-                            print(f"⚠️ Wiersz {row_index}: Nieoczekiwany format ID: {link_id}")
-                            continue
-                        
-                        # Przechwytujemy request
-                        link_info = extract_link_info(link, driver)
-
-                        if link_info.get("request") or link_info.get("captured_request"):
-                            if not link_info.get("request") and link_info.get("captured_request"):
-                                captured = link_info.get("captured_request")
-                                link_info["request"] = {
-                                    "method": captured.get("method", "POST"),
-                                    "url": captured.get("url"),
-                                    "content_type": "application/x-www-form-urlencoded",
-                                    "parameters": captured.get("post_parameters", {}),
-                                }
-                            
-                            row_data["si_links"].append(link_info)
-                        else:
-                            print(f"⚠️ Wiersz {row_index}: Nie udało się przechwycić requestu dla linku SI")
-                            
-                    except Exception as e:
-                        print(f"⚠️ Błąd przy zbieraniu linku SI w wierszu {row_index}: {e}")
-                        continue
-
-                if row_data["si_links"]:
-                    collected_links.append(row_data)
-
-            except StaleElementReferenceException:
-                print(f"⚠️ Rekord {row_index}: Element wygasł (DOM odświeżony).")
-                continue
-            except Exception as e:
-                print(f"❌ Błąd przy rekordzie {row_index}: {e}")
-
-        # Zapisujemy zebrane requesty z parametrami do JSON
-        wynik = {
-            "count": len(collected_links),
-            "items": collected_links,
-        }
-        time.sleep(1)
-
-        os.makedirs(os.path.dirname(OUTPUT_JSON) or ".", exist_ok=True)
-        with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
-            json.dump(wynik, f, indent=4, ensure_ascii=False)
-
-        total_si_requests = sum(len(item.get("si_links", [])) for item in collected_links)
-        print(f"Łącznie przechwycono {total_si_requests} requestów SI z parametrami POST")
-
+        engine.run(on_page=lambda page_number, page_links: writer.write_many(page_links), raise_errors=True)
     except Exception as e:
         print(f"❌ KRYTYCZNY BŁĄD SKRYPTU: {e}")
-        # Zrzut ekranu do debugowania
-        if driver:
-            driver.save_screenshot("error_debug.png")
     finally:
-        if driver:
-            driver.quit()
+        # Legacy result.json ({"count", "items"}) z JSONL - także po awarii, z tym co zebrano
+        writer.close()
+        jsonl_to_legacy(writer.path, output_json)
+        # METRICS_FILE=metrics.prom - czasy kroków i liczniki przebiegu w formacie Prometheusa
+        write_from_env()
+
+
+def jsonl_path(output_json: str) -> str:
+    """result.json -> result.jsonl (plik przyrostowy obok legacy JSON)."""
+    return os.path.splitext(output_json)[0] + ".jsonl"
 
 
 if __name__ == "__main__":
     target_url = "https://www.handelsregister.de/"
 
-    run_full_flow(target_url, download_dir="")
+    run_full_flow(target_url)
     
     # PRZYKŁAD: Jak pobrać plik używając przechwyconych parametrów POST
     # 
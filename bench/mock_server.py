@@ -0,0 +1,466 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, Any
+from urllib.parse import parse_qs, urlparse
+
+# Lokalny zamiennik handelsregister.de do benchmarków: te same id komponentów JSF/PrimeFaces
+# (naviForm:normaleSucheLink, form:registerArt, form:btnSuche, ergebnissForm:selectedSuchErgebnisFormTable),
+# stronicowanie partial/ajax, pobieranie SI (XML z Content-Disposition) i 440 po wygaśnięciu sesji.
+# Strony mają minimalny JS (atrapa PrimeFaces), więc działa też backend przeglądarki.
+WELCOME_PATH = "/rp_web/welcome.xhtml"
+SEARCH_PATH = "/rp_web/erweitertesuche/welcome.xhtml"
+RESULTS_PATH = "/rp_web/sucheErgebnisse/welcome.xhtml"
+STATS_PATH = "/_stats"
+
+TABLE_ID = "ergebnissForm:selectedSuchErgebnisFormTable"
+SESSION_EXPIRED_STATUS = 440
+DEFAULT_ROW_COUNT = 250
+DEFAULT_PAGE_SIZE = 10
+DEFAULT_DOC_SIZE = 16 * 1024
+PAGE_SIZES = ("10", "25", "50", "100")
+REGISTER_TYPES = ("HRA", "HRB", "GnR", "PR", "VR")
+COURTS = ("alle", "Berlin (Charlottenburg)", "Chemnitz", "Dresden", "Leipzig")
+FIRST_REGISTER_NUMBER = 25386
+
+_ROW_LINK_RE = re.compile(re.escape(TABLE_ID) + r":(\d+):")
+
+PRIMEFACES_STUB = """
+<script>
+window.PrimeFaces = {
+    widgets: {},
+    addSubmitParam: function(formId, params) {
+        var form = document.getElementById(formId);
+        for (var name in params) {
+            var input = document.createElement('input');
+            input.type = 'hidden'; input.name = name; input.value = params[name];
+            form.appendChild(input);
+        }
+        return {submit: function(id) { document.getElementById(id).submit(); }};
+    },
+    cw: function(type, name, cfg) { this.widgets[cfg.id] = cfg; }
+};
+function pfMenu(id) {
+    var label = document.getElementById(id + '_label');
+    var panel = document.getElementById(id + '_panel');
+    var select = document.getElementById(id + '_input');
+    label.addEventListener('click', function() {
+        panel.style.display = panel.style.display === 'none' ? 'block' : 'none';
+    });
+    panel.querySelectorAll('li').forEach(function(li) {
+        li.addEventListener('click', function() {
+            select.value = li.getAttribute('data-value');
+            label.textContent = li.getAttribute('data-label');
+            panel.style.display = 'none';
+        });
+    });
+}
+function pfNextPage(tableId) {
+    var cfg = PrimeFaces.widgets[tableId].paginator;
+    var next = document.querySelector("[id='" + tableId + "'] .ui-paginator-next");
+    if (next.classList.contains('ui-state-disabled')) { return; }
+    var form = document.getElementById('ergebnissForm');
+    var data = new URLSearchParams(new FormData(form));
+    var first = cfg.first + cfg.rows;
+    data.set('javax.faces.partial.ajax', 'true');
+    data.set('javax.faces.source', tableId);
+    data.set(tableId + '_pagination', 'true');
+    data.set(tableId + '_first', String(first));
+    data.set(tableId + '_rows', String(cfg.rows));
+    var xhr = new XMLHttpRequest();
+    xhr.open('POST', form.action);
+    xhr.setRequestHeader('Content-Type', 'application/x-www-form-urlencoded');
+    xhr.setRequestHeader('Faces-Request', 'partial/ajax');
+    xhr.onload = function() {
+        var updates = xhr.responseXML.getElementsByTagName('update');
+        for (var i = 0; i < updates.length; i++) {
+            var id = updates[i].getAttribute('id');
+            if (id === tableId) {
+                document.getElementById(tableId + '_data').innerHTML = updates[i].textContent;
+            } else if (id.indexOf('javax.faces.ViewState') >= 0) {
+                form.querySelector("input[name='javax.faces.ViewState']").value = updates[i].textContent;
+            }
+        }
+        cfg.first = first;
+        if (first + cfg.rows >= cfg.rowCount) { next.classList.add('ui-state-disabled'); }
+    };
+    xhr.send(data.toString());
+}
+</script>
+"""
+
+
+def _page(title: str, body: str) -> str:
+    return (
+        f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{escape(title)}</title>"
+        f"{PRIMEFACES_STUB}</head><body>{body}</body></html>"
+    )
+
+
+def _view_state(session: Dict[str, Any]) -> str:
+    session["view_state"] += 1
+    return f"{session['id']}:{session['view_state']}"
+
+
+def _select_one_menu(component_id: str, options: tuple, selected: str, items_id: bool = False) -> str:
+    """selectOneMenu PrimeFaces: etykieta, ukryty <select> i panel z <li> (jak na handelsregister.de)."""
+    select_options = "".join(
+        f"<option value='{escape(o)}'{' selected' if o == selected else ''}>{escape(o)}</option>" for o in options
+    )
+    items = "".join(f"<li data-label='{escape(o)}' data-value='{escape(o)}'>{escape(o)}</li>" for o in options)
+    ul_id = f" id='{component_id}_items'" if items_id else ""
+    return (
+        f"<div id='{component_id}'>"
+        f"<label id='{component_id}_label'>{escape(selected)}</label>"
+        f"<select id='{component_id}_input' name='{component_id}_input' style='display:none'>{select_options}</select>"
+        f"<div id='{component_id}_panel' style='display:none'><ul{ul_id}>{items}</ul></div>"
+        f"</div><script>pfMenu('{component_id}');</script>"
+    )
+
+
+def row_html(index: int) -> str:
+    """Wiersz tabeli wyników z linkiem SI (onclick PrimeFaces.addSubmitParam, data-ri = globalny indeks)."""
+    number = FIRST_REGISTER_NUMBER + index
+    link_id = f"{TABLE_ID}:{index}:j_idt161:4:fade_"
+    onclick = (
+        f"PrimeFaces.addSubmitParam('ergebnissForm',{{'{link_id}':'{link_id}',"
+        f"'property':'Global.Dokumentart.SI'}}).submit('ergebnissForm');return false;"
+    )
+    return (
+        f"<tr data-ri='{index}' class='ui-widget-content'>"
+        f"<td>Beispiel {index} GmbH</td><td>Chemnitz</td><td>Amtsgericht Chemnitz HRB {number}</td>"
+        f"<td>aktuell</td><td><a id='{link_id}' href='#' onclick=\"{onclick}\"><span>SI</span></a></td></tr>"
+    )
+
+
+def si_document(index: int, size: int) -> bytes:
+    """Dokument SI (XJustiz) dopełniony komentarzem do zadanego rozmiaru."""
+    number = FIRST_REGISTER_NUMBER + index
+    xml = (
+        "<?xml version='1.0' encoding='UTF-8'?>"
+        "<tns:nachricht.reg.0400003 xmlns:tns='http://www.xjustiz.de'>"
+        f"<tns:grunddaten><tns:registernummer>HRB {number}</tns:registernummer>"
+        f"<tns:bezeichnung>Beispiel {index} GmbH</tns:bezeichnung></tns:grunddaten>"
+    )
+    closing = "</tns:nachricht.reg.0400003>"
+    padding = max(0, size - len(xml) - len(closing) - len("<!---->"))
+    return (xml + "<!--" + "x" * padding + "-->" + closing).encode("utf-8")
+
+
+class MockHandelsregister:
+    """
+    Serwer testowy w wątku w tle. Sesja = cookie JSESSIONID; wygasa po session_ttl sekundach bezczynności
+    albo (expire_every > 0) co expire_every pobrań SI - wtedy odpowiedzią jest 440, jak na prawdziwej stronie.
+    latency / jitter - sztuczne opóźnienie każdej odpowiedzi (sekundy).
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        row_count: int = DEFAULT_ROW_COUNT,
+        doc_size: int = DEFAULT_DOC_SIZE,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        session_ttl: float = 0.0,
+        expire_every: int = 0,
+    ):
+        self.row_count = row_count
+        self.doc_size = doc_size
+        self.latency = latency
+        self.jitter = jitter
+        self.session_ttl = session_ttl
+        self.expire_every = expire_every
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+        self.counts = {"welcome": 0, "search_form": 0, "search": 0, "results": 0, "page": 0, "si": 0, "expired": 0}
+        self._lock = threading.Lock()
+        self._documents: Dict[int, bytes] = {}
+
+        server = self
+
+        class Handler(MockHandler):
+            mock = server
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self) -> "MockHandelsregister":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def count(self, name: str):
+        with self._lock:
+            self.counts[name] += 1
+
+    def new_session(self) -> Dict[str, Any]:
+        session = {
+            "id": uuid.uuid4().hex,
+            "last_seen": time.monotonic(),
+            "view_state": 0,
+            "cid": 0,
+            "page_size": DEFAULT_PAGE_SIZE,
+            "query": {},
+            "downloads": 0,
+        }
+        with self._lock:
+            self.sessions[session["id"]] = session
+        return session
+
+    def get_session(self, session_id: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Aktywna sesja albo None (nieznana / wygasła - wygasła jest usuwana)."""
+        with self._lock:
+            session = self.sessions.get(session_id or "")
+            if session is None:
+                return None
+            now = time.monotonic()
+            if self.session_ttl and now - session["last_seen"] > self.session_ttl:
+                del self.sessions[session["id"]]
+                self.counts["expired"] += 1
+                return None
+            session["last_seen"] = now
+            return session
+
+    def expire(self, session: Dict[str, Any]):
+        with self._lock:
+            self.sessions.pop(session["id"], None)
+            self.counts["expired"] += 1
+
+    def document(self, index: int) -> bytes:
+        document = self._documents.get(index)
+        if document is None:
+            document = self._documents[index] = si_document(index, self.doc_size)
+        return document
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self.counts, sessions=len(self.sessions))
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    mock: MockHandelsregister = None
+
+    def log_message(self, format, *args):
+        pass
+
+    # --- pomocnicze ---
+
+    def _delay(self):
+        delay = self.mock.latency + (random.uniform(0, self.mock.jitter) if self.mock.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+
+    def _session_id(self) -> Optional[str]:
+        for part in (self.headers.get("Cookie") or "").split(";"):
+            name, _, value = part.strip().partition("=")
+            if name == "JSESSIONID":
+                return value
+        return None
+
+    def _send(self, status: int, body: bytes = b"", content_type: str = "text/html; charset=utf-8", headers: Optional[Dict[str, str]] = None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def _redirect(self, location: str, headers: Optional[Dict[str, str]] = None):
+        self._send(302, headers=dict(headers or {}, Location=location))
+
+    def _expired(self):
+        self._send(SESSION_EXPIRED_STATUS, b"Session expired")
+
+    def _form(self) -> Dict[str, str]:
+        length = int(self.headers.get("Content-Length") or 0)
+        data = self.rfile.read(length).decode("utf-8") if length else ""
+        return {key: values[-1] for key, values in parse_qs(data, keep_blank_values=True).items()}
+
+    # --- routing ---
+
+    def do_GET(self):
+        self._delay()
+        path = urlparse(self.path).path
+        if path in ("/", "/rp_web/", "/rp_web"):
+            return self._redirect(WELCOME_PATH)
+        if path == WELCOME_PATH:
+            return self._welcome()
+        if path == RESULTS_PATH:
+            session = self.mock.get_session(self._session_id())
+            return self._results(session) if session is not None else self._expired()
+        if path == STATS_PATH:
+            return self._send(200, json.dumps(self.mock.stats()).encode("utf-8"), "application/json")
+        self._send(404, b"Not found")
+
+    def do_POST(self):
+        self._delay()
+        path = urlparse(self.path).path
+        form = self._form()
+        session = self.mock.get_session(self._session_id())
+        if session is None:
+            return self._expired()
+        if path == WELCOME_PATH:
+            return self._search_form(session)
+        if path == SEARCH_PATH:
+            return self._search(session, form)
+        if path == RESULTS_PATH:
+            if form.get("javax.faces.partial.ajax") == "true":
+                return self._results_page(session, form)
+            return self._si_download(session, form)
+        self._send(404, b"Not found")
+
+    # --- strony ---
+
+    def _welcome(self):
+        session = self.mock.get_session(self._session_id())
+        headers = {}
+        if session is None:
+            session = self.mock.new_session()
+            headers["Set-Cookie"] = f"JSESSIONID={session['id']}; Path=/; HttpOnly"
+        self.mock.count("welcome")
+        onclick = (
+            "PrimeFaces.addSubmitParam('naviForm',{'naviForm:normaleSucheLink':'naviForm:normaleSucheLink'})"
+            ".submit('naviForm');return false;"
+        )
+        body = (
+            f"<form id='naviForm' name='naviForm' method='post' action='{WELCOME_PATH}'>"
+            f"<input type='hidden' name='naviForm' value='naviForm'>"
+            f"<a id='naviForm:normaleSucheLink' href='#' onclick=\"{onclick}\">Normale Suche</a>"
+            f"<input type='hidden' name='javax.faces.ViewState' value='{_view_state(session)}'>"
+            f"</form>"
+        )
+        self._send(200, _page("Handelsregister", body).encode("utf-8"), headers=headers)
+
+    def _search_form(self, session: Dict[str, Any]):
+        self.mock.count("search_form")
+        body = (
+            f"<form id='form' name='form' method='post' action='{SEARCH_PATH}'>"
+            f"<input type='hidden' name='form' value='form'>"
+            f"{_select_one_menu('form:registerArt', REGISTER_TYPES, REGISTER_TYPES[0])}"
+            f"<input id='form:registerNummer' name='form:registerNummer' type='text' value=''>"
+            f"{_select_one_menu('form:registergericht', COURTS, COURTS[0], items_id=True)}"
+            f"{_select_one_menu('form:ergebnisseProSeite', PAGE_SIZES, PAGE_SIZES[0])}"
+            f"<button id='form:btnSuche' name='form:btnSuche' type='submit'>Suchen</button>"
+            f"<input type='hidden' name='javax.faces.ViewState' value='{_view_state(session)}'>"
+            f"</form>"
+        )
+        self._send(200, _page("Normale Suche", body).encode("utf-8"))
+
+    def _search(self, session: Dict[str, Any], form: Dict[str, str]):
+        self.mock.count("search")
+        page_size = form.get("form:ergebnisseProSeite_input") or str(DEFAULT_PAGE_SIZE)
+        session["page_size"] = int(page_size) if page_size.isdigit() else DEFAULT_PAGE_SIZE
+        session["query"] = {
+            "register_type": form.get("form:registerArt_input"),
+            "register_number": form.get("form:registerNummer"),
+            "court": form.get("form:registergericht_input"),
+        }
+        session["cid"] += 1
+        self._redirect(f"{RESULTS_PATH}?cid={session['cid']}")
+
+    def _results(self, session: Dict[str, Any]):
+        self.mock.count("results")
+        rows = min(session["page_size"], self.mock.row_count)
+        disabled = " ui-state-disabled" if rows >= self.mock.row_count else ""
+        action = f"{RESULTS_PATH}?cid={session['cid']}"
+        tbody = "".join(row_html(index) for index in range(rows))
+        body = (
+            f"<form id='ergebnissForm' name='ergebnissForm' method='post' action='{action}'>"
+            f"<input type='hidden' name='ergebnissForm' value='ergebnissForm'>"
+            f"<div id='{TABLE_ID}' class='ui-datatable'>"
+            f"<table><tbody id='{TABLE_ID}_data'>{tbody}</tbody></table>"
+            f"<div class='ui-paginator'><a href='#' class='ui-paginator-next{disabled}' "
+            f"onclick=\"pfNextPage('{TABLE_ID}');return false;\">Weiter</a></div></div>"
+            f"<input type='hidden' name='javax.faces.ViewState' value='{_view_state(session)}'>"
+            f"</form>"
+            f"<script>PrimeFaces.cw(\"DataTable\",\"widget_ergebnissForm_selectedSuchErgebnisFormTable\","
+            f"{{id:\"{TABLE_ID}\",paginator:{{rows:{rows},rowCount:{self.mock.row_count},first:0}}}});</script>"
+        )
+        self._send(200, _page("Suchergebnisse", body).encode("utf-8"))
+
+    def _results_page(self, session: Dict[str, Any], form: Dict[str, str]):
+        """Odpowiedź partial/ajax stronicowania: <update> tabeli (CDATA z wierszami) + nowy ViewState."""
+        self.mock.count("page")
+        try:
+            first = int(form.get(f"{TABLE_ID}_first") or 0)
+            rows = int(form.get(f"{TABLE_ID}_rows") or session["page_size"])
+        except ValueError:
+            return self._send(400, b"Bad paging request")
+        tbody = "".join(row_html(index) for index in range(first, min(first + rows, self.mock.row_count)))
+        body = (
+            "<?xml version='1.0' encoding='UTF-8'?><partial-response><changes>"
+            f"<update id='{TABLE_ID}'><![CDATA[{tbody}]]></update>"
+            f"<update id='j_id1:javax.faces.ViewState:0'><![CDATA[{_view_state(session)}]]></update>"
+            "</changes></partial-response>"
+        )
+        self._send(200, body.encode("utf-8"), "text/xml; charset=utf-8")
+
+    def _si_download(self, session: Dict[str, Any], form: Dict[str, str]):
+        if form.get("property") != "Global.Dokumentart.SI":
+            return self._send(400, b"Unsupported document type")
+        match = next((m for m in map(_ROW_LINK_RE.match, form) if m), None)
+        if match is None or int(match.group(1)) >= self.mock.row_count:
+            return self._send(404, b"Unknown row")
+
+        session["downloads"] += 1
+        if self.mock.expire_every and session["downloads"] > self.mock.expire_every:
+            self.mock.expire(session)
+            return self._expired()
+
+        self.mock.count("si")
+        index = int(match.group(1))
+        file_name = f"SN-Chemnitz_HRB_{FIRST_REGISTER_NUMBER + index}+SI-20251210175648.xml"
+        self._send(
+            200,
+            self.mock.document(index),
+            "application/xml",
+            headers={"Content-Disposition": f'attachment;filename="{file_name}"'},
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Lokalny zamiennik handelsregister.de (benchmarki, debugowanie)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROW_COUNT, help="Liczba wyników wyszukiwania")
+    parser.add_argument("--doc-size", type=int, default=DEFAULT_DOC_SIZE, help="Rozmiar dokumentu SI (bajty)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Opóźnienie każdej odpowiedzi (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Losowe dodatkowe opóźnienie do (s)")
+    parser.add_argument("--session-ttl", type=float, default=0.0, help="Wygaśnięcie sesji po bezczynności (s)")
+    parser.add_argument("--expire-every", type=int, default=0, help="440 co N pobrań SI w sesji")
+    args = parser.parse_args()
+
+    mock = MockHandelsregister(
+        args.host,
+        args.port,
+        row_count=args.rows,
+        doc_size=args.doc_size,
+        latency=args.latency,
+        jitter=args.jitter,
+        session_ttl=args.session_ttl,
+        expire_every=args.expire_every,
+    )
+    print(f"🧪 Mock handelsregister: {mock.url} (wyników: {args.rows})")
+    try:
+        mock.httpd.serve_forever()
+    except KeyboardInterrupt:
+        mock.stop()
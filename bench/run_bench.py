@@ -0,0 +1,291 @@
+import argparse
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, Callable, List
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from bench.mock_server import DEFAULT_DOC_SIZE, DEFAULT_ROW_COUNT, FIRST_REGISTER_NUMBER, MockHandelsregister
+
+# Benchmark end-to-end na lokalnym zamienniku handelsregister.de (bench/mock_server.py):
+# wyszukiwanie HTTP (run_http_search), przeglądarka (run_etap1_scrape), wyszukiwanie + pobieranie SI
+# (download_files.search_and_download) i spider Scrapy. Raport: zapytania/s, dokumenty SI/s,
+# latencja p50/p99 i szczytowe RSS (z przebiegiem w czasie) - do porównywania zmian wydajności.
+SCENARIOS = ("http", "download", "spider", "browser")
+DEFAULT_SCENARIOS = "http,download,spider"
+DEFAULT_QUERIES = 5
+DEFAULT_WORKERS = 4
+# Tempo limitera na czas benchmarku - wysokie, żeby mierzyć kod, a nie dławienie
+DEFAULT_BENCH_RATE = 1000.0
+RSS_SAMPLE_INTERVAL = 0.1
+DEFAULT_RESULTS_DIR = os.path.join(REPO_ROOT, "bench", "results")
+
+
+def read_rss_mb(pid: Optional[int] = None) -> Optional[float]:
+    """Bieżące RSS procesu w MB z /proc/<pid>/status (Linux); None, gdy niedostępne."""
+    try:
+        with open(f"/proc/{pid or os.getpid()}/status", "r", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+class RssSampler:
+    """Próbkuje RSS procesu (domyślnie bieżącego) w wątku w tle: przebieg [(t, MB)] i szczyt."""
+
+    def __init__(self, pid: Optional[int] = None, interval: float = RSS_SAMPLE_INTERVAL):
+        self.pid = pid
+        self.interval = interval
+        self.timeline: List[tuple] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._started = 0.0
+
+    def _run(self):
+        while not self._stop.is_set():
+            rss = read_rss_mb(self.pid)
+            if rss is not None:
+                self.timeline.append((round(time.monotonic() - self._started, 2), round(rss, 1)))
+            self._stop.wait(self.interval)
+
+    def __enter__(self) -> "RssSampler":
+        self._started = time.monotonic()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    @property
+    def peak(self) -> Optional[float]:
+        return max((rss for _, rss in self.timeline), default=None)
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Percentyl metodą najbliższej rangi (q w [0, 100])."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, -(-len(ordered) * q // 100))
+    return round(ordered[int(rank) - 1], 4)
+
+
+def summarize(name: str, elapsed: float, queries: int, docs: int, latencies: List[float], sampler: RssSampler, **extra) -> Dict[str, Any]:
+    return dict(
+        {
+            "scenario": name,
+            "queries": queries,
+            "docs": docs,
+            "elapsed": round(elapsed, 3),
+            "queries_per_s": round(queries / elapsed, 3) if elapsed else None,
+            "docs_per_s": round(docs / elapsed, 3) if elapsed else None,
+            "latency_p50": percentile(latencies, 50),
+            "latency_p99": percentile(latencies, 99),
+            "peak_rss_mb": sampler.peak,
+            "rss_timeline": sampler.timeline,
+        },
+        **extra,
+    )
+
+
+@contextlib.contextmanager
+def quiet(enabled: bool):
+    """Wycisza print() scrapera na czas pomiaru (setki linii na zapytanie zaburzają wynik)."""
+    if not enabled:
+        yield
+        return
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def bench_http(target_url: str, args) -> Dict[str, Any]:
+    """Same wyszukiwania HTTP (wszystkie strony wyników), workers zapytań równolegle."""
+    from handelsregister.engine import run_http_search
+
+    latencies = []
+    rows = []
+
+    def _query(i: int):
+        started = time.monotonic()
+        links = run_http_search(
+            target_url,
+            search_number=str(FIRST_REGISTER_NUMBER + i),
+            cookies_file=f"cookies_http_{i}.json",
+        )
+        latencies.append(time.monotonic() - started)
+        rows.append(len(links))
+
+    with RssSampler() as sampler, quiet(not args.verbose):
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            list(executor.map(_query, range(args.queries)))
+        elapsed = time.monotonic() - started
+    return summarize("http", elapsed, args.queries, 0, latencies, sampler, rows=sum(rows))
+
+
+def bench_browser(target_url: str, args) -> Dict[str, Any]:
+    """Wyszukiwania w przeglądarce (Chrome) po kolei - każde z nowym driverem, jak run_etap1_scrape."""
+    from handelsregister.engine import run_etap1_scrape
+
+    latencies = []
+    rows = 0
+    with RssSampler() as sampler, quiet(not args.verbose):
+        started = time.monotonic()
+        for i in range(args.queries):
+            query_started = time.monotonic()
+            rows += len(run_etap1_scrape(
+                target_url,
+                cookies_file=f"cookies_browser_{i}.json",
+                search_number=str(FIRST_REGISTER_NUMBER + i),
+                raise_errors=True,
+            ))
+            latencies.append(time.monotonic() - query_started)
+        elapsed = time.monotonic() - started
+    # RSS procesów Chrome nie jest tu wliczane - tylko proces Pythona
+    return summarize("browser", elapsed, args.queries, 0, latencies, sampler, rows=rows)
+
+
+def bench_download(target_url: str, args) -> Dict[str, Any]:
+    """Wyszukiwanie + pobieranie SI w trakcie stronicowania (download_files.search_and_download)."""
+    from download_files import search_and_download
+
+    latencies = []
+    docs = 0
+    with RssSampler() as sampler, quiet(not args.verbose):
+        started = time.monotonic()
+        for i in range(args.queries):
+            statuses = search_and_download(
+                target_url,
+                output_dir=os.path.join("docs", f"query_{i}"),
+                workers=args.workers,
+                cookies_file=f"cookies_download_{i}.json",
+                query={"search_type": "HRB", "search_number": str(FIRST_REGISTER_NUMBER + i), "search_town": "alle"},
+            )
+            docs += sum(1 for status in statuses if status["status"] == 200)
+            latencies.extend(status["elapsed"] for status in statuses if status["status"] == 200)
+        elapsed = time.monotonic() - started
+    return summarize("download", elapsed, args.queries, docs, latencies, sampler)
+
+
+def bench_spider(target_url: str, args) -> Dict[str, Any]:
+    """HandelsSpider (tryb scrapy) w osobnym procesie; RSS próbkowane dla procesu potomnego."""
+    output_path = os.path.abspath("spider_result.json")
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join(filter(None, [REPO_ROOT, os.environ.get("PYTHONPATH")])),
+        DOWNLOAD_CACHE_DIR="",
+        STORAGE_URI=os.path.abspath("spider.db"),
+    )
+    command = [sys.executable, "-m", "bench.spider_runner", target_url, "spider_docs", output_path, str(args.workers)]
+    started = time.monotonic()
+    with open(os.devnull, "w") as devnull:
+        child = subprocess.Popen(command, env=env, stdout=None if args.verbose else devnull)
+        with RssSampler(child.pid) as sampler:
+            child.wait()
+    elapsed = time.monotonic() - started
+    if child.returncode != 0:
+        raise RuntimeError(f"spider_runner zakończył się kodem {child.returncode}")
+
+    with open(output_path, "r", encoding="utf-8") as f:
+        result = json.load(f)
+    # Jedno zapytanie na przebieg (spider ma stałe zapytanie) - czas z procesem (start Pythona + Scrapy)
+    return summarize("spider", elapsed, 1, result["docs"], result["latencies"], sampler, rows=result["rows"])
+
+
+BENCHMARKS: Dict[str, Callable[[str, Any], Dict[str, Any]]] = {
+    "http": bench_http,
+    "download": bench_download,
+    "spider": bench_spider,
+    "browser": bench_browser,
+}
+
+
+def print_report(results: List[Dict[str, Any]]):
+    header = f"{'scenariusz':<10} {'zapytania/s':>12} {'SI/s':>10} {'p50 [s]':>9} {'p99 [s]':>9} {'RSS [MB]':>9}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        if result.get("error"):
+            print(f"{result['scenario']:<10} ❌ {result['error']}")
+            continue
+        print(
+            f"{result['scenario']:<10} {result['queries_per_s'] or 0:>12.2f} {result['docs_per_s'] or 0:>10.2f} "
+            f"{result['latency_p50'] or 0:>9.3f} {result['latency_p99'] or 0:>9.3f} {result['peak_rss_mb'] or 0:>9.1f}"
+        )
+
+
+def run_benchmarks(args) -> List[Dict[str, Any]]:
+    from handelsregister.throttle import get_limiter
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(BENCHMARKS)
+    if unknown:
+        raise ValueError(f"Nieznane scenariusze: {', '.join(sorted(unknown))}, dostępne: {', '.join(SCENARIOS)}")
+
+    get_limiter().configure(rate=args.rate, max_rate=args.rate)
+    mock = MockHandelsregister(
+        row_count=args.rows,
+        doc_size=args.doc_size,
+        latency=args.latency,
+        jitter=args.jitter,
+        expire_every=args.expire_every,
+    ).start()
+    print(f"🧪 Mock handelsregister: {mock.url} (wyników: {args.rows}, opóźnienie: {args.latency} s)")
+
+    # Pliki cookies, wyniki i dokumenty trafiają do katalogu tymczasowego, nie do repozytorium
+    workdir = tempfile.mkdtemp(prefix="handelsregister-bench-")
+    previous_cwd = os.getcwd()
+    os.chdir(workdir)
+    results = []
+    try:
+        for name in scenarios:
+            print(f"▶️ {name}...")
+            try:
+                result = BENCHMARKS[name](mock.url, args)
+            except Exception as e:
+                result = {"scenario": name, "error": str(e)}
+            result["server"] = mock.stats()
+            results.append(result)
+    finally:
+        os.chdir(previous_cwd)
+        mock.stop()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark scrapera na lokalnym zamienniku handelsregister.de")
+    parser.add_argument("--scenarios", default=DEFAULT_SCENARIOS, help=f"Lista po przecinku: {', '.join(SCENARIOS)}")
+    parser.add_argument("-q", "--queries", type=int, default=DEFAULT_QUERIES, help="Liczba zapytań na scenariusz")
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROW_COUNT, help="Wyników na zapytanie")
+    parser.add_argument("--doc-size", type=int, default=DEFAULT_DOC_SIZE, help="Rozmiar dokumentu SI (bajty)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Opóźnienie serwera na odpowiedź (s)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Losowe dodatkowe opóźnienie do (s)")
+    parser.add_argument("--expire-every", type=int, default=0, help="440 co N pobrań SI w sesji")
+    parser.add_argument("--rate", type=float, default=DEFAULT_BENCH_RATE, help="Tempo limitera (żądań/s)")
+    parser.add_argument("-o", "--output", default=None, help="Plik JSON z wynikami (domyślnie bench/results/<czas>.json)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Nie wyciszaj logów scrapera")
+    args = parser.parse_args()
+
+    bench_results = run_benchmarks(args)
+    print_report(bench_results)
+
+    output = args.output or os.path.join(DEFAULT_RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump({"args": vars(args), "results": bench_results}, f, indent=2, ensure_ascii=False)
+    print(f"📄 Wyniki: {output}")
@@ -0,0 +1,58 @@
+import json
+import sys
+import time
+
+from scrapy import signals
+from scrapy.crawler import CrawlerProcess
+from scrapy.settings import Settings
+
+from handelsregister.items import DocumentItem, HandelsItem
+from handelsregister.spiders.handels_spider import HandelsSpider
+
+# Jeden przebieg HandelsSpider (tryb scrapy) w osobnym procesie - reaktora Twisted nie da się uruchomić
+# ponownie, a osobny proces daje czysty pomiar RSS. Wynik (liczniki, latencje SI, statystyki) trafia do JSON.
+# Użycie: python -m bench.spider_runner <target_url> <download_dir> <wynik.json> [concurrency]
+DEFAULT_CONCURRENCY = 8
+
+
+def run(target_url: str, download_dir: str, output_path: str, concurrency: int = DEFAULT_CONCURRENCY):
+    settings = Settings()
+    settings.setmodule("handelsregister.settings", priority="project")
+    # Benchmark mierzy kod, nie uprzejmość wobec serwera - bez AutoThrottle i opóźnień
+    settings.update({
+        "AUTOTHROTTLE_ENABLED": False,
+        "DOWNLOAD_DELAY": 0,
+        "CONCURRENT_REQUESTS": concurrency,
+        "CONCURRENT_REQUESTS_PER_DOMAIN": concurrency,
+        "LOG_LEVEL": "WARNING",
+    }, priority="cmdline")
+
+    result = {"rows": 0, "docs": 0, "latencies": []}
+
+    def _on_response(response, request, spider):
+        if getattr(request.callback, "__name__", "") == "parse_document" and response.status == 200:
+            result["latencies"].append(response.meta.get("download_latency", 0.0))
+
+    def _on_item(item, response, spider):
+        if isinstance(item, DocumentItem):
+            result["docs"] += 1
+        elif isinstance(item, HandelsItem):
+            result["rows"] += 1
+
+    process = CrawlerProcess(settings, install_root_handler=False)
+    crawler = process.create_crawler(HandelsSpider)
+    crawler.signals.connect(_on_response, signal=signals.response_received)
+    crawler.signals.connect(_on_item, signal=signals.item_scraped)
+
+    started = time.monotonic()
+    process.crawl(crawler, target_url=target_url, download_dir=download_dir, mode="scrapy")
+    process.start()
+    result["elapsed"] = time.monotonic() - started
+    result["stats"] = {key: str(value) for key, value in crawler.stats.get_stats().items()}
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False)
+
+
+if __name__ == "__main__":
+    run(sys.argv[1], sys.argv[2], sys.argv[3], int(sys.argv[4]) if len(sys.argv) > 4 else DEFAULT_CONCURRENCY)
@@ -0,0 +1,673 @@
+import argparse
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Optional
+
+import requests
+
+from SeleniumScraper import (
+    OUTPUT_JSON,
+    SESSION_COOKIES_FILE,
+    load_session_cookies,
+    stream_post_download,
+)
+from handelsregister.crawl_state import DEFAULT_STATE_PATH, CrawlState, query_key
+from handelsregister.download_cache import DEFAULT_CACHE_DIR, DEFAULT_TTL, DownloadCache, key_from_columns
+from handelsregister.engine import DEFAULT_SYNTHESIZE, run_etap1_scrape, run_http_search
+from handelsregister.http_search import build_http_session
+from handelsregister.jsonl import iter_jsonl
+from handelsregister.egress import bind_default, get_egress_pool
+from handelsregister.metrics import METRICS_FILE_ENV, get_metrics, serve_prometheus
+from handelsregister.session_snapshot import SNAPSHOT_FILE_ENV, warm_start
+from handelsregister.throttle import THROTTLE_STATUSES, get_limiter, mount_throttled, session_started
+from handelsregister.utils import SEARCH_NUMBER, SEARCH_TYPE, SEARCH_TOWN
+
+# Pobieranie wszystkich plików SI z result.json / results/items.json równolegle,
+# na jednej współdzielonej sesji keep-alive (cookies z sesji Selenium).
+DEFAULT_WORKERS = 4
+DEFAULT_OUTPUT_DIR = "plikiXML"
+SCRAPY_OUTPUT_JSON = os.path.join("results", "items.json")
+DEFAULT_TARGET_URL = "https://www.handelsregister.de/"
+SESSION_EXPIRED_STATUS = 440
+# Ile nieudanych odnowień sesji z rzędu (udane zerują licznik) - potem kolejka pobrań kończy się od razu
+MAX_FAILED_REFRESHES = 3
+# Przejściowe odpowiedzi (blokada / przeciążenie) ponawiamy - limiter sam odczeka backoff przed kolejną próbą
+RETRY_STATUSES = (THROTTLE_STATUSES - {SESSION_EXPIRED_STATUS}) | {502, 504}
+MAX_DOWNLOAD_RETRIES = 3
+DEFAULT_QUERY = {"search_type": SEARCH_TYPE, "search_number": SEARCH_NUMBER, "search_town": SEARCH_TOWN}
+
+
+def build_download_session(cookies_file: str = SESSION_COOKIES_FILE, pool_size: int = DEFAULT_WORKERS) -> Optional[requests.Session]:
+    """
+    Tworzy jedną sesję requests z pulą połączeń (keep-alive) dla wszystkich workerów.
+    Cookies ładowane są z pliku RAZ, a nie przy każdym pobraniu.
+    """
+    cookies_list = load_session_cookies(cookies_file)
+    if not cookies_list:
+        return None
+
+    session = mount_throttled(requests.Session(), pool_connections=1, pool_maxsize=pool_size)
+    # To samo wyjście co przeglądarka / wyszukiwanie, z którego pochodzą cookies
+    bind_default(session)
+    # Cookies świeżego wyszukiwania (np. z przeglądarki, która zna tylko limiter procesu) - nowa generacja
+    # także w limiterze wyjścia, inaczej jego pierwsze 440 z poprzedniej sesji blokowałoby kolejne
+    session_started(session)
+    for cookie in cookies_list:
+        session.cookies.set(cookie["name"], cookie["value"])
+    return session
+
+
+def iter_si_requests(result_path: str) -> list:
+    """
+    Wyciąga z result.json / results/items.json (lub ich wersji .jsonl) listę requestów SI do pobrania.
+    Każdy element: {"row_number", "link_id", "url", "parameters"}.
+    """
+    if result_path.endswith(".jsonl"):
+        # Przyrostowy zapis (np. po przerwanym scrapowaniu) - jeden wiersz wyników na linię
+        return si_requests_from_links(list(iter_jsonl(result_path)))
+
+    with open(result_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    items = data.get("items", []) if isinstance(data, dict) else data
+    return si_requests_from_links(items)
+
+
+def si_requests_from_links(items: list) -> list:
+    """Zamienia collected_links (wiersze z si_links) na płaską listę requestów SI."""
+    si_requests = []
+    for item in items:
+        for link in item.get("si_links", []):
+            request = link.get("request") or {}
+            url = request.get("url") or link.get("request_url")
+            # captured_request - tylko w plikach wynikowych zapisanych przed onclick_parser
+            parameters = request.get("parameters") or (link.get("captured_request") or {}).get("post_parameters")
+            if not url or not parameters:
+                continue
+            si_requests.append({
+                "row_number": item.get("row_number"),
+                "link_id": link.get("id"),
+                "url": url,
+                "parameters": parameters,
+                # (sąd, rejestr, numer, typ dokumentu) z kolumn wiersza - klucz DownloadCache
+                "cache_key": key_from_columns(item.get("columns")),
+            })
+    return si_requests
+
+
+def is_session_expired(error: Exception) -> bool:
+    """Czy błąd to HTTP 440 (wygasła sesja JSF), np. z raise_for_status przy stronicowaniu."""
+    response = getattr(error, "response", None)
+    return isinstance(error, requests.HTTPError) and response is not None and response.status_code == SESSION_EXPIRED_STATUS
+
+
+class SessionRefresher:
+    """
+    Współdzielona sesja pobierania z automatycznym odnowieniem po 440 (wygasła sesja).
+    Odnowienie: najpierw replay wyszukiwania po HTTP (tanio), przeglądarka tylko jako fallback.
+    Ponowne wyszukiwanie daje świeże indeksy wierszy/cid - kolejkowane requesty są do nich mapowane po link_id.
+    """
+
+    def __init__(
+        self,
+        session: Optional[requests.Session],
+        target_url: str = DEFAULT_TARGET_URL,
+        cookies_file: str = SESSION_COOKIES_FILE,
+        pool_size: int = DEFAULT_WORKERS,
+        query: Optional[dict] = None,
+        max_failed_refreshes: int = MAX_FAILED_REFRESHES,
+        synthesize: bool = True,
+    ):
+        self.session = session
+        self.target_url = target_url
+        self.cookies_file = cookies_file
+        self.pool_size = pool_size
+        self.query = query or DEFAULT_QUERY
+        self.max_failed_refreshes = max_failed_refreshes
+        # Replay wyszukiwania z syntezą requestów SI: strona 1 + szablon zamiast ponownego przejścia
+        # wszystkich stron przy każdym 440 (bez zgodnego szablonu silnik sam wraca do stronicowania)
+        self.synthesize = synthesize
+        self.generation = 0
+        self.refreshes = 0
+        self.failed_refreshes = 0
+        # True = sesja wygasła, a odnowienie jest niemożliwe (wyłączone albo max_failed_refreshes porażek z rzędu)
+        self.exhausted = False
+        self._current_requests = {}
+        # Strony ostatniego odnowienia (numer_strony -> collected_links strony) - dla stronicowania przerwanego przez 440
+        self.pages = {}
+        # Sesje sprzed odnowień - zamykane dopiero w close(), gdy żaden worker już na nich nie strumieniuje
+        self._retired_sessions = []
+        self._lock = threading.Lock()
+
+    def resolve(self, si_request: dict) -> dict:
+        """Zwraca request SI zaktualizowany do ostatniego wyszukiwania (nowy URL/cid i parametry)."""
+        return self._current_requests.get(si_request["link_id"], si_request)
+
+    def refresh(self, seen_generation: int) -> bool:
+        """
+        Odnawia sesję (raz na generację - kilku workerów z 440 naraz powoduje jedno odnowienie).
+        Zwraca True, jeśli można ponowić pobieranie. Limit dotyczy porażek z rzędu, nie wszystkich odnowień,
+        więc długi przebieg przeżyje dowolnie wiele wygaśnięć sesji.
+        """
+        with self._lock:
+            if self.generation != seen_generation:
+                # Inny worker już odnowił sesję w międzyczasie
+                return True
+            if self.exhausted:
+                return False
+            if self.max_failed_refreshes <= 0:
+                self.exhausted = True
+                return False
+            get_metrics().inc("session_refreshes_total")
+
+            print(f"🔄 Sesja wygasła (440) - odnawiam (odnowienie {self.refreshes + 1})...")
+            pages = {}
+
+            def _on_page(page_number: int, page_links: list):
+                pages[page_number] = page_links
+
+            try:
+                collected_links = run_http_search(
+                    self.target_url,
+                    cookies_file=self.cookies_file,
+                    on_page=_on_page,
+                    synthesize=self.synthesize,
+                    **self.query,
+                )
+                if not collected_links:
+                    print("⚠️ Replay HTTP nie zwrócił wyników - fallback na przeglądarkę.")
+                    pages.clear()
+                    collected_links = run_etap1_scrape(
+                        self.target_url, cookies_file=self.cookies_file, on_page=_on_page, **self.query
+                    )
+                session = build_download_session(self.cookies_file, pool_size=self.pool_size)
+            except Exception as e:
+                print(f"⚠️ Błąd przy odnawianiu sesji: {e}")
+                collected_links, session = None, None
+
+            if not collected_links or session is None:
+                self.failed_refreshes += 1
+                if self.failed_refreshes >= self.max_failed_refreshes:
+                    self.exhausted = True
+                    print(f"❌ Nie udało się odnowić sesji ({self.failed_refreshes} razy z rzędu) - kończę pobieranie.")
+                else:
+                    print(f"❌ Nie udało się odnowić sesji ({self.failed_refreshes}/{self.max_failed_refreshes}).")
+                return False
+
+            # Starej sesji nie zamykamy - inne workery mogą jeszcze strumieniować na niej pliki
+            if self.session is not None:
+                self._retired_sessions.append(self.session)
+            self.session = session
+            self._current_requests = {r["link_id"]: r for r in si_requests_from_links(collected_links)}
+            self.pages = pages
+            self.generation += 1
+            self.refreshes += 1
+            self.failed_refreshes = 0
+            print(f"✅ Sesja odnowiona ({len(self._current_requests)} requestów SI z nowego wyszukiwania)")
+            return True
+
+    def close(self):
+        for session in self._retired_sessions + [self.session]:
+            if session is not None:
+                session.close()
+        self._retired_sessions = []
+
+
+def download_si_request(
+    refresher: SessionRefresher,
+    si_request: dict,
+    output_dir: str = DEFAULT_OUTPUT_DIR,
+    timeout: int = 30,
+    print_lock: Optional[threading.Lock] = None,
+    cache: Optional[DownloadCache] = None,
+) -> dict:
+    """
+    Pobiera jeden plik SI (z odnowieniem sesji po 440) i zwraca jego status.
+    Świeży wpis w cache (ten sam sąd/rejestr/numer/typ) = brak POST-a, plik odtwarzany z cache.
+    """
+    print_lock = print_lock or threading.Lock()
+    metrics = get_metrics()
+    status = {
+        "row_number": si_request["row_number"],
+        "link_id": si_request["link_id"],
+        "status": None,
+        "file_path": None,
+        "size": 0,
+        "elapsed": 0.0,
+        "attempts": 0,
+        "cached": False,
+        "error": None,
+    }
+    started = time.monotonic()
+
+    entry = cache.lookup(si_request.get("cache_key")) if cache is not None else None
+    if entry is not None:
+        file_path = cache.materialize(entry, output_dir)
+        status.update({"status": 200, "file_path": file_path, "size": entry["size"], "cached": True})
+        status["elapsed"] = round(time.monotonic() - started, 3)
+        metrics.inc("downloads_total", result="cached")
+        with print_lock:
+            print(f"💾 Wiersz {status['row_number']}: z cache {file_path}")
+        return status
+
+    retries = 0
+    while True:
+        if refresher.exhausted:
+            # Sesja nie do odnowienia - kolejne POST-y dostałyby tylko 440
+            status.update({"status": SESSION_EXPIRED_STATUS, "error": "Sesja wygasła, odnowienie niemożliwe"})
+            break
+        generation = refresher.generation
+        current = refresher.resolve(si_request)
+        status["attempts"] += 1
+        try:
+            status_code, final_path, size = stream_post_download(
+                refresher.session,
+                current["url"],
+                current["parameters"],
+                output_dir=output_dir,
+                timeout=timeout,
+            )
+            status.update({"status": status_code, "file_path": final_path, "size": size, "error": None})
+        except requests.RequestException as e:
+            # Timeout / zerwane połączenie - ponawiamy po backoffie limitera
+            status["error"] = str(e)
+            if retries < MAX_DOWNLOAD_RETRIES:
+                retries += 1
+                metrics.inc("download_retries_total", reason="connection")
+                continue
+            break
+        except Exception as e:
+            status["error"] = str(e)
+            break
+        if status_code in RETRY_STATUSES and retries < MAX_DOWNLOAD_RETRIES:
+            retries += 1
+            metrics.inc("download_retries_total", reason=status_code)
+            continue
+        if status_code != SESSION_EXPIRED_STATUS:
+            break
+        metrics.inc("session_expired_total")
+        if not refresher.refresh(generation):
+            break
+        metrics.inc("download_retries_total", reason=SESSION_EXPIRED_STATUS)
+    status["elapsed"] = round(time.monotonic() - started, 3)
+    metrics.inc("downloads_total", result=status["status"] or "error")
+    metrics.observe("download_seconds", status["elapsed"])
+
+    if cache is not None and status["status"] == 200 and status["file_path"]:
+        cache.store(status["file_path"], key=si_request.get("cache_key"))
+
+    with print_lock:
+        if status["status"] == 200:
+            print(f"✅ Wiersz {status['row_number']}: {status['file_path']} ({status['size']} bajtów, {status['elapsed']} s)")
+        else:
+            print(f"❌ Wiersz {status['row_number']}: status {status['status']} {status['error'] or ''}")
+    return status
+
+
+def download_all(
+    result_path: str,
+    output_dir: str = DEFAULT_OUTPUT_DIR,
+    workers: int = DEFAULT_WORKERS,
+    cookies_file: str = SESSION_COOKIES_FILE,
+    timeout: int = 30,
+    target_url: str = DEFAULT_TARGET_URL,
+    query: Optional[dict] = None,
+    auto_refresh: bool = True,
+    cache: Optional[DownloadCache] = None,
+    state: Optional[CrawlState] = None,
+) -> list:
+    """
+    Pobiera wszystkie pliki SI z pliku wynikowego przy pomocy ograniczonej puli wątków.
+    Przy auto_refresh=True status 440 powoduje odnowienie sesji (SessionRefresher) i ponowienie pobierania.
+    Pliki świeże w cache (DownloadCache) nie są pobierane ponownie, a pobrania oznaczone w CrawlState
+    jako ukończone są pomijane (wznowienie po przerwaniu).
+    Zwraca listę statusów per plik: {"row_number", "link_id", "status", "file_path", "size", "elapsed", "attempts", "cached", "error"}.
+    """
+    si_requests = iter_si_requests(result_path)
+    if not si_requests:
+        print(f"⚠️ Brak requestów SI w {result_path}")
+        return []
+
+    state_key = query_key(query or DEFAULT_QUERY)
+    if state is not None:
+        total = len(si_requests)
+        si_requests = [r for r in si_requests if not state.is_download_done(state_key, r["link_id"])]
+        if total != len(si_requests):
+            print(f"↪️ Pomijam {total - len(si_requests)} pobrań ukończonych w poprzednim przebiegu")
+        if not si_requests:
+            return []
+
+    # Sesja (i ewentualne ponowne wyszukiwanie) potrzebna tylko, jeśli coś faktycznie trzeba pobrać
+    needs_download = cache is None or any(not cache.is_fresh(r.get("cache_key")) for r in si_requests)
+    session = build_download_session(cookies_file, pool_size=workers)
+    if session is None and needs_download and not auto_refresh:
+        print(f"⚠️ Brak zapisanych cookies w {cookies_file}. Najpierw uruchom scrapowanie.")
+        return []
+
+    refresher = SessionRefresher(
+        session,
+        target_url=target_url,
+        cookies_file=cookies_file,
+        pool_size=workers,
+        query=query,
+        max_failed_refreshes=MAX_FAILED_REFRESHES if auto_refresh else 0,
+    )
+    if session is None and needs_download and not refresher.refresh(refresher.generation):
+        return []
+
+    return run_downloads(refresher, si_requests, output_dir, workers, timeout, cache, state, state_key)
+
+
+def download_from_snapshot(
+    snapshot_path: str,
+    output_dir: str = DEFAULT_OUTPUT_DIR,
+    workers: int = DEFAULT_WORKERS,
+    cookies_file: str = SESSION_COOKIES_FILE,
+    timeout: int = 30,
+    auto_refresh: bool = True,
+    cache: Optional[DownloadCache] = None,
+    state: Optional[CrawlState] = None,
+    probe: bool = True,
+) -> Optional[list]:
+    """
+    Ciepły start z migawki sesji (session_snapshot): cookies, User-Agent i requesty SI z pliku,
+    bez wyszukiwania i bez pliku wynikowego. None = migawka nieużywalna (brak / wygasła / odrzucona przez probe).
+    """
+    warm = warm_start(snapshot_path, pool_size=workers, probe=probe)
+    if warm is None:
+        return None
+    snapshot, session = warm
+
+    query = snapshot.query or DEFAULT_QUERY
+    state_key = query_key(query)
+    si_requests = snapshot.si_requests()
+    if state is not None:
+        si_requests = [r for r in si_requests if not state.is_download_done(state_key, r["link_id"])]
+
+    refresher = SessionRefresher(
+        session,
+        target_url=snapshot.target_url,
+        cookies_file=cookies_file,
+        pool_size=workers,
+        query=query,
+        max_failed_refreshes=MAX_FAILED_REFRESHES if auto_refresh else 0,
+    )
+    statuses = run_downloads(refresher, si_requests, output_dir, workers, timeout, cache, state, state_key)
+    # Sesja była używana do teraz - przesuwa się szacowane wygaśnięcie (chyba że ją odnowiono po 440)
+    if not refresher.refreshes:
+        snapshot.touch()
+        snapshot.save(snapshot_path)
+    return statuses
+
+
+def run_downloads(
+    refresher: SessionRefresher,
+    si_requests: list,
+    output_dir: str,
+    workers: int,
+    timeout: int,
+    cache: Optional[DownloadCache] = None,
+    state: Optional[CrawlState] = None,
+    state_key: Optional[str] = None,
+) -> list:
+    """Pobiera si_requests w puli workers wątków na sesji refreshera i zwraca posortowane statusy."""
+    print(f"Pobieranie {len(si_requests)} plików SI ({workers} workerów) do {output_dir}")
+    print_lock = threading.Lock()
+
+    statuses = []
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [
+                submit_download(executor, refresher, si_request, output_dir, timeout, print_lock, cache, state, state_key)
+                for si_request in si_requests
+            ]
+            for future in as_completed(futures):
+                statuses.append(future.result())
+    finally:
+        refresher.close()
+    return summarize_statuses(statuses, refresher)
+
+
+def submit_download(
+    executor: ThreadPoolExecutor,
+    refresher: SessionRefresher,
+    si_request: dict,
+    output_dir: str,
+    timeout: int,
+    print_lock: threading.Lock,
+    cache: Optional[DownloadCache] = None,
+    state: Optional[CrawlState] = None,
+    state_key: Optional[str] = None,
+):
+    """Zleca pobranie w puli; wynik (ok / błąd) od razu trafia do CrawlState, jeśli podano."""
+    future = executor.submit(download_si_request, refresher, si_request, output_dir, timeout, print_lock, cache)
+    if state is not None:
+        def _record(done_future):
+            status = done_future.result()
+            if not status["link_id"]:
+                return
+            error = None if status["status"] == 200 else (status["error"] or f"HTTP {status['status']}")
+            state.finish_download(state_key, status["link_id"], status["row_number"], status["file_path"], error)
+
+        future.add_done_callback(_record)
+    return future
+
+
+def summarize_statuses(statuses: list, refresher: SessionRefresher) -> list:
+    """Sortuje statusy po numerze wiersza i wypisuje podsumowanie pobierania."""
+    statuses.sort(key=lambda s: (s["row_number"] is None, s["row_number"] or 0))
+
+    ok = sum(1 for s in statuses if s["status"] == 200)
+    cached = sum(1 for s in statuses if s.get("cached"))
+    print(f"Pobrano {ok}/{len(statuses)} plików SI (z cache: {cached})")
+    if refresher.refreshes:
+        print(f"ℹ️ Sesja odnawiana {refresher.refreshes} raz(y)")
+    if any(s["status"] == SESSION_EXPIRED_STATUS for s in statuses):
+        print("⚠️ Sesja wygasła i nie udało się jej odnowić! Uruchom ponownie scrapowanie.")
+    return statuses
+
+
+def search_and_download(
+    target_url: str = DEFAULT_TARGET_URL,
+    output_dir: str = DEFAULT_OUTPUT_DIR,
+    workers: int = DEFAULT_WORKERS,
+    cookies_file: str = SESSION_COOKIES_FILE,
+    timeout: int = 30,
+    query: Optional[dict] = None,
+    auto_refresh: bool = True,
+    cache: Optional[DownloadCache] = None,
+    state: Optional[CrawlState] = None,
+    synthesize: bool = DEFAULT_SYNTHESIZE,
+) -> list:
+    """
+    Wyszukiwanie po HTTP ze stronicowaniem + pobieranie SI w trakcie: pliki ze strony N pobierają się
+    w puli wątków, gdy ładowana jest strona N+1 (prefetch), zamiast czekać na komplet wyników.
+    synthesize=True: po stronie 1 requesty SI dla pozostałych wierszy są generowane z szablonu (bez stronicowania).
+    """
+    query = query or DEFAULT_QUERY
+    state_key = query_key(query)
+    session = build_http_session(pool_connections=1, pool_maxsize=workers + 1)
+
+    refresher = SessionRefresher(
+        session,
+        target_url=target_url,
+        cookies_file=cookies_file,
+        pool_size=workers,
+        query=query,
+        max_failed_refreshes=MAX_FAILED_REFRESHES if auto_refresh else 0,
+    )
+    print_lock = threading.Lock()
+    futures = []
+
+    # Strony przekazane do pobierania - po 440 w trakcie stronicowania reszta przychodzi z odnowienia
+    delivered_pages = set()
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            def _on_page(page_number: int, page_links: list):
+                delivered_pages.add(page_number)
+                if state is not None:
+                    state.record_page(state_key, page_number, page_links)
+                for si_request in si_requests_from_links(page_links):
+                    if state is not None and state.is_download_done(state_key, si_request["link_id"]):
+                        continue
+                    futures.append(
+                        submit_download(executor, refresher, si_request, output_dir, timeout, print_lock, cache, state, state_key)
+                    )
+
+            if state is not None:
+                state.add_queries([query])
+                state.start_query(state_key)
+            try:
+                run_http_search(
+                    target_url,
+                    session=session,
+                    cookies_file=cookies_file,
+                    on_page=_on_page,
+                    synthesize=synthesize,
+                    raise_errors=True,
+                    **query,
+                )
+            except Exception as e:
+                # Workery odnowiły sesję po 440 (albo wygasła sama) - stronicowanie na starej sesji dostaje 440.
+                # Odnowienie wyszukało wszystko od nowa, więc brakujące strony bierzemy z jego wyników.
+                if not is_session_expired(e) or not refresher.refresh(0):
+                    if state is not None:
+                        state.finish_query(state_key, error=str(e))
+                    raise
+                remaining = sorted(set(refresher.pages) - delivered_pages)
+                print(f"↪️ Stronicowanie przerwane przez 440 - strony {remaining} z odnowionego wyszukiwania")
+                for page_number in remaining:
+                    _on_page(page_number, refresher.pages[page_number])
+            if state is not None:
+                state.finish_query(state_key)
+            statuses = [future.result() for future in futures]
+    finally:
+        # Także gdy wyszukiwanie zgłosi błąd - sesje refreshera nie mogą wisieć otwarte
+        refresher.close()
+    return summarize_statuses(statuses, refresher)
+
+
+def default_result_path() -> str:
+    """Zwraca result.json (Selenium) lub results/items.json (Scrapy) - ten, który istnieje."""
+    if os.path.exists(OUTPUT_JSON):
+        return OUTPUT_JSON
+    return SCRAPY_OUTPUT_JSON
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Równoległe pobieranie plików SI z result.json / results/items.json")
+    parser.add_argument("result_path", nargs="?", default=None, help="result.json lub results/items.json")
+    parser.add_argument("-o", "--output-dir", default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("-c", "--cookies-file", default=SESSION_COOKIES_FILE)
+    parser.add_argument("--status-file", default=None, help="Zapis statusów per plik do JSON")
+    parser.add_argument("--target-url", default=os.environ.get("TARGET_URL", DEFAULT_TARGET_URL))
+    parser.add_argument("--search-type", default=SEARCH_TYPE)
+    parser.add_argument("--search-number", default=SEARCH_NUMBER)
+    parser.add_argument("--search-town", default=SEARCH_TOWN)
+    parser.add_argument("--no-refresh", action="store_true", help="Nie odnawiaj sesji po 440")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="Katalog cache pobranych dokumentów")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_TTL, help="Ważność wpisu w cache (sekundy)")
+    parser.add_argument("--no-cache", action="store_true", help="Zawsze pobieraj, bez cache")
+    parser.add_argument("--rate", type=float, default=None, help="Startowe tempo żądań na sekundę (limiter adaptacyjny)")
+    parser.add_argument("--max-rate", type=float, default=None, help="Górny limit tempa żądań na sekundę")
+    parser.add_argument("--state", default=DEFAULT_STATE_PATH, help="Baza stanu crawla (wznawianie pobrań)")
+    parser.add_argument("--no-state", action="store_true", help="Nie zapisuj stanu, pobierz wszystko od nowa")
+    parser.add_argument(
+        "--metrics-file",
+        default=os.environ.get(METRICS_FILE_ENV),
+        help="Zapis metryk (format tekstowy Prometheusa) po zakończeniu",
+    )
+    parser.add_argument("--metrics-port", type=int, default=None, help="Endpoint /metrics na czas przebiegu")
+    parser.add_argument(
+        "--search",
+        action="store_true",
+        help="Najpierw wyszukaj po HTTP (wszystkie strony) i pobieraj SI w trakcie stronicowania",
+    )
+    parser.add_argument(
+        "--snapshot",
+        default=os.environ.get(SNAPSHOT_FILE_ENV),
+        help="Ciepły start z migawki sesji (cookies, cid, requesty SI) - bez wyszukiwania i pliku wynikowego",
+    )
+    parser.add_argument("--no-probe", action="store_true", help="Przy --snapshot: bez sprawdzania ważności sesji")
+    parser.add_argument(
+        "--synthesize",
+        action="store_true",
+        default=DEFAULT_SYNTHESIZE,
+        help="Przy --search: requesty SI stron 2..N z szablonu nauczonego na stronie 1 (bez stronicowania)",
+    )
+    args = parser.parse_args()
+
+    get_limiter().configure(rate=args.rate, max_rate=args.max_rate)
+    if args.metrics_port:
+        serve_prometheus(args.metrics_port)
+    state = None if args.no_state else CrawlState(args.state)
+    query = {
+        "search_type": args.search_type,
+        "search_number": args.search_number,
+        "search_town": args.search_town,
+    }
+    cache = None if args.no_cache else DownloadCache(args.cache_dir, ttl=args.cache_ttl)
+    if cache is not None:
+        evicted = cache.evict()
+        if evicted:
+            print(f"🧹 Usunięto {evicted} nieaktualnych wpisów cache")
+
+    statuses = None
+    if args.snapshot and not args.search:
+        statuses = download_from_snapshot(
+            args.snapshot,
+            output_dir=args.output_dir,
+            workers=args.workers,
+            cookies_file=args.cookies_file,
+            auto_refresh=not args.no_refresh,
+            cache=cache,
+            state=state,
+            probe=not args.no_probe,
+        )
+        if statuses is None:
+            print("↪️ Migawka sesji nieużywalna - zwykła ścieżka pobierania")
+
+    if statuses is None and args.search:
+        statuses = search_and_download(
+            args.target_url,
+            output_dir=args.output_dir,
+            workers=args.workers,
+            cookies_file=args.cookies_file,
+            query=query,
+            auto_refresh=not args.no_refresh,
+            cache=cache,
+            state=state,
+            synthesize=args.synthesize,
+        )
+    elif statuses is None:
+        statuses = download_all(
+            args.result_path or default_result_path(),
+            output_dir=args.output_dir,
+            workers=args.workers,
+            cookies_file=args.cookies_file,
+            target_url=args.target_url,
+            query=query,
+            auto_refresh=not args.no_refresh,
+            cache=cache,
+            state=state,
+        )
+    print(f"ℹ️ Limiter: {get_limiter().stats()}")
+    if get_egress_pool() is not None:
+        print(f"ℹ️ Wyjścia: {get_egress_pool().stats()}")
+    if state is not None:
+        print(f"ℹ️ Stan crawla: {state.summary()}")
+        state.close()
+    if cache is not None:
+        print(f"ℹ️ Cache: {cache.stats()}")
+        cache.close()
+    if args.status_file:
+        with open(args.status_file, "w", encoding="utf-8") as f:
+            json.dump(statuses, f, indent=4, ensure_ascii=False)
+    if args.metrics_file:
+        get_metrics().write_prometheus(args.metrics_file)
+        print(f"📈 Metryki: {args.metrics_file}")
@@ -0,0 +1,202 @@
+import argparse
+import csv
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
+from typing import Optional, Dict, Any, Iterable
+
+from handelsregister.browser_pool import BrowserPool
+from handelsregister.crawl_state import DEFAULT_STATE_PATH, CrawlState, query_key
+from handelsregister.engine import run_etap1_scrape
+from handelsregister.jsonl import JsonlWriter
+from handelsregister.metrics import start_from_env, write_from_env
+from handelsregister.session_pool import SessionPool
+from handelsregister.utils import (
+    SEARCH_TOWN,
+    session_cookies_file,
+)
+
+# Tryb wsadowy: wiele zapytań (Registerart, Registernummer, Registergericht) z pliku CSV/JSONL,
+# wykonywanych równolegle na puli sesji (http) lub przeglądarek (selenium).
+DEFAULT_WORKERS = 4
+DEFAULT_OUTPUT = os.path.join("results", "batch.jsonl")
+# Ile zapytań na workera może czekać w executorze - duże pliki nie tworzą wszystkich futures naraz
+IN_FLIGHT_PER_WORKER = 2
+
+# Akceptowane nazwy kolumn w pliku wejściowym -> klucz zapytania
+QUERY_FIELDS = {
+    "search_type": ("search_type", "register_type", "registerart", "type"),
+    "search_number": ("search_number", "register_number", "registernummer", "number"),
+    "search_town": ("search_town", "court", "registergericht", "town"),
+}
+
+
+def normalize_query(raw: Dict[str, Any]) -> Optional[Dict[str, str]]:
+    """Mapuje wiersz CSV/JSONL na {"search_type", "search_number", "search_town"} (sąd domyślnie "alle")."""
+    lowered = {str(k).strip().lower(): v for k, v in raw.items() if k is not None}
+    query = {}
+    for field, aliases in QUERY_FIELDS.items():
+        value = next((lowered[a] for a in aliases if lowered.get(a) not in (None, "")), None)
+        query[field] = str(value).strip() if value is not None else None
+
+    if not query["search_type"] or not query["search_number"]:
+        return None
+    query["search_town"] = query["search_town"] or SEARCH_TOWN
+    return query
+
+
+def load_queries(path: str) -> list:
+    """Wczytuje zapytania z CSV (z nagłówkiem) lub JSONL (jeden obiekt na linię)."""
+    queries = []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.endswith(".jsonl") or path.endswith(".json"):
+            rows: Iterable[Dict[str, Any]] = (json.loads(line) for line in f if line.strip())
+        else:
+            rows = csv.DictReader(f)
+        for line_number, raw in enumerate(rows, start=1):
+            query = normalize_query(raw)
+            if query is None:
+                print(f"⚠️ Pominięto niepełne zapytanie (linia {line_number}): {raw}")
+                continue
+            queries.append(query)
+    return queries
+
+
+def run_batch(
+    queries_path: str,
+    output_path: str = DEFAULT_OUTPUT,
+    state_path: str = DEFAULT_STATE_PATH,
+    target_url: str = "https://www.handelsregister.de/",
+    mode: str = "http",
+    workers: int = DEFAULT_WORKERS,
+    retry_failed: bool = True,
+) -> Dict[str, int]:
+    """
+    Wykonuje wszystkie zapytania z pliku równolegle (workers) i zapisuje wyniki przyrostowo do output_path.
+    Postęp (zapytania, strony, wiersze) trafia do CrawlState - ponowne uruchomienie pomija ukończone
+    zapytania, a w przerwanych pobiera tylko brakujące strony.
+    """
+    queries = load_queries(queries_path)
+    state = CrawlState(state_path)
+    state.add_queries(queries)
+
+    # Deduplikacja + tylko zapytania z tego pliku, które nie są jeszcze ukończone
+    file_keys = {query_key(query) for query in queries}
+    pending = {}
+    for query in state.pending_queries(retry_failed):
+        key = query_key(query)
+        if key in file_keys:
+            pending.setdefault(key, query)
+
+    print(f"Zapytań: {len(queries)}, do wykonania: {len(pending)}, ukończonych wcześniej: {len(file_keys) - len(pending)}")
+    if not pending:
+        state.close()
+        return {"total": len(queries), "done": 0, "failed": 0}
+
+    # Wynik każdego zapytania od razu jako jedna linia JSONL (indeks .idx po kluczu zapytania)
+    writer = JsonlWriter(output_path, index=True)
+    pool = SessionPool(target_url, size=workers) if mode == "http" else None
+    browser_pool = BrowserPool(target_url, size=workers) if mode == "selenium" else None
+
+    def _search(key: str, query: Dict[str, str]):
+        # Strony ukończone w poprzednim przebiegu są pomijane; każda nowa strona zapisywana od razu
+        skip_pages = state.completed_pages(key)
+        if skip_pages:
+            print(f"↪️ {key}: wznawiam, ukończone strony: {sorted(skip_pages)}")
+
+        def _on_page(page_number: int, page_links: list):
+            state.record_page(key, page_number, page_links)
+
+        if pool is not None:
+            with pool.lease() as jsf_session:
+                jsf_session.search(**query, on_page=_on_page, skip_pages=skip_pages)
+            return
+
+        # selenium: ciepła przeglądarka z puli + osobny plik cookies na przeglądarkę
+        with browser_pool.lease() as browser:
+            cookies_file = session_cookies_file(f"b{browser.browser_id}")
+            run_etap1_scrape(
+                target_url,
+                cookies_file=cookies_file,
+                driver=browser.driver,
+                on_page=_on_page,
+                skip_pages=skip_pages,
+                raise_errors=True,
+                **query,
+            )
+
+    def _run(key: str, query: Dict[str, str]) -> bool:
+        started = time.monotonic()
+        record = {"key": key, "query": query, "status": "ok", "error": None}
+        state.start_query(key)
+        try:
+            _search(key, query)
+            collected_links = state.query_rows(key)
+            record["count"] = len(collected_links)
+            record["items"] = collected_links
+            state.finish_query(key)
+        except Exception as e:
+            record.update({"status": "error", "error": str(e), "count": 0, "items": []})
+            state.finish_query(key, error=str(e))
+        record["elapsed"] = round(time.monotonic() - started, 3)
+        record["finished_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+
+        writer.write(record)
+        if record["status"] == "ok":
+            print(f"✅ {key}: {record['count']} wierszy ({record['elapsed']} s)")
+            return True
+        print(f"❌ {key}: {record['error']}")
+        return False
+
+    results = {True: 0, False: 0}
+    max_in_flight = max(1, workers) * IN_FLIGHT_PER_WORKER
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            # Nowe zapytanie trafia do executora dopiero, gdy zwolni się miejsce w oknie max_in_flight
+            in_flight = set()
+            for key, query in pending.items():
+                if len(in_flight) >= max_in_flight:
+                    completed, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in completed:
+                        results[future.result()] += 1
+                in_flight.add(executor.submit(_run, key, query))
+            for future in as_completed(in_flight):
+                results[future.result()] += 1
+    finally:
+        writer.close()
+        if pool is not None:
+            pool.close()
+        if browser_pool is not None:
+            browser_pool.close()
+        print(f"ℹ️ Stan crawla: {state.summary()}")
+        state.close()
+
+    done, failed = results[True], results[False]
+    print(f"BATCH ZAKONCZONY: {done} ukończonych, {failed} błędów, wyniki w {output_path}")
+    return {"total": len(queries), "done": done, "failed": failed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Wsadowe wyszukiwanie wielu numerów rejestru z CSV/JSONL")
+    parser.add_argument("queries_path", help="CSV (register_type,register_number,court) lub JSONL")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--state", default=DEFAULT_STATE_PATH, help="Baza stanu crawla (SQLite)")
+    parser.add_argument("--target-url", default=os.environ.get("TARGET_URL", "https://www.handelsregister.de/"))
+    parser.add_argument("--mode", choices=("http", "selenium"), default="http")
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_WORKERS)
+    parser.add_argument("--no-retry-failed", action="store_true", help="Nie ponawiaj zapytań zakończonych błędem")
+    args = parser.parse_args()
+
+    # METRICS_PORT - endpoint /metrics na czas przebiegu, METRICS_FILE - zapis metryk na końcu
+    start_from_env()
+    run_batch(
+        args.queries_path,
+        output_path=args.output,
+        state_path=args.state,
+        target_url=args.target_url,
+        mode=args.mode,
+        workers=args.workers,
+        retry_failed=not args.no_retry_failed,
+    )
+    write_from_env()
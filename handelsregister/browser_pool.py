@@ -0,0 +1,174 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, Callable, Iterator
+
+from handelsregister.egress import EgressPool, Proxy, get_egress_pool
+from handelsregister.http_search import welcome_url
+from handelsregister.utils import build_driver
+
+# Pula "ciepłych" przeglądarek: start undetected Chrome (patchowanie + launch) płacimy raz na worker,
+# a nie raz na wyszukiwanie. Między zapytaniami przeglądarka jest resetowana, a nie zamykana.
+DEFAULT_BROWSER_POOL_SIZE = 2
+DEFAULT_MAX_USES = 25
+
+
+class PooledBrowser:
+    """Przeglądarka z puli (driver + licznik użyć + przydzielone wyjście, jeśli jest pula egress)."""
+
+    def __init__(self, browser_id: int, driver, proxy: Optional[Proxy] = None):
+        self.browser_id = browser_id
+        self.driver = driver
+        self.proxy = proxy
+        self.uses = 0
+        self.created_at = time.time()
+        self.crashed = False
+
+
+class BrowserPool:
+    """
+    Pula N długo żyjących driverów wypożyczanych wywołującym (lease).
+    Driver jest wymieniany po max_uses użyciach albo po awarii (martwa sesja WebDriver).
+    Przy puli egress każda przeglądarka startuje z własnym proxy (--proxy-server); wynik wypożyczenia
+    ocenia zdrowie wyjścia, a przeglądarka na wyłączonym wyjściu jest wymieniana (z nowym proxy).
+    """
+
+    def __init__(
+        self,
+        target_url: str,
+        size: int = DEFAULT_BROWSER_POOL_SIZE,
+        max_uses: int = DEFAULT_MAX_USES,
+        driver_factory: Callable = build_driver,
+        egress: Optional[EgressPool] = None,
+    ):
+        self.target_url = target_url
+        self.size = size
+        self.max_uses = max_uses
+        self.driver_factory = driver_factory
+        self.egress = egress if egress is not None else get_egress_pool()
+        self._idle: "queue.Queue[Optional[PooledBrowser]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._counter = 0
+        self.recycled = 0
+
+    def _new_browser(self) -> PooledBrowser:
+        with self._lock:
+            self._counter += 1
+            browser_id = self._counter
+        print(f"🚀 Uruchamianie przeglądarki #{browser_id} dla puli...")
+        if self.egress is None:
+            browser = PooledBrowser(browser_id, self.driver_factory())
+        else:
+            proxy = self.egress.assign(self._egress_id(browser_id))
+            browser = PooledBrowser(browser_id, self.driver_factory(proxy=proxy.chrome_server()), proxy)
+        self.reset(browser)
+        return browser
+
+    @staticmethod
+    def _egress_id(browser_id: int) -> str:
+        return f"browser-{browser_id}"
+
+    def _create(self) -> Optional[PooledBrowser]:
+        """Nowa przeglądarka, jeśli pula nie jest jeszcze pełna; None = pełna."""
+        with self._lock:
+            if self._created >= self.size:
+                return None
+            self._created += 1
+        try:
+            return self._new_browser()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def _acquire(self, timeout: Optional[float]) -> PooledBrowser:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            try:
+                browser = self._idle.get_nowait()
+            except queue.Empty:
+                # Leniwe tworzenie - nowa przeglądarka tylko, jeśli pula nie jest jeszcze pełna
+                browser = self._create()
+                if browser is not None:
+                    return browser
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+                browser = self._idle.get(timeout=remaining)
+            if browser is not None:
+                return browser
+            # None = znacznik po wymienionej przeglądarce (zwolnione miejsce) - kolejny obieg ją utworzy
+
+    def reset(self, browser: PooledBrowser):
+        """Czyści stan przeglądarki (cookies, storage, przechwycone requesty) i wraca na stronę startową."""
+        driver = browser.driver
+        driver.delete_all_cookies()
+        driver.get(welcome_url(self.target_url))
+        driver.execute_script(
+            "try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}"
+            "window._capturedRequests = [];"
+        )
+
+    def _is_alive(self, browser: PooledBrowser) -> bool:
+        try:
+            browser.driver.execute_script("return 1;")
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, browser: PooledBrowser, replace: bool = True):
+        """
+        Zamyka przeglądarkę i zwalnia jej miejsce. replace=True budzi czekającego w _acquire
+        (znacznik None w kolejce), żeby przy pełnej puli utworzył przeglądarkę w miejsce wymienionej.
+        """
+        try:
+            browser.driver.quit()
+        except Exception:
+            pass
+        if self.egress is not None:
+            self.egress.release(self._egress_id(browser.browser_id))
+        with self._lock:
+            self._created -= 1
+            self.recycled += 1
+        if replace:
+            self._idle.put(None)
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None) -> Iterator[PooledBrowser]:
+        """Wypożycza przeglądarkę na czas bloku `with`; po oddaniu jest resetowana albo wymieniana."""
+        browser = self._acquire(timeout)
+        failed = False
+        try:
+            yield browser
+        except Exception:
+            failed = True
+            browser.crashed = not self._is_alive(browser)
+            raise
+        finally:
+            browser.uses += 1
+            if browser.proxy is not None:
+                self.egress.report(browser.proxy, not failed)
+            if browser.crashed or not self._is_alive(browser):
+                print(f"⚠️ Przeglądarka #{browser.browser_id} nie odpowiada - wymieniam.")
+                self._discard(browser)
+            elif browser.proxy is not None and not browser.proxy.is_healthy():
+                print(f"🔀 Przeglądarka #{browser.browser_id}: wyjście {browser.proxy.name} wyłączone - wymieniam.")
+                self._discard(browser)
+            elif browser.uses >= self.max_uses:
+                print(f"♻️ Przeglądarka #{browser.browser_id} osiągnęła {browser.uses} użyć - wymieniam.")
+                self._discard(browser)
+            else:
+                try:
+                    self.reset(browser)
+                    self._idle.put(browser)
+                except Exception:
+                    self._discard(browser)
+
+    def close(self):
+        while True:
+            try:
+                browser = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if browser is not None:
+                self._discard(browser, replace=False)
@@ -0,0 +1,192 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional, Dict, List, Iterable, Set
+
+# Trwały stan crawla (SQLite w trybie WAL): zapytania, strony wyników, wiersze i pobrania SI ze statusami.
+# Po restarcie zadanie pomija ukończone zapytania / strony / pobrania i kontynuuje od miejsca przerwania.
+DEFAULT_STATE_PATH = os.path.join("results", "crawl_state.db")
+
+STATUS_PENDING = "pending"
+STATUS_RUNNING = "running"
+STATUS_DONE = "done"
+STATUS_FAILED = "failed"
+
+SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS queries (
+        query_key TEXT PRIMARY KEY,
+        query TEXT NOT NULL,
+        status TEXT NOT NULL,
+        error TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        updated_at REAL NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS pages (
+        query_key TEXT NOT NULL,
+        page_number INTEGER NOT NULL,
+        status TEXT NOT NULL,
+        row_count INTEGER NOT NULL,
+        updated_at REAL NOT NULL,
+        PRIMARY KEY (query_key, page_number)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS rows (
+        query_key TEXT NOT NULL,
+        row_number INTEGER NOT NULL,
+        page_number INTEGER NOT NULL,
+        data TEXT NOT NULL,
+        updated_at REAL NOT NULL,
+        PRIMARY KEY (query_key, row_number)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS downloads (
+        query_key TEXT NOT NULL,
+        link_id TEXT NOT NULL,
+        row_number INTEGER,
+        status TEXT NOT NULL,
+        file_path TEXT,
+        error TEXT,
+        attempts INTEGER NOT NULL DEFAULT 0,
+        updated_at REAL NOT NULL,
+        PRIMARY KEY (query_key, link_id)
+    )
+    """,
+]
+
+
+def query_key(query: Dict[str, str]) -> str:
+    """Unikalny klucz zapytania, np. "HRB|25386|alle"."""
+    return f"{query.get('search_type')}|{query.get('search_number')}|{query.get('search_town')}"
+
+
+class CrawlState:
+    """Magazyn stanu crawla; jedno połączenie współdzielone przez wątki (zapisy pod lockiem, w transakcjach)."""
+
+    def __init__(self, path: str = DEFAULT_STATE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        with self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            for statement in SCHEMA:
+                self.connection.execute(statement)
+
+    def _write(self, sql: str, params: Iterable = ()):
+        with self._lock, self.connection:
+            self.connection.execute(sql, tuple(params))
+
+    def _read(self, sql: str, params: Iterable = ()) -> list:
+        with self._lock:
+            return self.connection.execute(sql, tuple(params)).fetchall()
+
+    # --- zapytania ---
+
+    def add_queries(self, queries: List[Dict[str, str]]) -> int:
+        """Rejestruje zapytania jako pending (już znane zostają bez zmian). Zwraca liczbę nowych."""
+        now = time.time()
+        with self._lock, self.connection:
+            before = self.connection.total_changes
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO queries (query_key, query, status, updated_at) VALUES (?, ?, ?, ?)",
+                [(query_key(q), json.dumps(q, ensure_ascii=False), STATUS_PENDING, now) for q in queries],
+            )
+            return self.connection.total_changes - before
+
+    def pending_queries(self, retry_failed: bool = True) -> List[Dict[str, str]]:
+        """Zapytania do (do)wykonania: pending, przerwane (running) i opcjonalnie failed."""
+        statuses = [STATUS_PENDING, STATUS_RUNNING] + ([STATUS_FAILED] if retry_failed else [])
+        placeholders = ", ".join("?" * len(statuses))
+        rows = self._read(f"SELECT query FROM queries WHERE status IN ({placeholders}) ORDER BY rowid", statuses)
+        return [json.loads(row[0]) for row in rows]
+
+    def is_query_done(self, key: str) -> bool:
+        rows = self._read("SELECT status FROM queries WHERE query_key = ?", (key,))
+        return bool(rows) and rows[0][0] == STATUS_DONE
+
+    def start_query(self, key: str):
+        self._write(
+            "UPDATE queries SET status = ?, attempts = attempts + 1, updated_at = ? WHERE query_key = ?",
+            (STATUS_RUNNING, time.time(), key),
+        )
+
+    def finish_query(self, key: str, error: Optional[str] = None):
+        status = STATUS_FAILED if error else STATUS_DONE
+        self._write(
+            "UPDATE queries SET status = ?, error = ?, updated_at = ? WHERE query_key = ?",
+            (status, error, time.time(), key),
+        )
+
+    # --- strony i wiersze ---
+
+    def record_page(self, key: str, page_number: int, page_links: list):
+        """Zapisuje stronę wyników z wierszami i rejestruje ich pobrania SI jako pending - jedna transakcja."""
+        now = time.time()
+        with self._lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO rows VALUES (?, ?, ?, ?, ?)",
+                [
+                    (key, row["row_number"], page_number, json.dumps(row, ensure_ascii=False), now)
+                    for row in page_links
+                ],
+            )
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO downloads (query_key, link_id, row_number, status, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [
+                    (key, link.get("id"), row["row_number"], STATUS_PENDING, now)
+                    for row in page_links
+                    for link in row.get("si_links", [])
+                    if link.get("id")
+                ],
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)",
+                (key, page_number, STATUS_DONE, len(page_links), now),
+            )
+
+    def completed_pages(self, key: str) -> Set[int]:
+        rows = self._read("SELECT page_number FROM pages WHERE query_key = ? AND status = ?", (key, STATUS_DONE))
+        return {row[0] for row in rows}
+
+    def query_rows(self, key: str) -> list:
+        """collected_links zapytania odtworzone ze stanu (wszystkie zapisane strony)."""
+        rows = self._read("SELECT data FROM rows WHERE query_key = ? ORDER BY row_number", (key,))
+        return [json.loads(row[0]) for row in rows]
+
+    # --- pobrania ---
+
+    def is_download_done(self, key: str, link_id: str) -> bool:
+        rows = self._read("SELECT status FROM downloads WHERE query_key = ? AND link_id = ?", (key, link_id))
+        return bool(rows) and rows[0][0] == STATUS_DONE
+
+    def finish_download(self, key: str, link_id: str, row_number: Optional[int], file_path: Optional[str] = None, error: Optional[str] = None):
+        status = STATUS_FAILED if error else STATUS_DONE
+        self._write(
+            "INSERT INTO downloads (query_key, link_id, row_number, status, file_path, error, attempts, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, 1, ?) "
+            "ON CONFLICT (query_key, link_id) DO UPDATE SET status = excluded.status, file_path = excluded.file_path, "
+            "error = excluded.error, attempts = downloads.attempts + 1, updated_at = excluded.updated_at",
+            (key, link_id, row_number, status, file_path, error, time.time()),
+        )
+
+    def summary(self) -> Dict[str, Dict[str, int]]:
+        """Liczniki statusów: {"queries": {...}, "downloads": {...}, "pages": n, "rows": n}."""
+        result = {}
+        for table in ("queries", "downloads"):
+            result[table] = dict(self._read(f"SELECT status, COUNT(*) FROM {table} GROUP BY status"))
+        result["pages"] = self._read("SELECT COUNT(*) FROM pages")[0][0]
+        result["rows"] = self._read("SELECT COUNT(*) FROM rows")[0][0]
+        return result
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
@@ -0,0 +1,211 @@
+import hashlib
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Optional, Dict, Any, Tuple
+
+from handelsregister.si_parser import parse_document_filename
+
+# Lokalny cache pobranych dokumentów: klucz (sąd, rodzaj rejestru, numer, typ dokumentu) -> treść po sha256.
+# Nazwa pliku z Content-Disposition różni się między pobraniami tylko znacznikiem czasu
+# (SN-Chemnitz_HRB_25386+SI-20251210175648.xml), więc kluczem nie może być nazwa pliku.
+DEFAULT_CACHE_DIR = "cache"
+DEFAULT_TTL = 7 * 24 * 3600
+DEFAULT_MAX_ENTRIES = 100_000
+HASH_CHUNK_SIZE = 64 * 1024
+
+# Pierwsza kolumna wiersza wyników, np. "Sachsen Amtsgericht Chemnitz HRB 25386"
+REGISTER_COLUMN_RE = re.compile(
+    r"(?:Amtsgericht|District court)\s+(?P<court>.+?)\s+"
+    r"(?P<register_type>HRA|HRB|GnR|GsR|PR|VR)\s+(?P<register_number>\d+(?:\s*[A-Z]{1,2})?)\b"
+)
+
+CacheKey = Tuple[str, str, str, str]
+
+
+def normalize_key(court: str, register_type: str, register_number: str, document_type: str) -> CacheKey:
+    return (
+        " ".join(court.replace("_", " ").split()).casefold(),
+        register_type.strip().upper(),
+        re.sub(r"\s+", "", register_number).upper(),
+        document_type.strip().upper(),
+    )
+
+
+def key_from_columns(columns: Optional[list], document_type: str = "SI") -> Optional[CacheKey]:
+    """Klucz cache z kolumn wiersza wyników (przed pobraniem)."""
+    for column in columns or []:
+        match = REGISTER_COLUMN_RE.search(column or "")
+        if match:
+            return normalize_key(match["court"], match["register_type"], match["register_number"], document_type)
+    return None
+
+
+def key_from_filename(file_name: str) -> Optional[CacheKey]:
+    """Klucz cache z nazwy pliku z Content-Disposition (po pobraniu)."""
+    parts = parse_document_filename(file_name)
+    if parts is None:
+        return None
+    return normalize_key(parts["court"], parts["register_type"], parts["register_number"], parts["document_type"])
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DownloadCache:
+    """
+    Cache adresowany treścią: obiekty w <cache_dir>/objects/<sha[:2]>/<sha>, indeks w SQLite.
+    Wpis jest świeży przez ttl sekund od pobrania; evict() usuwa przeterminowane wpisy
+    i najdawniej używane ponad max_entries, a potem obiekty, do których nic się nie odwołuje.
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR, ttl: float = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.cache_dir = cache_dir
+        self.objects_dir = os.path.join(cache_dir, "objects")
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self.connection = sqlite3.connect(os.path.join(cache_dir, "index.db"), check_same_thread=False)
+        with self.connection:
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS entries (
+                    court TEXT NOT NULL,
+                    register_type TEXT NOT NULL,
+                    register_number TEXT NOT NULL,
+                    document_type TEXT NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    file_name TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    fetched_at REAL NOT NULL,
+                    last_access REAL NOT NULL,
+                    PRIMARY KEY (court, register_type, register_number, document_type)
+                )
+                """
+            )
+
+    def object_path(self, sha256: str) -> str:
+        return os.path.join(self.objects_dir, sha256[:2], sha256)
+
+    def _fresh_row(self, key: CacheKey, now: float) -> Optional[tuple]:
+        row = self.connection.execute(
+            "SELECT sha256, file_name, size, fetched_at FROM entries "
+            "WHERE court = ? AND register_type = ? AND register_number = ? AND document_type = ?",
+            key,
+        ).fetchone()
+        if row is None or now - row[3] > self.ttl or not os.path.exists(self.object_path(row[0])):
+            return None
+        return row
+
+    def is_fresh(self, key: Optional[CacheKey]) -> bool:
+        """Sprawdza świeżość wpisu bez liczenia trafień i aktualizacji last_access."""
+        if key is None:
+            return False
+        with self._lock:
+            return self._fresh_row(key, time.time()) is not None
+
+    def lookup(self, key: Optional[CacheKey]) -> Optional[Dict[str, Any]]:
+        """Zwraca świeży wpis dla klucza albo None (brak / przeterminowany / brak obiektu na dysku)."""
+        if key is None:
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._fresh_row(key, now)
+            if row is None:
+                self.misses += 1
+                return None
+            with self.connection:
+                self.connection.execute(
+                    "UPDATE entries SET last_access = ? "
+                    "WHERE court = ? AND register_type = ? AND register_number = ? AND document_type = ?",
+                    (now, *key),
+                )
+            self.hits += 1
+        return {"sha256": row[0], "file_name": row[1], "size": row[2], "fetched_at": row[3]}
+
+    def store(self, file_path: str, key: Optional[CacheKey] = None) -> Optional[Dict[str, Any]]:
+        """Dodaje pobrany plik do cache (klucz domyślnie z nazwy pliku). Zwraca wpis albo None."""
+        key = key or key_from_filename(file_path)
+        if key is None:
+            return None
+
+        sha256 = file_sha256(file_path)
+        object_path = self.object_path(sha256)
+        if not os.path.exists(object_path):
+            object_dir = os.path.dirname(object_path)
+            os.makedirs(object_dir, exist_ok=True)
+            # Unikalny plik tymczasowy na wywołanie - dwa wątki z tą samą treścią (np. zduplikowane wiersze)
+            # nie piszą do jednego .part; os.replace tej samej treści jest idempotentny
+            fd, tmp_path = tempfile.mkstemp(suffix=".part", dir=object_dir)
+            os.close(fd)
+            try:
+                shutil.copyfile(file_path, tmp_path)
+                os.replace(tmp_path, object_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+        now = time.time()
+        entry = {
+            "sha256": sha256,
+            "file_name": os.path.basename(file_path),
+            "size": os.path.getsize(object_path),
+            "fetched_at": now,
+        }
+        with self._lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (*key, sha256, entry["file_name"], entry["size"], now, now),
+            )
+        return entry
+
+    def materialize(self, entry: Dict[str, Any], output_dir: str = "") -> str:
+        """Odtwarza plik z cache w katalogu docelowym (pod oryginalną nazwą), jeśli go tam nie ma."""
+        final_path = os.path.join(output_dir, entry["file_name"])
+        if not os.path.exists(final_path) or os.path.getsize(final_path) != entry["size"]:
+            os.makedirs(output_dir or ".", exist_ok=True)
+            shutil.copyfile(self.object_path(entry["sha256"]), final_path)
+        return final_path
+
+    def evict(self) -> int:
+        """Usuwa przeterminowane wpisy, nadmiarowe (LRU ponad max_entries) i osierocone obiekty."""
+        cutoff = time.time() - self.ttl
+        with self._lock, self.connection:
+            removed = self.connection.execute("DELETE FROM entries WHERE fetched_at < ?", (cutoff,)).rowcount
+            removed += self.connection.execute(
+                "DELETE FROM entries WHERE rowid IN ("
+                "SELECT rowid FROM entries ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            ).rowcount
+            referenced = {row[0] for row in self.connection.execute("SELECT sha256 FROM entries")}
+
+        for prefix in os.listdir(self.objects_dir):
+            prefix_dir = os.path.join(self.objects_dir, prefix)
+            for name in os.listdir(prefix_dir):
+                # .part = obiekt właśnie zapisywany przez inny wątek
+                if name not in referenced and not name.endswith(".part"):
+                    os.remove(os.path.join(prefix_dir, name))
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            entries, total_size = self.connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {"entries": entries, "bytes": total_size, "hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
@@ -0,0 +1,247 @@
+import argparse
+import json
+import os
+import threading
+import time
+from typing import Optional, Dict, Any, List
+from urllib.parse import urlparse
+
+import requests
+
+from handelsregister.throttle import AdaptiveRateLimiter, ThrottledAdapter
+
+# Pula wyjść (proxy HTTP/SOCKS) do rozkładania ruchu na wiele IP: każda sesja (requests / przeglądarka)
+# dostaje na stałe jedno proxy, a wyjścia z kiepskim wynikiem są czasowo wyłączane z puli.
+# Plik konfiguracyjny: jeden URL na linię (# = komentarz) albo JSON [{"url": ..., "name": ...}, "socks5://..."].
+DEFAULT_PROXIES_FILE = os.environ.get("PROXIES_FILE", "proxies.txt")
+# Wspólne id dla pojedynczego przebiegu (przeglądarka + pobieranie na jej cookies idą tym samym wyjściem)
+DEFAULT_EGRESS_SESSION = "default"
+SUPPORTED_SCHEMES = {"http", "https", "socks5", "socks5h", "socks4"}
+
+# Wynik zdrowia: EWMA sukcesów (1.0 = same sukcesy); poniżej MIN_SCORE albo po MAX_CONSECUTIVE_FAILURES
+# błędach z rzędu wyjście trafia na kwarantannę na EVICTION_COOLDOWN sekund
+SCORE_SMOOTHING = 0.2
+MIN_SCORE = 0.3
+MAX_CONSECUTIVE_FAILURES = 3
+EVICTION_COOLDOWN = 300.0
+# Odpowiedzi świadczące o problemie wyjścia (blokada IP, limit, błąd bramki proxy), a nie serwera
+PROXY_FAILURE_STATUSES = {403, 407, 429, 502, 504}
+PROBE_TIMEOUT = 15
+
+
+class Proxy:
+    """Jedno wyjście: URL, wynik zdrowia i własny limiter (tempo liczone per IP)."""
+
+    def __init__(self, url: str, name: Optional[str] = None):
+        scheme = urlparse(url).scheme
+        if scheme not in SUPPORTED_SCHEMES:
+            raise ValueError(f"Nieobsługiwany schemat proxy '{scheme}' w {url}")
+        self.url = url
+        self.name = name or urlparse(url).netloc.rsplit("@", 1)[-1]
+        self.score = 1.0
+        self.consecutive_failures = 0
+        self.requests = 0
+        self.failures = 0
+        self.evicted_until = 0.0
+        self.evictions = 0
+        self.limiter = AdaptiveRateLimiter()
+
+    def is_healthy(self, now: Optional[float] = None) -> bool:
+        return (now or time.time()) >= self.evicted_until
+
+    def requests_proxies(self) -> Dict[str, str]:
+        """Słownik proxies dla requests (SOCKS wymaga requests[socks])."""
+        return {"http": self.url, "https": self.url}
+
+    def chrome_server(self) -> str:
+        """Wartość --proxy-server dla ChromeOptions (Chrome nie przyjmuje loginu/hasła w tym argumencie)."""
+        parsed = urlparse(self.url)
+        scheme = "socks5" if parsed.scheme == "socks5h" else parsed.scheme
+        return f"{scheme}://{parsed.netloc.rsplit('@', 1)[-1]}"
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "score": round(self.score, 3),
+            "requests": self.requests,
+            "failures": self.failures,
+            "evictions": self.evictions,
+            "healthy": self.is_healthy(),
+            "rate": self.limiter.stats()["rate"],
+        }
+
+
+def load_proxies(path: str) -> List[Proxy]:
+    """Wczytuje listę proxy z pliku tekstowego (URL na linię) lub JSON."""
+    with open(path, "r", encoding="utf-8") as f:
+        content = f.read()
+    if path.endswith(".json"):
+        entries = json.loads(content)
+        return [
+            Proxy(entry) if isinstance(entry, str) else Proxy(entry["url"], entry.get("name"))
+            for entry in entries
+        ]
+    lines = (line.split("#", 1)[0].strip() for line in content.splitlines())
+    return [Proxy(line) for line in lines if line]
+
+
+class EgressPool:
+    """
+    Przydziela proxy sesjom (sticky: session_id -> proxy) i ocenia ich zdrowie.
+    Nowa sesja dostaje zdrowe wyjście z najmniejszą liczbą sesji (przy remisie - najlepszy wynik).
+    Po wyłączeniu wyjścia jego sesje przy następnym żądaniu dostają inne.
+    """
+
+    def __init__(
+        self,
+        proxies: List[Proxy],
+        min_score: float = MIN_SCORE,
+        max_consecutive_failures: int = MAX_CONSECUTIVE_FAILURES,
+        cooldown: float = EVICTION_COOLDOWN,
+    ):
+        if not proxies:
+            raise ValueError("Pula wyjść jest pusta")
+        self.proxies = proxies
+        self.min_score = min_score
+        self.max_consecutive_failures = max_consecutive_failures
+        self.cooldown = cooldown
+        self.assignments: Dict[str, Proxy] = {}
+        self._lock = threading.Lock()
+
+    def _pick(self, now: float) -> Proxy:
+        healthy = [p for p in self.proxies if p.is_healthy(now)]
+        if not healthy:
+            # Wszystkie na kwarantannie - wraca ta, której kwarantanna kończy się najwcześniej
+            proxy = min(self.proxies, key=lambda p: p.evicted_until)
+            print(f"⚠️ Brak zdrowych wyjść - przywracam {proxy.name} przed końcem kwarantanny")
+            proxy.evicted_until = 0.0
+            proxy.consecutive_failures = 0
+            proxy.score = self.min_score
+            return proxy
+        load = {}
+        for assigned in self.assignments.values():
+            load[assigned.url] = load.get(assigned.url, 0) + 1
+        return min(healthy, key=lambda p: (load.get(p.url, 0), -p.score))
+
+    def assign(self, session_id: str) -> Proxy:
+        """Zwraca proxy sesji; przydziela nowe, jeśli sesja go nie ma albo jej wyjście jest na kwarantannie."""
+        with self._lock:
+            now = time.time()
+            proxy = self.assignments.get(session_id)
+            if proxy is None or not proxy.is_healthy(now):
+                proxy = self._pick(now)
+                self.assignments[session_id] = proxy
+            return proxy
+
+    def release(self, session_id: str):
+        with self._lock:
+            self.assignments.pop(session_id, None)
+
+    def report(self, proxy: Proxy, ok: bool):
+        """Aktualizuje wynik wyjścia; zbyt słabe trafia na kwarantannę (cooldown)."""
+        with self._lock:
+            proxy.requests += 1
+            proxy.score = SCORE_SMOOTHING * (1.0 if ok else 0.0) + (1 - SCORE_SMOOTHING) * proxy.score
+            if ok:
+                proxy.consecutive_failures = 0
+                return
+            proxy.failures += 1
+            proxy.consecutive_failures += 1
+            if proxy.is_healthy() and (
+                proxy.score < self.min_score or proxy.consecutive_failures >= self.max_consecutive_failures
+            ):
+                proxy.evicted_until = time.time() + self.cooldown
+                proxy.evictions += 1
+                # Po kwarantannie wyjście wraca z czystą kartą
+                proxy.score = 1.0
+                proxy.consecutive_failures = 0
+                print(f"🚫 Wyjście {proxy.name} wyłączone na {self.cooldown:.0f} s (błędy z rzędu / niski wynik)")
+
+    def stats(self) -> list:
+        with self._lock:
+            return [proxy.state() for proxy in self.proxies]
+
+
+def is_proxy_failure(status: Optional[int]) -> bool:
+    return status is None or status in PROXY_FAILURE_STATUSES
+
+
+def bind_session(session: requests.Session, pool: EgressPool, session_id: str = DEFAULT_EGRESS_SESSION) -> Proxy:
+    """
+    Kieruje sesję requests przez proxy przydzielone session_id. Adaptery ThrottledAdapter sesji
+    dostają limiter tego wyjścia obok wspólnego (oba limity obowiązują naraz) i raportują wyniki
+    żądań do puli; po kwarantannie wyjścia kolejne żądanie idzie już przez nowe.
+    Wołać po zamontowaniu adapterów.
+    """
+    proxy = pool.assign(session_id)
+    adapters = [a for a in set(session.adapters.values()) if isinstance(a, ThrottledAdapter)]
+
+    def _use(current: Proxy):
+        session.proxies.update(current.requests_proxies())
+        for adapter in adapters:
+            adapter.proxy_limiter = current.limiter
+
+    def _observe(status: Optional[int], latency: float):
+        current = pool.assignments.get(session_id, proxy)
+        pool.report(current, not is_proxy_failure(status))
+        replacement = pool.assign(session_id)
+        if replacement is not current:
+            print(f"🔀 Sesja {session_id}: {current.name} -> {replacement.name}")
+            _use(replacement)
+
+    _use(proxy)
+    for adapter in adapters:
+        adapter.observers.append(_observe)
+    return proxy
+
+
+_default_pool: Optional[EgressPool] = None
+_default_loaded = False
+_default_lock = threading.Lock()
+
+
+def get_egress_pool() -> Optional[EgressPool]:
+    """Domyślna pula procesu z PROXIES_FILE (proxies.txt); None = bez proxy (bezpośrednie wyjście)."""
+    global _default_pool, _default_loaded
+    with _default_lock:
+        if not _default_loaded:
+            _default_loaded = True
+            if os.path.exists(DEFAULT_PROXIES_FILE):
+                _default_pool = EgressPool(load_proxies(DEFAULT_PROXIES_FILE))
+                print(f"ℹ️ Pula wyjść: {len(_default_pool.proxies)} proxy z {DEFAULT_PROXIES_FILE}")
+        return _default_pool
+
+
+def bind_default(session: requests.Session, session_id: str = DEFAULT_EGRESS_SESSION) -> Optional[Proxy]:
+    """bind_session z domyślną pulą (jeśli skonfigurowana)."""
+    pool = get_egress_pool()
+    return bind_session(session, pool, session_id) if pool is not None else None
+
+
+def probe(pool: EgressPool, url: str, timeout: float = PROBE_TIMEOUT) -> Dict[str, Any]:
+    """Sprawdza każde wyjście jednym GET na url; wynik trafia do oceny zdrowia."""
+    results = {}
+    for proxy in pool.proxies:
+        started = time.monotonic()
+        try:
+            response = requests.get(url, proxies=proxy.requests_proxies(), timeout=timeout)
+            status = response.status_code
+            error = None
+        except requests.RequestException as e:
+            status, error = None, str(e)
+        pool.report(proxy, not is_proxy_failure(status))
+        results[proxy.name] = {"status": status, "elapsed": round(time.monotonic() - started, 3), "error": error}
+        print(f"{'✅' if not is_proxy_failure(status) else '❌'} {proxy.name}: {status or error}")
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Sprawdzenie puli wyjść (proxy) z pliku konfiguracyjnego")
+    parser.add_argument("proxies_file", nargs="?", default=DEFAULT_PROXIES_FILE)
+    parser.add_argument("--url", default="https://www.handelsregister.de/rp_web/welcome.xhtml")
+    parser.add_argument("--timeout", type=float, default=PROBE_TIMEOUT)
+    args = parser.parse_args()
+
+    egress_pool = EgressPool(load_proxies(args.proxies_file))
+    probe(egress_pool, args.url, args.timeout)
+    print(json.dumps(egress_pool.stats(), indent=4, ensure_ascii=False))
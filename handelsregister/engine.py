@@ -0,0 +1,502 @@
+import os
+import time
+from typing import Optional, Dict, Callable, Iterator, Set, Tuple
+
+import requests
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from handelsregister.egress import DEFAULT_EGRESS_SESSION, get_egress_pool
+from handelsregister.http_search import (
+    build_http_session,
+    extract_paging_info,
+    extract_view_state,
+    iter_results_pages,
+    perform_http_search,
+    save_http_session_cookies,
+)
+from handelsregister.metrics import get_metrics
+from handelsregister.session_snapshot import SNAPSHOT_FILE_ENV, SessionSnapshot
+from handelsregister.si_template import SiRequestTemplate, learn_verified
+from handelsregister.throttle import get_limiter
+from handelsregister.utils import (
+    RESULTS_TBODY_ID,
+    SEARCH_NUMBER,
+    SEARCH_TYPE,
+    SEARCH_TOWN,
+    SESSION_COOKIES_FILE,
+    build_driver,
+    collect_links_from_rows,
+    inject_request_interceptor,
+    iter_result_pages,
+    save_session_cookies,
+    wait_for_loading_gone,
+)
+from handelsregister.waits import StepTimer, wait_for_ajax_idle, wait_for_panel
+
+# Jeden silnik wyszukiwania dla wszystkich wejść (SeleniumScraper.run_full_flow, run_etap1_scrape,
+# run_http_search, spider w trybach selenium/http, batch): wspólna konfiguracja (EngineConfig),
+# wymienny backend (przeglądarka albo HTTP) i wspólna pętla stron (SearchEngine.run).
+BACKEND_BROWSER = "browser"
+BACKEND_HTTP = "http"
+DEFAULT_WAIT_TIMEOUT = 15
+# HEADLESS=0 - widoczne okno przeglądarki (debugowanie)
+DEFAULT_HEADLESS = os.environ.get("HEADLESS", "1") != "0"
+# SYNTHESIZE_SI=1 - requesty SI dla stron 2..N generowane z szablonu (si_template) zamiast stronicowania
+DEFAULT_SYNTHESIZE = os.environ.get("SYNTHESIZE_SI", "0") == "1"
+
+
+class EngineConfig:
+    """Parametry wyszukiwania i backendu - jedno miejsce zamiast stałych rozsianych po wejściach."""
+
+    def __init__(
+        self,
+        target_url: str,
+        search_type: str = SEARCH_TYPE,
+        search_number: str = SEARCH_NUMBER,
+        search_town: str = SEARCH_TOWN,
+        backend: str = BACKEND_BROWSER,
+        cookies_file: str = SESSION_COOKIES_FILE,
+        headless: bool = DEFAULT_HEADLESS,
+        wait_timeout: float = DEFAULT_WAIT_TIMEOUT,
+        max_pages: Optional[int] = None,
+        skip_pages: Optional[Set[int]] = None,
+        egress_session: str = DEFAULT_EGRESS_SESSION,
+        error_screenshot: Optional[str] = None,
+        synthesize: bool = DEFAULT_SYNTHESIZE,
+        synthesize_probe: bool = True,
+        snapshot_file: Optional[str] = os.environ.get(SNAPSHOT_FILE_ENV),
+    ):
+        if backend not in BACKENDS:
+            raise ValueError(f"Nieznany backend '{backend}', dostępne: {', '.join(BACKENDS)}")
+        self.target_url = target_url
+        self.search_type = search_type
+        self.search_number = search_number
+        self.search_town = search_town
+        self.backend = backend
+        self.cookies_file = cookies_file
+        self.headless = headless
+        self.wait_timeout = wait_timeout
+        self.max_pages = max_pages
+        self.skip_pages = skip_pages or set()
+        self.egress_session = egress_session
+        self.error_screenshot = error_screenshot
+        # synthesize: strona 1 jest parsowana, reszta wierszy (do rowCount) generowana z szablonu
+        # synthesize_probe: przed generowaniem jeden POST SI dla ostatniego wiersza (tylko backend http)
+        self.synthesize = synthesize
+        self.synthesize_probe = synthesize_probe
+        # Po wyszukiwaniu zapis migawki sesji (session_snapshot) - ciepły start download_files.py
+        self.snapshot_file = snapshot_file
+
+    @property
+    def query(self) -> Dict[str, str]:
+        return {"search_type": self.search_type, "search_number": self.search_number, "search_town": self.search_town}
+
+
+class BrowserBackend:
+    """
+    Wyszukiwanie w przeglądarce (undetected Chrome): Normale Suche → formularz → Suchen → paginator.
+    Przekazany driver (np. z BrowserPool) jest używany ponownie i NIE jest zamykany.
+    """
+
+    name = BACKEND_BROWSER
+
+    def __init__(self, config: EngineConfig, driver=None):
+        self.config = config
+        self.driver = driver
+        self.owns_driver = driver is None
+
+    def open(self, timer: StepTimer):
+        limiter = get_limiter()
+        with timer.step("build_driver"):
+            if self.owns_driver:
+                egress = get_egress_pool()
+                proxy = egress.assign(self.config.egress_session) if egress is not None else None
+                self.driver = build_driver(
+                    proxy=proxy.chrome_server() if proxy else None,
+                    headless=self.config.headless,
+                )
+        with timer.step("main_page"):
+            if self.owns_driver or not self.driver.current_url.startswith(self.config.target_url):
+                with limiter.track():
+                    self.driver.get(self.config.target_url)
+            # Wstrzykujemy JavaScript interceptor PRZED interakcją ze stroną
+            inject_request_interceptor(self.driver)
+
+    def _select_option(self, label_id: str, panel_id: str, option_xpath: str, wait: WebDriverWait):
+        """Rozwija selectOneMenu PrimeFaces, wybiera opcję i czeka na ajax."""
+        wait.until(EC.element_to_be_clickable((By.ID, label_id))).click()
+        wait_for_panel(self.driver, panel_id, visible=True)
+        wait.until(EC.element_to_be_clickable((By.XPATH, option_xpath))).click()
+        wait_for_loading_gone(self.driver)
+        wait_for_ajax_idle(self.driver)
+
+    def search(self, timer: StepTimer):
+        driver = self.driver
+        config = self.config
+        wait = WebDriverWait(driver, config.wait_timeout)
+
+        print("ETAP1 - NORMAL SUCHE")
+        with timer.step("normale_suche"):
+            wait.until(EC.element_to_be_clickable((By.ID, "naviForm:normaleSucheLink"))).click()
+            wait_for_loading_gone(driver)
+            wait_for_ajax_idle(driver)
+
+        # 3. Wypełnianie formularza (INPUT DATA)
+        print("ETAP2 - WYBOR Z FORMULARZA")
+        with timer.step("register_art"):
+            self._select_option(
+                "form:registerArt_label",
+                "form:registerArt_panel",
+                f"//li[contains(text(), '{config.search_type}')]",
+                wait,
+            )
+            try:
+                driver.find_element(By.TAG_NAME, "body").send_keys(Keys.ESCAPE)
+                if not wait_for_panel(driver, "form:registerArt_panel", visible=False):
+                    driver.execute_script("document.body.click();")
+            except Exception:
+                driver.execute_script("document.body.click();")
+
+        with timer.step("register_nummer"):
+            register_input = wait.until(EC.presence_of_element_located((By.ID, "form:registerNummer")))
+            register_input.clear()
+            register_input.send_keys(config.search_number)
+
+        with timer.step("registergericht"):
+            self._select_option(
+                "form:registergericht_label",
+                "form:registergericht_panel",
+                f"//ul[@id='form:registergericht_items']//li[@data-label='{config.search_town}']",
+                wait,
+            )
+
+        # Opcjonalnie: Ustawienie 100 wyników
+        with timer.step("ergebnisse_pro_seite"):
+            try:
+                driver.find_element(By.ID, "form:ergebnisseProSeite_label")
+                self._select_option(
+                    "form:ergebnisseProSeite_label",
+                    "form:ergebnisseProSeite_panel",
+                    "//li[contains(@data-label, '100')]",
+                    wait,
+                )
+            except Exception:
+                print("⚠️ Nie udało się zmienić liczby wyników na 100, zostawiam domyślną.")
+
+        with timer.step("suche"):
+            suche_btn = wait.until(EC.element_to_be_clickable((By.ID, "form:btnSuche")))
+            with get_limiter().track():
+                try:
+                    suche_btn.click()
+                except Exception:
+                    driver.execute_script("arguments[0].click();", suche_btn)
+                # Czekamy na załadowanie tabeli wyników
+                wait.until(EC.presence_of_element_located((By.ID, RESULTS_TBODY_ID)))
+            wait_for_ajax_idle(driver)
+            wait_for_loading_gone(driver)
+
+        # Zapisujemy cookies z aktywnej sesji (potrzebne do późniejszego pobierania plików)
+        save_session_cookies(driver, config.cookies_file)
+        get_limiter().session_started()
+
+    def pages(self) -> Iterator[Tuple[int, list, str]]:
+        # Strony ukończone wcześniej i tak trzeba przeklikać paginatorem - pomija je SearchEngine
+        for page_number, payload in enumerate(iter_result_pages(self.driver, self.config.max_pages), start=1):
+            yield page_number, payload["rows"], payload["url"]
+
+    def paging_info(self) -> Optional[Dict[str, int]]:
+        """rows / rowCount z konfiguracji widgetu DataTable bieżącej strony."""
+        return extract_paging_info(self.driver.page_source)
+
+    def probe_session(self) -> Optional[requests.Session]:
+        # Sesja przeglądarki nie jest requests.Session - próba na żywo pomijana
+        return None
+
+    def snapshot(self, collected_links: list) -> SessionSnapshot:
+        return SessionSnapshot.from_driver(self.driver, self.config.target_url, self.config.query, collected_links)
+
+    def on_error(self, error: Exception):
+        # Zrzut ekranu do debugowania (EngineConfig.error_screenshot)
+        if self.config.error_screenshot and self.driver is not None:
+            try:
+                self.driver.save_screenshot(self.config.error_screenshot)
+            except Exception:
+                pass
+
+    def close(self):
+        if self.owns_driver and self.driver is not None:
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+            self.driver = None
+
+
+class HttpBackend:
+    """Wyszukiwanie bez przeglądarki - ta sama wymiana JSF/PrimeFaces bezpośrednio po HTTP."""
+
+    name = BACKEND_HTTP
+
+    def __init__(self, config: EngineConfig, session: Optional[requests.Session] = None):
+        self.config = config
+        self.session = session
+        self.response: Optional[requests.Response] = None
+
+    def open(self, timer: StepTimer):
+        if self.session is None:
+            self.session = build_http_session(self.config.egress_session)
+
+    def search(self, timer: StepTimer):
+        config = self.config
+        with timer.step("suche"):
+            self.response = perform_http_search(self.session, config.target_url, **config.query)
+        save_http_session_cookies(self.session, config.cookies_file)
+
+    def pages(self) -> Iterator[Tuple[int, list, str]]:
+        current_url = self.response.url.split("#")[0]
+        skip_pages = self.config.skip_pages
+        if self.config.synthesize:
+            # Strona 1 jest potrzebna do nauki szablonu SI, nawet jeśli była ukończona wcześniej
+            skip_pages = skip_pages - {1}
+        pages = iter_results_pages(
+            self.session,
+            self.response.text,
+            current_url,
+            self.config.max_pages,
+            skip_pages=skip_pages,
+        )
+        for page_number, rows in pages:
+            yield page_number, rows, current_url
+
+    def paging_info(self) -> Optional[Dict[str, int]]:
+        return extract_paging_info(self.response.text)
+
+    def probe_session(self) -> Optional[requests.Session]:
+        return self.session
+
+    def snapshot(self, collected_links: list) -> SessionSnapshot:
+        return SessionSnapshot.from_http_session(
+            self.session,
+            self.config.target_url,
+            self.response.url,
+            extract_view_state(self.response.text),
+            self.config.query,
+            collected_links,
+        )
+
+    def on_error(self, error: Exception):
+        pass
+
+    def close(self):
+        pass
+
+
+BACKENDS = {
+    BACKEND_BROWSER: BrowserBackend,
+    BACKEND_HTTP: HttpBackend,
+}
+
+
+class SearchEngine:
+    """
+    Wspólna pętla wyszukiwania: open → search → strony wyników → collected_links.
+    on_page(numer_strony, collected_links_strony) jest wołane po każdej stronie (poza skip_pages).
+    """
+
+    def __init__(self, config: EngineConfig, backend=None, timer: Optional[StepTimer] = None):
+        self.config = config
+        self.backend = backend or BACKENDS[config.backend](config)
+        self.timer = timer if timer is not None else StepTimer(f"engine[{self.backend.name}]")
+        self.collected_links = []
+
+    def run(self, on_page: Optional[Callable[[int, list], None]] = None, raise_errors: bool = False) -> list:
+        """
+        Zwraca collected_links ze wszystkich stron. Przy błędzie zwraca to, co zebrano do tej pory,
+        a przy raise_errors=True zgłasza błąd dalej (np. do CrawlState).
+        """
+        timer = self.timer
+        metrics = get_metrics()
+        backend_name = self.backend.name
+        try:
+            self.backend.open(timer)
+            self.backend.search(timer)
+
+            print("ETAP3 - ZBIERANIE LINKOW SI")
+            extract_started = time.monotonic()
+            pages = self.backend.pages()
+            for page_number, rows, current_url in pages:
+                learn = page_number == 1 and self.config.synthesize
+                if page_number in self.config.skip_pages and not learn:
+                    continue
+                print(f"Strona {page_number}: znaleziono wierszy: {len(rows)}")
+                page_links = collect_links_from_rows(rows, current_url)
+                if page_number not in self.config.skip_pages:
+                    self._add_page(page_number, page_links, on_page)
+                if learn and self._synthesize_pages(rows, page_links, on_page):
+                    pages.close()
+                    break
+            timer.record("extract_rows", time.monotonic() - extract_started)
+            if self.config.snapshot_file:
+                self._save_snapshot()
+
+            print(f"SCRAPOWANIE ZAKONCZONE - SUKCES: Zebrano {len(self.collected_links)} wierszy z linkami SI")
+            total_si_requests = sum(len(item.get("si_links", [])) for item in self.collected_links)
+            print(f"ℹ️ Łącznie przechwycono {total_si_requests} requestów SI z parametrami POST")
+            return self.collected_links
+
+        except Exception as e:
+            print(f"❌ Błąd podczas scrapowania ({self.backend.name}): {e}")
+            metrics.inc("search_errors_total", backend=backend_name, error=type(e).__name__)
+            self.backend.on_error(e)
+            if raise_errors:
+                raise
+            return self.collected_links
+        finally:
+            timer.print_summary()
+            self.backend.close()
+
+    def _save_snapshot(self):
+        """Migawka sesji po wyszukiwaniu - błąd zapisu nie przerywa scrapowania."""
+        try:
+            self.backend.snapshot(self.collected_links).save(self.config.snapshot_file)
+        except Exception as e:
+            print(f"⚠️ Nie udało się zapisać migawki sesji: {e}")
+
+    def _add_page(self, page_number: int, page_links: list, on_page: Optional[Callable[[int, list], None]]):
+        metrics = get_metrics()
+        backend_name = self.backend.name
+        self.collected_links.extend(page_links)
+        metrics.inc("pages_total", backend=backend_name)
+        metrics.inc("rows_total", len(page_links), backend=backend_name)
+        metrics.inc("si_links_total", sum(len(item["si_links"]) for item in page_links), backend=backend_name)
+        if on_page is not None:
+            on_page(page_number, page_links)
+
+    def _learn_template(self, rows: list, page_links: list, paging: Dict[str, int]) -> Optional[SiRequestTemplate]:
+        """Szablon SI ze strony 1 - tylko gdy każdy wiersz ma link SI i próbka (oraz opcjonalnie POST) się zgadza."""
+        if len(page_links) != len(rows):
+            print(f"⚠️ Synteza SI: {len(rows) - len(page_links)} wierszy strony 1 bez linku SI - zostaję przy stronicowaniu")
+            return None
+        template = learn_verified(page_links)
+        if template is None:
+            print("⚠️ Synteza SI: szablon nie zgadza się z próbką wierszy strony 1 - zostaję przy stronicowaniu")
+            return None
+        session = self.backend.probe_session() if self.config.synthesize_probe else None
+        if session is not None and not template.probe(session, paging["row_count"] - 1):
+            print("⚠️ Synteza SI: serwer nie zwrócił pliku dla wiersza spoza strony 1 - zostaję przy stronicowaniu")
+            return None
+        return template
+
+    def _synthesize_pages(self, rows: list, page_links: list, on_page: Optional[Callable[[int, list], None]]) -> bool:
+        """
+        Strony 2..N bez stronicowania: requesty SI generowane z szablonu nauczonego na stronie 1
+        (wiersze mają synthesized=True i nie mają kolumn). False = szablonu nie da się użyć, dalej paginator.
+        """
+        paging = self.backend.paging_info()
+        if paging is None or paging["row_count"] <= paging["rows"]:
+            return False
+        with self.timer.step("synthesize"):
+            template = self._learn_template(rows, page_links, paging)
+            if template is None:
+                get_metrics().inc("synthesize_fallbacks_total", backend=self.backend.name)
+                return False
+
+            page_size, row_count = paging["rows"], paging["row_count"]
+            print(f"ℹ️ Synteza SI: szablon zweryfikowany, generuję wiersze {page_size}..{row_count - 1} bez stronicowania")
+            synthesized = 0
+            for first in range(page_size, row_count, page_size):
+                page_number = first // page_size + 1
+                if self.config.max_pages is not None and page_number > self.config.max_pages:
+                    break
+                if page_number in self.config.skip_pages:
+                    continue
+                page_links = template.synthesize(first, min(first + page_size, row_count))
+                synthesized += len(page_links)
+                self._add_page(page_number, page_links, on_page)
+            get_metrics().inc("synthesized_rows_total", synthesized, backend=self.backend.name)
+        return True
+
+
+def run_search(
+    config: EngineConfig,
+    on_page: Optional[Callable[[int, list], None]] = None,
+    raise_errors: bool = False,
+    timer: Optional[StepTimer] = None,
+    driver=None,
+    session: Optional[requests.Session] = None,
+) -> list:
+    """Uruchamia wyszukiwanie backendem z config (opcjonalnie na przekazanym driverze / sesji)."""
+    if config.backend == BACKEND_BROWSER:
+        backend = BrowserBackend(config, driver=driver)
+    else:
+        backend = HttpBackend(config, session=session)
+    return SearchEngine(config, backend, timer).run(on_page, raise_errors=raise_errors)
+
+
+def run_etap1_scrape(
+    target_url: str,
+    cookies_file: str = SESSION_COOKIES_FILE,
+    search_type: str = SEARCH_TYPE,
+    search_number: str = SEARCH_NUMBER,
+    search_town: str = SEARCH_TOWN,
+    driver=None,
+    timer: Optional[StepTimer] = None,
+    on_page: Optional[Callable[[int, list], None]] = None,
+    max_pages: Optional[int] = None,
+    skip_pages: Optional[Set[int]] = None,
+    raise_errors: bool = False,
+    synthesize: bool = DEFAULT_SYNTHESIZE,
+) -> list:
+    """
+    Wyszukiwanie w przeglądarce (backend browser) - zwraca collected_links ze wszystkich stron.
+    Jeśli podano driver (np. z BrowserPool), jest używany ponownie i NIE jest zamykany na końcu.
+    """
+    config = EngineConfig(
+        target_url,
+        search_type,
+        search_number,
+        search_town,
+        backend=BACKEND_BROWSER,
+        cookies_file=cookies_file,
+        max_pages=max_pages,
+        skip_pages=skip_pages,
+        synthesize=synthesize,
+    )
+    timer = timer if timer is not None else StepTimer("run_etap1_scrape")
+    return run_search(config, on_page, raise_errors=raise_errors, timer=timer, driver=driver)
+
+
+def run_http_search(
+    target_url: str,
+    search_type: str = SEARCH_TYPE,
+    search_number: str = SEARCH_NUMBER,
+    search_town: str = SEARCH_TOWN,
+    session: Optional[requests.Session] = None,
+    cookies_file: str = SESSION_COOKIES_FILE,
+    on_page: Optional[Callable[[int, list], None]] = None,
+    max_pages: Optional[int] = None,
+    skip_pages: Optional[Set[int]] = None,
+    synthesize: bool = DEFAULT_SYNTHESIZE,
+    raise_errors: bool = False,
+) -> list:
+    """
+    Odpowiednik run_etap1_scrape bez przeglądarki (backend http) - ta sama struktura collected_links.
+    Cookies sesji są zapisywane do cookies_file, więc download_file_with_post działa bez zmian.
+    raise_errors=True zgłasza błąd wyszukiwania / stronicowania dalej zamiast zwracać częściowe wyniki
+    (np. żeby CrawlState nie oznaczył przerwanego zapytania jako ukończone).
+    """
+    config = EngineConfig(
+        target_url,
+        search_type,
+        search_number,
+        search_town,
+        backend=BACKEND_HTTP,
+        cookies_file=cookies_file,
+        max_pages=max_pages,
+        skip_pages=skip_pages,
+        synthesize=synthesize,
+    )
+    return run_search(config, on_page, raise_errors=raise_errors, timer=StepTimer("run_http_search"), session=session)
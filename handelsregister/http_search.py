@@ -0,0 +1,341 @@
+import json
+import os
+import re
+import xml.etree.ElementTree as ET
+from typing import Optional, Dict, Tuple, Callable, Iterator, Set
+from urllib.parse import urljoin
+
+import requests
+from parsel import Selector
+
+from handelsregister.utils import (
+    SEARCH_NUMBER,
+    SEARCH_TYPE,
+    SEARCH_TOWN,
+    SESSION_COOKIES_FILE,
+    RESULTS_TABLE_ID,
+    RESULTS_TBODY_ID,
+    collect_links_from_rows,
+)
+from handelsregister.results_parser import parse_result_rows, parse_results_html
+from handelsregister.egress import DEFAULT_EGRESS_SESSION, bind_default
+from handelsregister.onclick_parser import submit_params
+from handelsregister.throttle import mount_throttled, session_started
+
+# Tryb bez przeglądarki: ta sama wymiana JSF/PrimeFaces co w run_etap1_scrape, ale bezpośrednio po HTTP
+WELCOME_PATH = "rp_web/welcome.xhtml"
+HTTP_TIMEOUT = 30
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "de-DE,de;q=0.9,en-US;q=0.8,en;q=0.7",
+}
+
+# Stronicowanie tabeli wyników: ajax POST PrimeFaces DataTable (partial/ajax) zamiast pełnego przeładowania
+PARTIAL_HEADERS = {
+    "Faces-Request": "partial/ajax",
+    "X-Requested-With": "XMLHttpRequest",
+    "Accept": "application/xml, text/xml, */*; q=0.01",
+}
+# Ile znaków za id tabeli szukamy konfiguracji paginatora w PrimeFaces.cw("DataTable", ...)
+PAGING_CONFIG_WINDOW = 4000
+_ROW_COUNT_RE = re.compile(r"\browCount\s*:\s*(\d+)")
+_PAGE_ROWS_RE = re.compile(r"\brows\s*:\s*(\d+)")
+
+
+def build_http_session(session_id: str = DEFAULT_EGRESS_SESSION, **adapter_kwargs) -> requests.Session:
+    """
+    Tworzy sesję requests z nagłówkami przeglądarki (cookies JSESSIONID trzymane w sesji).
+    Każde żądanie przechodzi przez limiter (handelsregister.throttle), a przy skonfigurowanej
+    puli wyjść - przez proxy przydzielone session_id (handelsregister.egress).
+    adapter_kwargs trafiają do HTTPAdapter (np. pool_maxsize).
+    """
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    mount_throttled(session, **adapter_kwargs)
+    bind_default(session, session_id)
+    return session
+
+
+def welcome_url(target_url: str) -> str:
+    """Zwraca URL strony startowej JSF (rp_web/welcome.xhtml) dla podanego TARGET_URL."""
+    if target_url.rstrip("/").endswith(".xhtml"):
+        return target_url
+    return urljoin(target_url.rstrip("/") + "/", WELCOME_PATH)
+
+
+def extract_view_state(html: str) -> Optional[str]:
+    """Wyciąga javax.faces.ViewState ze strony (pierwszy hidden input o tej nazwie)."""
+    return Selector(text=html).xpath("//input[@name='javax.faces.ViewState']/@value").get()
+
+
+def collect_form_fields(html: str, form_id: str) -> Tuple[Optional[str], Dict[str, str]]:
+    """
+    Zbiera pola formularza JSF tak, jak wysłałaby je przeglądarka (inputy, selecty, textarea).
+    Zwraca tuple: (action formularza, słownik pól).
+    """
+    form = Selector(text=html).xpath(f"//form[@id='{form_id}']")
+    if not form:
+        return None, {}
+
+    fields = {}
+    for field in form.xpath(".//input[@name]"):
+        input_type = (field.attrib.get("type") or "text").lower()
+        if input_type in ("submit", "button", "image", "reset", "file"):
+            continue
+        if input_type in ("checkbox", "radio") and "checked" not in field.attrib:
+            continue
+        fields[field.attrib["name"]] = field.attrib.get("value", "")
+
+    for select in form.xpath(".//select[@name]"):
+        selected = select.xpath("./option[@selected]/@value").get()
+        if selected is None:
+            selected = select.xpath("./option/@value").get() or ""
+        fields[select.attrib["name"]] = selected
+
+    for textarea in form.xpath(".//textarea[@name]"):
+        fields[textarea.attrib["name"]] = textarea.xpath("string(.)").get() or ""
+
+    return form.attrib.get("action"), fields
+
+
+def find_option_value(html: str, select_id: str, label: str) -> Optional[str]:
+    """
+    Szuka wartości opcji w ukrytym <select> komponentu p:selectOneMenu (np. form:registerArt_input).
+    Najpierw dokładne dopasowanie etykiety, potem zawieranie (jak XPath contains() w Selenium).
+    """
+    options = Selector(text=html).xpath(f"//select[@id='{select_id}']/option")
+    label = label.strip()
+    for option in options:
+        if option.xpath("normalize-space(.)").get() == label:
+            return option.attrib.get("value", "")
+    for option in options:
+        if label in (option.xpath("normalize-space(.)").get() or ""):
+            return option.attrib.get("value", "")
+    return None
+
+
+def extract_submit_params(html: str, element_id: str) -> Dict[str, str]:
+    """Wyciąga parametry PrimeFaces.addSubmitParam z onclick elementu (np. naviForm:normaleSucheLink)."""
+    onclick = Selector(text=html).xpath(f"//*[@id='{element_id}']/@onclick").get() or ""
+    return submit_params(onclick) or {element_id: element_id}
+
+
+def submit_form(
+    session: requests.Session,
+    html: str,
+    page_url: str,
+    form_id: str,
+    overrides: Dict[str, str],
+) -> requests.Response:
+    """Wysyła formularz JSF (POST) z aktualnym ViewState i nadpisanymi polami."""
+    action, fields = collect_form_fields(html, form_id)
+    if action is None:
+        raise ValueError(f"Nie znaleziono formularza {form_id} na stronie {page_url}")
+
+    fields.update(overrides)
+    post_url = urljoin(page_url, action) if action else page_url
+    headers = {
+        "Content-Type": "application/x-www-form-urlencoded",
+        "Referer": page_url,
+    }
+    response = session.post(post_url, data=fields, headers=headers, allow_redirects=True, timeout=HTTP_TIMEOUT)
+    response.raise_for_status()
+    return response
+
+
+def parse_results_page(html: str, current_url: str) -> list:
+    """Parsuje tabelę wyników (HTML) do struktury collected_links, jak run_etap1_scrape."""
+    return parse_results_html(html, current_url)
+
+
+def extract_paging_info(html: str, table_id: str = RESULTS_TABLE_ID) -> Optional[Dict[str, int]]:
+    """
+    Odczytuje z konfiguracji widgetu DataTable (paginator: {rows: 100, rowCount: 357, ...})
+    liczbę wierszy na stronę i łączną liczbę wyników. None = brak paginatora (jedna strona).
+    """
+    marker = re.search(r"""id\s*:\s*["']%s["']""" % re.escape(table_id), html)
+    if not marker:
+        return None
+    config = html[marker.end():marker.end() + PAGING_CONFIG_WINDOW]
+    row_count = _ROW_COUNT_RE.search(config)
+    rows = _PAGE_ROWS_RE.search(config)
+    if not row_count or not rows or int(rows.group(1)) <= 0:
+        return None
+    return {"rows": int(rows.group(1)), "row_count": int(row_count.group(1))}
+
+
+def page_request_fields(form_fields: Dict[str, str], first: int, rows: int, table_id: str = RESULTS_TABLE_ID) -> Dict[str, str]:
+    """Pola ajax POST stronicowania (to samo wysyła PrimeFaces po kliknięciu w paginator)."""
+    fields = dict(form_fields)
+    fields.update({
+        "javax.faces.partial.ajax": "true",
+        "javax.faces.source": table_id,
+        "javax.faces.partial.execute": table_id,
+        "javax.faces.partial.render": table_id,
+        "javax.faces.behavior.event": "page",
+        "javax.faces.partial.event": "page",
+        table_id: table_id,
+        f"{table_id}_pagination": "true",
+        f"{table_id}_first": str(first),
+        f"{table_id}_rows": str(rows),
+        f"{table_id}_skipChildren": "true",
+        f"{table_id}_encodeFeature": "true",
+    })
+    return fields
+
+
+def parse_partial_response(content: bytes, table_id: str = RESULTS_TABLE_ID, tbody_id: str = RESULTS_TBODY_ID) -> Tuple[list, Optional[str]]:
+    """
+    Parsuje <partial-response> stronicowania: wiersze <tr> z <update id=table_id> (CDATA)
+    i nowy ViewState. Zwraca tuple: (wiersze jak parse_result_rows, ViewState lub None).
+    """
+    root = ET.fromstring(content)
+    error = root.find(".//error")
+    if error is not None:
+        raise ValueError(f"Błąd JSF przy stronicowaniu: {error.findtext('error-message') or error.findtext('error-name')}")
+
+    updates = {update.get("id"): update.text or "" for update in root.iter("update")}
+    if table_id not in updates:
+        raise ValueError(f"Brak aktualizacji tabeli {table_id} w odpowiedzi stronicowania")
+
+    view_state = next((value for key, value in updates.items() if "javax.faces.ViewState" in key), None)
+    rows_html = f'<table><tbody id="{tbody_id}">{updates[table_id]}</tbody></table>'
+    return parse_result_rows(rows_html, tbody_id), view_state
+
+
+def iter_results_pages(
+    session: requests.Session,
+    html: str,
+    page_url: str,
+    max_pages: Optional[int] = None,
+    table_id: str = RESULTS_TABLE_ID,
+    skip_pages: Optional[Set[int]] = None,
+) -> Iterator[Tuple[int, list]]:
+    """
+    Generator (numer_strony, wiersze) kolejnych stron wyników: najpierw strona z html, potem ajax POST-y
+    stronicowania (first = rows, 2*rows, ...) aż do rowCount. Strony są pobierane dopiero, gdy wywołujący
+    po nie sięgnie; strony z skip_pages (ukończone wcześniej, CrawlState) są pomijane bez requestu.
+    """
+    skip_pages = skip_pages or set()
+    if 1 not in skip_pages:
+        yield 1, parse_result_rows(html)
+
+    paging = extract_paging_info(html, table_id)
+    if paging is None or paging["row_count"] <= paging["rows"]:
+        return
+
+    action, form_fields = collect_form_fields(html, "ergebnissForm")
+    post_url = urljoin(page_url, action) if action else page_url
+    headers = dict(PARTIAL_HEADERS, Referer=page_url)
+    print(f"ℹ️ Wyników: {paging['row_count']}, stron: {-(-paging['row_count'] // paging['rows'])}")
+
+    for first in range(paging["rows"], paging["row_count"], paging["rows"]):
+        page_number = first // paging["rows"] + 1
+        if max_pages is not None and page_number > max_pages:
+            return
+        if page_number in skip_pages:
+            continue
+        fields = page_request_fields(form_fields, first, paging["rows"], table_id)
+        response = session.post(post_url, data=fields, headers=headers, timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+        rows, view_state = parse_partial_response(response.content, table_id)
+        if view_state:
+            form_fields["javax.faces.ViewState"] = view_state
+        yield page_number, rows
+        if not rows:
+            return
+
+
+def collect_all_pages(
+    session: requests.Session,
+    response: requests.Response,
+    on_page: Optional[Callable[[int, list], None]] = None,
+    max_pages: Optional[int] = None,
+    collected_links: Optional[list] = None,
+    skip_pages: Optional[Set[int]] = None,
+) -> list:
+    """
+    Zbiera collected_links ze wszystkich stron; on_page(numer_strony, collected_links_strony) po każdej stronie.
+    Jeśli podano collected_links, wiersze są dopisywane na bieżąco (błąd na stronie N zostawia strony 1..N-1).
+    """
+    current_url = response.url.split("#")[0]
+    collected_links = [] if collected_links is None else collected_links
+    pages = iter_results_pages(session, response.text, current_url, max_pages, skip_pages=skip_pages)
+    for page_number, rows in pages:
+        print(f"Strona {page_number}: znaleziono wierszy: {len(rows)}")
+        page_links = collect_links_from_rows(rows, current_url)
+        collected_links.extend(page_links)
+        if on_page is not None:
+            on_page(page_number, page_links)
+    return collected_links
+
+
+def save_http_session_cookies(session: requests.Session, cookies_file: str = SESSION_COOKIES_FILE) -> bool:
+    """Zapisuje cookies sesji requests w formacie Selenium (lista dictów), zgodnym z load_session_cookies."""
+    try:
+        cookies = [
+            {"name": c.name, "value": c.value, "domain": c.domain, "path": c.path}
+            for c in session.cookies
+        ]
+        os.makedirs(os.path.dirname(cookies_file) or ".", exist_ok=True)
+        with open(cookies_file, "w", encoding="utf-8") as f:
+            json.dump(cookies, f, ensure_ascii=False, separators=(",", ":"))
+        print(f"✅ Zapisano {len(cookies)} cookies do {cookies_file}")
+        return True
+    except Exception as e:
+        print(f"⚠️ Błąd przy zapisywaniu cookies: {e}")
+        return False
+
+
+def perform_http_search(
+    session: requests.Session,
+    target_url: str,
+    search_type: str = SEARCH_TYPE,
+    search_number: str = SEARCH_NUMBER,
+    search_town: str = SEARCH_TOWN,
+) -> requests.Response:
+    """
+    Wykonuje wyszukiwanie po HTTP: welcome → Normale Suche → formularz → Suchen.
+    Zwraca response strony wyników (sucheErgebnisse/welcome.xhtml?cid=...).
+    """
+    # 1. main_page - GET strony startowej (JSESSIONID + ViewState)
+    start_url = welcome_url(target_url)
+    response = session.get(start_url, timeout=HTTP_TIMEOUT)
+    response.raise_for_status()
+    if not extract_view_state(response.text):
+        raise ValueError("Brak javax.faces.ViewState na stronie startowej")
+
+    # 2. search_page - "Normale Suche" to commandLink w naviForm
+    print("ETAP1 - NORMAL SUCHE (HTTP)")
+    navi_params = extract_submit_params(response.text, "naviForm:normaleSucheLink")
+    response = submit_form(session, response.text, response.url, "naviForm", navi_params)
+
+    # 3. input - wypełniamy formularz tak jak Selenium
+    print("ETAP2 - WYBOR Z FORMULARZA (HTTP)")
+    html = response.text
+    register_art = find_option_value(html, "form:registerArt_input", search_type)
+    if register_art is None:
+        raise ValueError(f"Nie znaleziono Registerart '{search_type}' w formularzu")
+    gericht = find_option_value(html, "form:registergericht_input", search_town)
+    if gericht is None:
+        raise ValueError(f"Nie znaleziono Registergericht '{search_town}' w formularzu")
+
+    overrides = {
+        "form:registerArt_input": register_art,
+        "form:registerNummer": search_number,
+        "form:registergericht_input": gericht,
+        "form:btnSuche": "",
+    }
+    per_page = find_option_value(html, "form:ergebnisseProSeite_input", "100")
+    if per_page is not None:
+        overrides["form:ergebnisseProSeite_input"] = per_page
+    else:
+        print("⚠️ Nie udało się zmienić liczby wyników na 100, zostawiam domyślną.")
+
+    # 4. search_request - Suchen
+    response = submit_form(session, html, response.url, "form", overrides)
+    # Nowa konwersacja JSF - jej wygaśnięcie (440) limitery sesji policzą osobno
+    session_started(session)
+    return response
@@ -2,6 +2,22 @@ import scrapy
 
 
 class HandelsItem(scrapy.Item):
+    """Jeden wiersz tabeli wyników z linkami SI."""
     row_number = scrapy.Field()
-    links = scrapy.Field()  # Lista słowników z href, text, title
+    links = scrapy.Field()  # Lista słowników (link_info) z href, text, title, request, ...
+    columns = scrapy.Field()  # Teksty kolumn wiersza (sąd, firma, siedziba, status)
+    results_url = scrapy.Field()
+    query = scrapy.Field()  # {"search_type", "search_number", "search_town"}
+    scraped_at = scrapy.Field()
 
+
+class DocumentItem(scrapy.Item):
+    """Pobrany dokument (np. SI) dla wiersza wyników."""
+    row_number = scrapy.Field()
+    link_id = scrapy.Field()
+    document_type = scrapy.Field()  # np. "SI"
+    file_name = scrapy.Field()
+    file_path = scrapy.Field()
+    size = scrapy.Field()
+    status = scrapy.Field()  # kod HTTP odpowiedzi
+    downloaded_at = scrapy.Field()
@@ -0,0 +1,146 @@
+import json
+import os
+import threading
+from typing import Optional, Dict, Any, Callable, Iterator
+
+# Zapis przyrostowy wyników: jeden rekord JSON na linię, dopisywany od razu po wyciągnięciu wiersza.
+# Awaria w połowie zostawia wszystko, co zebrano do tej pory; legacy {"count", "items"} powstaje na końcu
+# przez jsonl_to_legacy.
+DEFAULT_FSYNC_EVERY = 50
+INDEX_SUFFIX = ".idx"
+
+
+def default_record_key(record: Dict[str, Any]) -> Optional[str]:
+    """Klucz do indeksu: row_number (wiersz wyników) albo key (rekord batch)."""
+    key = record.get("row_number", record.get("key"))
+    return None if key is None else str(key)
+
+
+class JsonlWriter:
+    """
+    Append-only writer JSONL (bezpieczny wątkowo).
+    Każdy rekord jest od razu flushowany do systemu, a fsync wykonywany co fsync_every rekordów i przy close.
+    Opcjonalny kompaktowy indeks (plik .idx: "klucz<TAB>offset<TAB>długość") pozwala czytać pojedyncze
+    rekordy bez parsowania całego pliku (read_record).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fsync_every: int = DEFAULT_FSYNC_EVERY,
+        index: bool = False,
+        key_func: Callable[[Dict[str, Any]], Optional[str]] = default_record_key,
+        truncate: bool = False,
+    ):
+        self.path = path
+        self.fsync_every = fsync_every
+        self.key_func = key_func
+        self.count = 0
+        self._pending = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        mode = "wb" if truncate else "ab"
+        self._file = open(path, mode)
+        self._offset = self._file.seek(0, os.SEEK_END)
+        self.index_path = path + INDEX_SUFFIX if index else None
+        self._index = open(self.index_path, "w" if truncate else "a", encoding="utf-8") if index else None
+
+    def write(self, record: Dict[str, Any]) -> int:
+        """Dopisuje rekord i zwraca jego offset w pliku."""
+        line = (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+        with self._lock:
+            offset = self._offset
+            self._file.write(line)
+            self._file.flush()
+            self._offset += len(line)
+            self.count += 1
+
+            if self._index is not None:
+                key = self.key_func(record)
+                if key is not None:
+                    self._index.write(f"{key}\t{offset}\t{len(line)}\n")
+                    self._index.flush()
+
+            self._pending += 1
+            if self._pending >= self.fsync_every:
+                self._sync()
+        return offset
+
+    def write_many(self, records: list):
+        for record in records:
+            self.write(record)
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        if self._index is not None:
+            os.fsync(self._index.fileno())
+        self._pending = 0
+
+    def close(self):
+        with self._lock:
+            if self._file.closed:
+                return
+            self._sync()
+            self._file.close()
+            if self._index is not None:
+                self._index.close()
+
+    def __enter__(self) -> "JsonlWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def iter_jsonl(path: str) -> Iterator[Dict[str, Any]]:
+    """Czyta rekordy JSONL; urwana ostatnia linia (awaria w trakcie zapisu) jest pomijana."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                print(f"⚠️ Pominięto uszkodzony rekord {path}:{line_number}")
+
+
+def load_index(path: str) -> Dict[str, tuple]:
+    """Wczytuje indeks .idx -> {klucz: (offset, długość)} (ostatni wpis dla klucza wygrywa)."""
+    index_path = path if path.endswith(INDEX_SUFFIX) else path + INDEX_SUFFIX
+    index = {}
+    with open(index_path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) == 3:
+                index[parts[0]] = (int(parts[1]), int(parts[2]))
+    return index
+
+
+def read_record(path: str, offset: int, length: int) -> Dict[str, Any]:
+    """Czyta pojedynczy rekord spod offsetu z indeksu."""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        return json.loads(f.read(length).decode("utf-8"))
+
+
+def jsonl_to_legacy(jsonl_path: str, output_json: str) -> Dict[str, Any]:
+    """Konwertuje JSONL do dotychczasowego formatu {"count", "items"} (result.json / results/items.json)."""
+    items = list(iter_jsonl(jsonl_path)) if os.path.exists(jsonl_path) else []
+    wynik = {"count": len(items), "items": items}
+    os.makedirs(os.path.dirname(output_json) or ".", exist_ok=True)
+    with open(output_json, "w", encoding="utf-8") as f:
+        json.dump(wynik, f, indent=4, ensure_ascii=False)
+    return wynik
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Konwersja JSONL do formatu {count, items}")
+    parser.add_argument("jsonl_path")
+    parser.add_argument("output_json")
+    args = parser.parse_args()
+
+    wynik = jsonl_to_legacy(args.jsonl_path, args.output_json)
+    print(f"✅ Zapisano {wynik['count']} rekordów do {args.output_json}")
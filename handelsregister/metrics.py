@@ -0,0 +1,198 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Dict, Any, Iterator, Tuple
+
+# Metryki przebiegu (liczniki + histogramy czasów) w formacie tekstowym Prometheusa:
+# plik (METRICS_FILE, np. dla node_exporter textfile collector), endpoint HTTP (serve_prometheus)
+# albo statystyki Scrapy (export_to_stats). Bez zależności - tylko biblioteka standardowa.
+METRICS_PREFIX = "handelsregister"
+METRICS_FILE_ENV = "METRICS_FILE"
+METRICS_PORT_ENV = "METRICS_PORT"
+# Kubełki czasu w sekundach: od pojedynczego execute_script do startu Chrome / timeoutów czekania
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+HELP = {
+    "step_seconds": "Czas kroku przepływu (StepTimer)",
+    "span_seconds": "Czas operacji (build_driver, extract_rows_script, download, ...)",
+    "span_errors_total": "Operacje zakończone wyjątkiem",
+    "http_request_seconds": "Czas żądania HTTP do nagłówków odpowiedzi",
+    "http_requests_total": "Żądania HTTP według statusu (none = timeout / błąd połączenia)",
+    "throttle_wait_seconds_total": "Łączny czas czekania na token limitera (throttle)",
+    "pages_total": "Przetworzone strony wyników",
+    "rows_total": "Wiersze z linkami SI",
+    "si_links_total": "Linki SI z parametrami POST",
+    "search_errors_total": "Wyszukiwania przerwane błędem",
+    "synthesized_rows_total": "Wiersze z requestami SI wygenerowanymi z szablonu (bez stronicowania)",
+    "synthesize_fallbacks_total": "Szablony SI odrzucone przy weryfikacji (powrót do stronicowania)",
+    "session_expired_total": "Odpowiedzi 440 (wygasła sesja JSF)",
+    "session_refreshes_total": "Odnowienia sesji",
+    "download_retries_total": "Ponowienia pobrań SI",
+    "download_seconds": "Czas pobrania jednego pliku SI (z ponowieniami i odnowieniem sesji)",
+    "downloads_total": "Pobrania SI według wyniku",
+    "download_bytes_total": "Bajty zapisanych plików SI",
+    "warm_start_seconds": "Wczytanie migawki sesji i zbudowanie sesji pobierania (z próbą ważności)",
+    "wait_timeouts_total": "Czekania zakończone timeoutem (wait_for_loading_gone, wait_for_ajax_idle, ...)",
+}
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, Any]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = (value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class MetricsRegistry:
+    """Liczniki i histogramy z etykietami; bezpieczne dla wątków."""
+
+    def __init__(self, prefix: str = METRICS_PREFIX, buckets: tuple = DEFAULT_BUCKETS):
+        self.prefix = prefix
+        self.buckets = buckets
+        self.counters: Dict[str, Dict[LabelKey, float]] = {}
+        # nazwa -> etykiety -> [liczniki kubełków..., sum, count]
+        self.histograms: Dict[str, Dict[LabelKey, list]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name: str, value: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self.histograms.setdefault(name, {})
+            state = series.get(key)
+            if state is None:
+                state = series[key] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    @contextmanager
+    def span(self, name: str, **labels) -> Iterator[None]:
+        """Mierzy blok jako span_seconds{span=name}; wyjątek liczy też span_errors_total."""
+        started = time.monotonic()
+        try:
+            yield
+        except Exception:
+            self.inc("span_errors_total", span=name, **labels)
+            raise
+        finally:
+            self.observe("span_seconds", time.monotonic() - started, span=name, **labels)
+
+    def value(self, name: str, **labels) -> float:
+        with self._lock:
+            return self.counters.get(name, {}).get(_label_key(labels), 0)
+
+    def render_prometheus(self) -> str:
+        """Format tekstowy Prometheusa (exposition format 0.0.4)."""
+        lines = []
+        with self._lock:
+            for name in sorted(self.counters):
+                full_name = f"{self.prefix}_{name}"
+                lines.append(f"# HELP {full_name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {full_name} counter")
+                for key, value in sorted(self.counters[name].items()):
+                    lines.append(f"{full_name}{_format_labels(key)} {value:g}")
+            for name in sorted(self.histograms):
+                full_name = f"{self.prefix}_{name}"
+                lines.append(f"# HELP {full_name} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {full_name} histogram")
+                for key, state in sorted(self.histograms[name].items()):
+                    for bound, count in zip(self.buckets, state):
+                        lines.append(f"{full_name}_bucket{_format_labels(key, ('le', f'{bound:g}'))} {count}")
+                    lines.append(f"{full_name}_bucket{_format_labels(key, ('le', '+Inf'))} {state[-1]}")
+                    lines.append(f"{full_name}_sum{_format_labels(key)} {state[-2]:.6f}")
+                    lines.append(f"{full_name}_count{_format_labels(key)} {state[-1]}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path: str):
+        """Zapis atomowy (tmp + replace), żeby kolektor nie przeczytał połowy pliku."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Płaski słownik {"nazwa{etykiety}": wartość}; histogramy jako _count i _sum."""
+        result = {}
+        with self._lock:
+            for name, series in self.counters.items():
+                for key, value in series.items():
+                    result[f"{name}{_format_labels(key)}"] = value
+            for name, series in self.histograms.items():
+                for key, state in series.items():
+                    result[f"{name}_count{_format_labels(key)}"] = state[-1]
+                    result[f"{name}_sum{_format_labels(key)}"] = round(state[-2], 3)
+        return result
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+_default_registry = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    """Domyślny rejestr procesu - wspólny dla silnika, pobierania, limitera i spidera."""
+    return _default_registry
+
+
+def serve_prometheus(port: int, registry: Optional[MetricsRegistry] = None, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Endpoint /metrics w wątku w tle; zwraca serwer (shutdown() zatrzymuje)."""
+    registry = registry or get_metrics()
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"📈 Metryki Prometheus: http://{host}:{server.server_address[1]}/metrics")
+    return server
+
+
+def start_from_env() -> Optional[ThreadingHTTPServer]:
+    """Uruchamia endpoint, jeśli ustawiono METRICS_PORT."""
+    port = os.environ.get(METRICS_PORT_ENV)
+    return serve_prometheus(int(port)) if port else None
+
+
+def write_from_env(registry: Optional[MetricsRegistry] = None) -> Optional[str]:
+    """Zapisuje metryki do METRICS_FILE, jeśli ustawiono. Zwraca ścieżkę albo None."""
+    path = os.environ.get(METRICS_FILE_ENV)
+    if path:
+        (registry or get_metrics()).write_prometheus(path)
+        print(f"📈 Zapisano metryki do {path}")
+    return path
+
+
+def export_to_stats(stats, registry: Optional[MetricsRegistry] = None, prefix: str = f"{METRICS_PREFIX}/"):
+    """Przepisuje metryki do statystyk Scrapy (crawler.stats), np. handelsregister/rows_total."""
+    for name, value in (registry or get_metrics()).snapshot().items():
+        stats.set_value(prefix + name, value)
@@ -0,0 +1,32 @@
+from handelsregister.throttle import BACKOFF_MAX, THROTTLE_STATUSES, backoff_delay
+
+# AutoThrottle dopasowuje opóźnienie tylko do latencji i nie zmniejsza go po odpowiedziach != 200,
+# ale też nie zwiększa go po 429/440/503 - to robi BackoffMiddleware (per slot pobierania).
+
+
+class BackoffMiddleware:
+    """Po sygnale przeciążenia wydłuża opóźnienie slotu (wykładniczo, z jitterem); sukces zeruje licznik."""
+
+    def __init__(self, max_delay: float = BACKOFF_MAX):
+        self.max_delay = max_delay
+        self.failures = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.settings.getfloat("AUTOTHROTTLE_MAX_DELAY", BACKOFF_MAX))
+
+    def process_response(self, request, response, spider):
+        key = request.meta.get("download_slot")
+        slot = spider.crawler.engine.downloader.slots.get(key)
+        if slot is None:
+            return response
+
+        if response.status in THROTTLE_STATUSES or response.status >= 500:
+            self.failures[key] = self.failures.get(key, 0) + 1
+            slot.delay = min(self.max_delay, slot.delay + backoff_delay(self.failures[key]))
+            spider.logger.warning(
+                "Status %d - zwalniam slot %s do %.2f s (błąd nr %d)", response.status, key, slot.delay, self.failures[key]
+            )
+        else:
+            self.failures[key] = 0
+        return response
@@ -0,0 +1,127 @@
+import re
+from functools import lru_cache
+from typing import Optional, Dict, Tuple
+from urllib.parse import urlencode
+
+# Parser onclick linków PrimeFaces, np.:
+#   PrimeFaces.addSubmitParam('ergebnissForm',{'ergebnissForm:selectedSuchErgebnisFormTable:7:j_idt161:4:fade_':
+#   'ergebnissForm:selectedSuchErgebnisFormTable:7:j_idt161:4:fade_','property':'Global.Dokumentart.SI'})
+#   .submit('ergebnissForm');return false;
+# Na stronie wyników onclick różni się między wierszami tylko indeksem wiersza, więc wynik parsowania
+# jest zapamiętywany per szablon (indeks zastąpiony znacznikiem) - regexy parametrów idą raz na szablon, nie na link.
+SI_PROPERTY = "Global.Dokumentart.SI"
+DEFAULT_FORM_NAME = "ergebnissForm"
+ONCLICK_CACHE_SIZE = 4096
+
+_PARAM_PAIR_RE = re.compile(r"'([^']+)':\s*'([^']*)'")
+_SUBMIT_FORM_RE = re.compile(r"submit\(['\"]([^'\"]+)['\"]\)")
+_ROW_INDEX_RE = re.compile(r"(?<=SuchErgebnisFormTable:)(\d+)(?=:)")
+# Znacznik indeksu wiersza w szablonie - znak spoza onclick (nie koliduje z treścią);
+# ten sam znacznik w szablonach si_template, więc oba formaty są zgodne
+ROW_MARK = "\x00"
+
+
+class OnclickRequest:
+    """Request POST odczytany z onclick (bez kopii post_data / URL z parametrami - wyliczane na żądanie)."""
+
+    __slots__ = ("url", "form_name", "property", "parameters")
+
+    def __init__(self, url: str, form_name: str, property: Optional[str], parameters: Dict[str, str]):
+        self.url = url
+        self.form_name = form_name
+        self.property = property
+        self.parameters = parameters
+
+    @property
+    def is_si(self) -> bool:
+        return self.property == SI_PROPERTY
+
+    @property
+    def post_data(self) -> str:
+        """Surowe body POST (k=v&k=v, jak w przechwyconym requeście)."""
+        return "&".join(f"{key}={value}" for key, value in self.parameters.items())
+
+    @property
+    def url_with_params(self) -> str:
+        """URL z parametrami jako GET - tylko informacyjnie (serwer wymaga POST)."""
+        return f"{self.url}?{urlencode(self.parameters)}"
+
+    def to_request(self) -> Dict[str, object]:
+        """Słownik link_info["request"] (method, url, content_type, parameters)."""
+        return {
+            "method": "POST",
+            "url": self.url,
+            "content_type": "application/x-www-form-urlencoded",
+            "parameters": self.parameters,
+        }
+
+    def __repr__(self) -> str:
+        return f"OnclickRequest({self.url!r}, {self.form_name!r}, {self.property!r}, {self.parameters!r})"
+
+
+@lru_cache(maxsize=ONCLICK_CACHE_SIZE)
+def _parse_template(template: str) -> Tuple[Optional[str], Optional[str], Tuple[Tuple[str, str], ...], bool]:
+    """Parsuje szablon onclick raz: (form_name, property, pary parametrów, czy zawiera znacznik wiersza)."""
+    form_match = _SUBMIT_FORM_RE.search(template)
+    pairs = tuple((key.strip(), value) for key, value in _PARAM_PAIR_RE.findall(template))
+    property_value = next((value for key, value in pairs if key == "property"), None)
+    return (
+        form_match.group(1) if form_match else None,
+        property_value,
+        pairs,
+        ROW_MARK in template,
+    )
+
+
+def _template(onclick: str) -> Tuple[str, Optional[str]]:
+    """(szablon, indeks wiersza) - indeks wycinany tylko, gdy wszystkie wystąpienia są takie same."""
+    # Jeden przebieg: split z grupą zwraca [tekst, indeks, tekst, indeks, ..., tekst]
+    parts = _ROW_INDEX_RE.split(onclick)
+    indices = set(parts[1::2])
+    if len(indices) != 1:
+        return onclick, None
+    return ROW_MARK.join(parts[0::2]), indices.pop()
+
+
+def parse_onclick(onclick: str) -> Optional[Tuple[Optional[str], Optional[str], Dict[str, str]]]:
+    """
+    (form_name, property, parametry POST) z onclick PrimeFaces; None, gdy onclick nie dotyczy PrimeFaces.
+    form_name / property są None, jeśli onclick ich nie zawiera.
+    """
+    if not onclick or "PrimeFaces" not in onclick:
+        return None
+    template, row_index = _template(onclick)
+    form_name, property_value, pairs, has_row = _parse_template(template)
+    if has_row:
+        parameters = {key.replace(ROW_MARK, row_index): value.replace(ROW_MARK, row_index) for key, value in pairs}
+    else:
+        parameters = dict(pairs)
+    return form_name, property_value, parameters
+
+
+def submit_params(onclick: str) -> Dict[str, str]:
+    """Same parametry addSubmitParam (np. naviForm:normaleSucheLink); {} gdy brak."""
+    parsed = parse_onclick(onclick)
+    return parsed[2] if parsed is not None else {}
+
+
+def si_request_from_parsed(parsed, current_url: str) -> Optional[OnclickRequest]:
+    """OnclickRequest z wyniku parse_onclick, jeśli to link SI z parametrami; inaczej None."""
+    if parsed is None or not parsed[2]:
+        return None
+    form_name, property_value, parameters = parsed
+    if property_value != SI_PROPERTY and SI_PROPERTY not in parameters.values():
+        return None
+    return OnclickRequest(current_url.split("#")[0], form_name or DEFAULT_FORM_NAME, property_value, parameters)
+
+
+def parse_si_request(onclick: str, current_url: str) -> Optional[OnclickRequest]:
+    """OnclickRequest dla linku SI (Global.Dokumentart.SI); None dla innych linków."""
+    if not onclick or SI_PROPERTY not in onclick:
+        return None
+    return si_request_from_parsed(parse_onclick(onclick), current_url)
+
+
+def cache_info():
+    """Statystyki memoizacji szablonów (hits / misses / currsize)."""
+    return _parse_template.cache_info()
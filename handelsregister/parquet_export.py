@@ -0,0 +1,193 @@
+import argparse
+import datetime
+import json
+import os
+import uuid
+from decimal import Decimal
+from typing import Optional, Dict, Any, Iterable, List
+
+from handelsregister.jsonl import iter_jsonl
+from handelsregister.si_parser import DEFAULT_PARSE_WORKERS, iter_parsed_directory
+
+# Eksport sparsowanych rekordów SI do Parquet partycjonowanego po register_type / register_court
+# (części nazwy pliku z Content-Disposition, np. SN-Chemnitz_HRB_25386+SI-...xml).
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow jest opcjonalny - potrzebny tylko do eksportu
+    pa = None
+    pq = None
+
+SCHEMA_VERSION = 1
+DEFAULT_PARQUET_DIR = os.path.join("results", "parquet")
+DEFAULT_BATCH_SIZE = 5000
+PARTITION_COLS = ["register_type", "register_court"]
+SCHEMA_FILE = "_schema.json"
+UNKNOWN_PARTITION = "unknown"
+
+STRING_FIELDS = (
+    "file_name", "register_state", "register_court", "register_type", "register_number", "document_type",
+    "court_code", "court_name", "company_name", "legal_form_code", "legal_form", "seat", "street",
+    "house_number", "postal_code", "city", "purpose", "capital_currency",
+)
+DATE_FIELDS = ("statute_date", "retrieved_at", "last_entry_date")
+OFFICER_FIELDS = ("role_code", "role", "name", "first_name", "last_name", "city")
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("Eksport do Parquet wymaga pakietu pyarrow (pip install pyarrow)")
+
+
+def company_schema() -> "pa.Schema":
+    """Jawny schemat tabeli firm (wersja SCHEMA_VERSION zapisana w metadanych)."""
+    _require_pyarrow()
+    officer = pa.struct(
+        [pa.field(name, pa.string()) for name in OFFICER_FIELDS]
+        + [pa.field("birth_date", pa.date32()), pa.field("is_person", pa.bool_())]
+    )
+    fields = [pa.field(name, pa.string()) for name in STRING_FIELDS]
+    fields += [pa.field(name, pa.date32()) for name in DATE_FIELDS]
+    fields += [
+        pa.field("created_at", pa.timestamp("s", tz="UTC")),
+        pa.field("capital_amount", pa.decimal128(18, 2)),
+        pa.field("officers_count", pa.int32()),
+        pa.field("officers", pa.list_(officer)),
+    ]
+    return pa.schema(fields, metadata={
+        "schema_version": str(SCHEMA_VERSION),
+        "source": "handelsregister.si_parser",
+    })
+
+
+def _to_date(value: Optional[str]) -> Optional[datetime.date]:
+    try:
+        return datetime.date.fromisoformat(value[:10]) if value else None
+    except ValueError:
+        return None
+
+
+def _to_timestamp(value: Optional[str]) -> Optional[datetime.datetime]:
+    try:
+        return datetime.datetime.fromisoformat(value.replace("Z", "+00:00")) if value else None
+    except ValueError:
+        return None
+
+
+def _to_decimal(value) -> Optional[Decimal]:
+    return Decimal(str(value)).quantize(Decimal("0.01")) if value is not None else None
+
+
+def normalize_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    """Rekord z si_parser -> wiersz zgodny ze schematem (daty, decimal, partycje bez pustych wartości)."""
+    row = {name: record.get(name) for name in STRING_FIELDS}
+    row.update({name: _to_date(record.get(name)) for name in DATE_FIELDS})
+    row["created_at"] = _to_timestamp(record.get("created_at"))
+    row["capital_amount"] = _to_decimal(record.get("capital_amount"))
+    officers = record.get("officers") or []
+    row["officers_count"] = len(officers)
+    row["officers"] = [
+        dict({name: officer.get(name) for name in OFFICER_FIELDS},
+             birth_date=_to_date(officer.get("birth_date")), is_person=bool(officer.get("is_person")))
+        for officer in officers
+    ]
+    # Partycje: sąd z nazwy pliku, a gdy jej brak - kod sądu z XML
+    row["register_type"] = row["register_type"] or UNKNOWN_PARTITION
+    row["register_court"] = row["register_court"] or row["court_code"] or UNKNOWN_PARTITION
+    return row
+
+
+class ParquetExporter:
+    """Zapisuje rekordy partiami (batch_size) do zbioru Parquet partycjonowanego po PARTITION_COLS."""
+
+    def __init__(self, root_path: str = DEFAULT_PARQUET_DIR, batch_size: int = DEFAULT_BATCH_SIZE):
+        _require_pyarrow()
+        self.root_path = root_path
+        self.batch_size = batch_size
+        self.schema = company_schema()
+        self.written = 0
+        self.batches = 0
+        self._buffer: List[Dict[str, Any]] = []
+        os.makedirs(root_path, exist_ok=True)
+        self._write_schema_file()
+
+    def _write_schema_file(self):
+        with open(os.path.join(self.root_path, SCHEMA_FILE), "w", encoding="utf-8") as f:
+            json.dump({
+                "schema_version": SCHEMA_VERSION,
+                "partition_cols": PARTITION_COLS,
+                "schema": self.schema.to_string(show_schema_metadata=False),
+            }, f, indent=4, ensure_ascii=False)
+
+    def add(self, record: Dict[str, Any]):
+        self._buffer.append(normalize_record(record))
+        if len(self._buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._buffer:
+            return
+        table = pa.Table.from_pylist(self._buffer, schema=self.schema)
+        # Unikalna nazwa partii - kolejne eksporty dopisują pliki zamiast nadpisywać
+        pq.write_to_dataset(
+            table,
+            root_path=self.root_path,
+            partition_cols=PARTITION_COLS,
+            basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+            existing_data_behavior="overwrite_or_ignore",
+        )
+        self.written += len(self._buffer)
+        self.batches += 1
+        self._buffer = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self) -> "ParquetExporter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def iter_records(source: str, workers: int = DEFAULT_PARSE_WORKERS) -> Iterable[Dict[str, Any]]:
+    """Źródło rekordów: plik JSONL z si_parser albo katalog z plikami SI (parsowany w locie)."""
+    if os.path.isdir(source):
+        return iter_parsed_directory(source, workers)
+    return iter_jsonl(source)
+
+
+def export_parquet(
+    source: str,
+    root_path: str = DEFAULT_PARQUET_DIR,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    workers: int = DEFAULT_PARSE_WORKERS,
+) -> Dict[str, int]:
+    """Eksportuje rekordy firm (JSONL lub katalog SI) do Parquet; rekordy z błędem parsowania są pomijane."""
+    skipped = 0
+    with ParquetExporter(root_path, batch_size) as exporter:
+        for record in iter_records(source, workers):
+            if record.get("error"):
+                skipped += 1
+                continue
+            exporter.add(record)
+
+    print(f"✅ Wyeksportowano {exporter.written} rekordów ({exporter.batches} partii) do {root_path}, pominięto {skipped}")
+    return {"written": exporter.written, "skipped": skipped}
+
+
+def load_companies(root_path: str = DEFAULT_PARQUET_DIR, filters: Optional[list] = None):
+    """Wczytuje zbiór do pandas, np. filters=[("register_type", "=", "HRB"), ("register_court", "=", "Chemnitz")]."""
+    _require_pyarrow()
+    return pq.read_table(root_path, filters=filters).to_pandas()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Eksport rekordów SI do Parquet (partycje register_type/register_court)")
+    parser.add_argument("source", help="results/si_records.jsonl albo katalog z plikami SI (np. plikiXML)")
+    parser.add_argument("-o", "--output", default=DEFAULT_PARQUET_DIR)
+    parser.add_argument("-b", "--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_PARSE_WORKERS)
+    args = parser.parse_args()
+
+    export_parquet(args.source, root_path=args.output, batch_size=args.batch_size, workers=args.workers)
@@ -0,0 +1,169 @@
+import re
+from concurrent.futures import ProcessPoolExecutor
+from html.parser import HTMLParser
+from typing import Optional, Dict, Any, List
+
+from handelsregister.utils import RESULTS_TBODY_ID, collect_links_from_rows
+
+# Parser tabeli wyników z zapisanego HTML (driver.page_source lub body odpowiedzi HTTP) - bez przeglądarki.
+# Zwraca te same wiersze co extract_result_rows ({"index", "columns", "links"}), więc dalej działa
+# collect_links_from_rows / build_row_data / link_info_from_attrs bez zmian.
+try:
+    import lxml.html as lxml_html
+except ImportError:  # lxml jest opcjonalne - fallback na html.parser z biblioteki standardowej
+    lxml_html = None
+
+SI_MARKER = "Global.Dokumentart.SI"
+DEFAULT_PARSE_WORKERS = 4
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_VOID_TAGS = {
+    "area", "base", "br", "col", "embed", "hr", "img", "input",
+    "link", "meta", "param", "source", "track", "wbr",
+}
+
+
+def _clean(text: Optional[str]) -> str:
+    return _WHITESPACE_RE.sub(" ", text or "").strip()
+
+
+def _link_attrs(attrs: Dict[str, Any], text: str) -> Dict[str, Any]:
+    return {
+        "id": attrs.get("id") or "",
+        "href": attrs.get("href") or "#",
+        "text": _clean(text),
+        "title": attrs.get("title") or "",
+        "onclick": attrs.get("onclick") or "",
+        "data_url": attrs.get("data-url") or attrs.get("data-href"),
+        "formaction": attrs.get("formaction"),
+    }
+
+
+def _row_index(attrs: Dict[str, Any], position: int) -> int:
+    # data-ri = globalny indeks wiersza PrimeFaces (na stronie 2 przy 100 wierszach zaczyna się od 100)
+    try:
+        return int(attrs.get("data-ri"))
+    except (TypeError, ValueError):
+        return position
+
+
+def _parse_rows_lxml(html: str, tbody_id: str) -> List[Dict[str, Any]]:
+    document = lxml_html.fromstring(html)
+    tbodies = document.xpath("//tbody[@id=$tbody_id]", tbody_id=tbody_id)
+    if not tbodies:
+        return []
+
+    rows = []
+    for index, tr in enumerate(tbodies[0].iterchildren("tr")):
+        columns = [_clean(td.text_content()) for td in tr.iterchildren("td", "th")]
+        links = [
+            _link_attrs(dict(a.attrib), a.text_content())
+            for a in tr.xpath(".//a[contains(@onclick, $marker)]", marker=SI_MARKER)
+        ]
+        rows.append({"index": _row_index(tr.attrib, index), "columns": columns, "links": links})
+    return rows
+
+
+class _ResultsTableParser(HTMLParser):
+    """Strumieniowy parser html.parser: wiersze <tr> (bezpośrednie dzieci tbody) + komórki + linki SI."""
+
+    def __init__(self, tbody_id: str):
+        super().__init__(convert_charrefs=True)
+        self.tbody_id = tbody_id
+        self.rows: List[Dict[str, Any]] = []
+        self._depth = 0
+        self._tbody_depth: Optional[int] = None
+        self._row: Optional[Dict[str, Any]] = None
+        self._cell: Optional[List[str]] = None
+        self._link: Optional[Dict[str, Any]] = None
+        self._link_depth: Optional[int] = None
+        self._link_text: List[str] = []
+        self._done = False
+
+    def handle_starttag(self, tag, attrs):
+        if self._done or tag in _VOID_TAGS:
+            return
+        self._depth += 1
+        attrs = dict(attrs)
+
+        if self._tbody_depth is None:
+            if tag == "tbody" and attrs.get("id") == self.tbody_id:
+                self._tbody_depth = self._depth
+            return
+
+        if tag == "tr" and self._depth == self._tbody_depth + 1:
+            self._row = {"index": _row_index(attrs, len(self.rows)), "columns": [], "links": []}
+        elif tag in ("td", "th") and self._row is not None and self._depth == self._tbody_depth + 2:
+            self._cell = []
+        elif tag == "a" and self._row is not None and SI_MARKER in (attrs.get("onclick") or ""):
+            self._link = attrs
+            self._link_depth = self._depth
+            self._link_text = []
+
+    def handle_endtag(self, tag):
+        if self._done or tag in _VOID_TAGS:
+            return
+
+        if self._tbody_depth is not None:
+            if self._link is not None and self._depth == self._link_depth:
+                self._row["links"].append(_link_attrs(self._link, "".join(self._link_text)))
+                self._link = None
+            elif self._cell is not None and self._depth == self._tbody_depth + 2:
+                self._row["columns"].append(_clean("".join(self._cell)))
+                self._cell = None
+            elif self._row is not None and self._depth == self._tbody_depth + 1:
+                self.rows.append(self._row)
+                self._row = None
+            elif self._depth == self._tbody_depth:
+                self._done = True
+
+        self._depth -= 1
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+        if self._link is not None:
+            self._link_text.append(data)
+
+
+def _parse_rows_stdlib(html: str, tbody_id: str) -> List[Dict[str, Any]]:
+    parser = _ResultsTableParser(tbody_id)
+    parser.feed(html)
+    parser.close()
+    return parser.rows
+
+
+def parse_result_rows(html: str, tbody_id: str = RESULTS_TBODY_ID, use_lxml: Optional[bool] = None) -> List[Dict[str, Any]]:
+    """
+    Parsuje wiersze tabeli wyników z HTML do formatu extract_result_rows:
+    [{"index", "columns": [tekst komórek], "links": [atrybuty linków SI]}].
+    Szybka ścieżka przez lxml (jeśli zainstalowane), inaczej html.parser.
+    """
+    if use_lxml is None:
+        use_lxml = lxml_html is not None
+    if use_lxml:
+        return _parse_rows_lxml(html, tbody_id)
+    return _parse_rows_stdlib(html, tbody_id)
+
+
+def parse_results_html(html: str, current_url: str, tbody_id: str = RESULTS_TBODY_ID) -> list:
+    """Parsuje stronę wyników do collected_links (te same rekordy si_links co extract_link_info)."""
+    rows = parse_result_rows(html, tbody_id)
+    print(f"Znaleziono wierszy: {len(rows)}")
+    return collect_links_from_rows(rows, current_url)
+
+
+def parse_results_file(path: str, current_url: str) -> list:
+    """Parsuje zapisany plik HTML strony wyników (np. zrzut driver.page_source)."""
+    with open(path, "r", encoding="utf-8") as f:
+        return parse_results_html(f.read(), current_url)
+
+
+def parse_results_files(paths: List[str], current_url: str, workers: int = DEFAULT_PARSE_WORKERS) -> Dict[str, list]:
+    """Parsuje wiele zapisanych stron równolegle w osobnych procesach. Zwraca {ścieżka: collected_links}."""
+    if workers <= 1 or len(paths) <= 1:
+        return {path: parse_results_file(path, current_url) for path in paths}
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(parse_results_file, paths, [current_url] * len(paths))
+        return dict(zip(paths, results))
@@ -0,0 +1,218 @@
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Callable, Iterator, Set
+from urllib.parse import urlparse, parse_qs
+
+from handelsregister.http_search import (
+    HTTP_TIMEOUT,
+    build_http_session,
+    collect_all_pages,
+    extract_view_state,
+    perform_http_search,
+    save_http_session_cookies,
+)
+from handelsregister.egress import get_egress_pool
+from handelsregister.session_snapshot import SessionSnapshot
+from handelsregister.throttle import SESSION_EXPIRED_STATUS, ThrottledAdapter
+from handelsregister.utils import (
+    SEARCH_NUMBER,
+    SEARCH_TYPE,
+    SEARCH_TOWN,
+    SESSIONS_DIR,
+    session_cookies_file,
+)
+
+# Pula niezależnych sesji JSF: każda ma własne cookies, ViewState i konwersację (cid),
+# więc wiele wyszukiwań (tabel wyników) może być obsługiwanych równolegle.
+DEFAULT_POOL_SIZE = 4
+# Po takim czasie bez użycia sesja jest sprawdzana przed wypożyczeniem (krótki timeout sesji na serwerze)
+DEFAULT_MAX_IDLE = 60.0
+
+
+class JsfSession:
+    """Jedna sesja JSF (requests.Session + ViewState + cid + wyniki ostatniego wyszukiwania)."""
+
+    def __init__(self, session_id: str, target_url: str, sessions_dir: str = SESSIONS_DIR, pool_maxsize: int = 4):
+        self.session_id = session_id
+        self.target_url = target_url
+        self.cookies_file = session_cookies_file(session_id, sessions_dir)
+        # Każda sesja JSF ma własne (sticky) wyjście z puli egress, jeśli jest skonfigurowana
+        self.egress_id = f"jsf-{session_id}"
+        self.session = build_http_session(self.egress_id, pool_connections=1, pool_maxsize=pool_maxsize)
+
+        self.view_state: Optional[str] = None
+        self.cid: Optional[str] = None
+        self.results_url: Optional[str] = None
+        self.query: Optional[Dict[str, str]] = None
+        self.created_at = time.time()
+        self.last_used_at = self.created_at
+        self.uses = 0
+        self.healthy = True
+        # 440 na dowolnym żądaniu tej sesji (także w bloku lease) = konwersacja wygasła, sesja do wymiany
+        for adapter in set(self.session.adapters.values()):
+            if isinstance(adapter, ThrottledAdapter):
+                adapter.observers.append(self._observe)
+
+    def _observe(self, status: Optional[int], latency: float):
+        if status == SESSION_EXPIRED_STATUS:
+            self.healthy = False
+
+    def search(
+        self,
+        search_type: str = SEARCH_TYPE,
+        search_number: str = SEARCH_NUMBER,
+        search_town: str = SEARCH_TOWN,
+        on_page: Optional[Callable[[int, list], None]] = None,
+        skip_pages: Optional[Set[int]] = None,
+    ) -> list:
+        """
+        Wykonuje wyszukiwanie w tej sesji i zwraca collected_links ze wszystkich stron poza skip_pages
+        (row index ważne tylko w tej sesji). on_page(numer_strony, collected_links_strony) po każdej stronie.
+        """
+        response = perform_http_search(self.session, self.target_url, search_type, search_number, search_town)
+        # Nowa konwersacja - wcześniejsze 440 już jej nie dotyczy
+        self.healthy = True
+        self.results_url = response.url.split("#")[0]
+        self.view_state = extract_view_state(response.text)
+        self.cid = parse_qs(urlparse(self.results_url).query).get("cid", [None])[0]
+        self.query = {"search_type": search_type, "search_number": search_number, "search_town": search_town}
+        self.touch()
+        save_http_session_cookies(self.session, self.cookies_file)
+        return collect_all_pages(self.session, response, on_page=on_page, skip_pages=skip_pages)
+
+    def touch(self):
+        self.last_used_at = time.time()
+        self.uses += 1
+
+    def is_alive(self) -> bool:
+        """Sprawdza czy konwersacja JSF nadal żyje (GET strony wyników bez przekierowań; 440 = wygasła)."""
+        if not self.results_url:
+            return True
+        try:
+            response = self.session.get(self.results_url, allow_redirects=False, timeout=HTTP_TIMEOUT)
+            self.healthy = response.status_code == 200
+        except Exception:
+            self.healthy = False
+        return self.healthy
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "cid": self.cid,
+            "view_state": self.view_state,
+            "results_url": self.results_url,
+            "query": self.query,
+            "uses": self.uses,
+            "idle": round(time.time() - self.last_used_at, 1),
+            "healthy": self.healthy,
+        }
+
+    def snapshot(self, collected_links: Optional[list] = None) -> SessionSnapshot:
+        """Migawka tej sesji (cookies, ViewState, cid, zapytanie) - pobieranie w innym procesie bez wyszukiwania."""
+        snapshot = SessionSnapshot.from_http_session(
+            self.session, self.target_url, self.results_url, self.view_state, self.query, collected_links
+        )
+        snapshot.created_at = self.created_at
+        snapshot.last_used_at = self.last_used_at
+        return snapshot
+
+    def close(self):
+        try:
+            self.session.close()
+        except Exception:
+            pass
+        egress = get_egress_pool()
+        if egress is not None:
+            egress.release(self.egress_id)
+
+
+class SessionPool:
+    """
+    Pula K niezależnych sesji JSF wypożyczanych workerom (lease).
+    Zastępuje pojedynczy globalny SESSION_COOKIES_FILE - każda sesja ma własny plik cookies w sessions_dir.
+    """
+
+    def __init__(
+        self,
+        target_url: str,
+        size: int = DEFAULT_POOL_SIZE,
+        sessions_dir: str = SESSIONS_DIR,
+        max_idle: float = DEFAULT_MAX_IDLE,
+        pool_maxsize: int = 4,
+    ):
+        self.target_url = target_url
+        self.size = size
+        self.sessions_dir = sessions_dir
+        self.max_idle = max_idle
+        self.pool_maxsize = pool_maxsize
+        self._idle: "queue.Queue[JsfSession]" = queue.Queue()
+        self._all: Dict[str, JsfSession] = {}
+        self._lock = threading.Lock()
+        self._counter = 0
+        for _ in range(size):
+            self._idle.put(self._new_session())
+
+    def _new_session(self) -> JsfSession:
+        with self._lock:
+            self._counter += 1
+            session_id = str(self._counter)
+            jsf_session = JsfSession(session_id, self.target_url, self.sessions_dir, self.pool_maxsize)
+            self._all[session_id] = jsf_session
+        return jsf_session
+
+    def _replace(self, jsf_session: JsfSession) -> JsfSession:
+        """Zamyka martwą sesję i tworzy nową w jej miejsce (rozmiar puli bez zmian)."""
+        print(f"⚠️ Sesja {jsf_session.session_id} nieaktywna - zastępuję nową.")
+        jsf_session.close()
+        with self._lock:
+            self._all.pop(jsf_session.session_id, None)
+        return self._new_session()
+
+    @contextmanager
+    def lease(self, timeout: Optional[float] = None) -> Iterator[JsfSession]:
+        """
+        Wypożycza sesję na czas bloku `with`. Długo nieużywana sesja jest sprawdzana (is_alive)
+        i w razie potrzeby zastępowana przed oddaniem workerowi. Sesja, w której blok zgłosił wyjątek
+        albo dostał 440, nie wraca do puli - na jej miejsce trafia nowa.
+        """
+        jsf_session = self._idle.get(timeout=timeout)
+        try:
+            if time.time() - jsf_session.last_used_at > self.max_idle and not jsf_session.is_alive():
+                jsf_session = self._replace(jsf_session)
+            yield jsf_session
+        except BaseException:
+            # Stan konwersacji (ViewState / cid / stronicowanie) po błędzie jest nieznany
+            jsf_session.healthy = False
+            raise
+        finally:
+            if not jsf_session.healthy:
+                jsf_session = self._replace(jsf_session)
+            self._idle.put(jsf_session)
+
+    def health_check(self) -> Dict[str, bool]:
+        """Sprawdza wszystkie aktualnie wolne sesje i zastępuje martwe. Zwraca {session_id: alive}."""
+        results = {}
+        checked = []
+        while True:
+            try:
+                checked.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        for jsf_session in checked:
+            alive = jsf_session.is_alive()
+            results[jsf_session.session_id] = alive
+            self._idle.put(jsf_session if alive else self._replace(jsf_session))
+        return results
+
+    def stats(self) -> list:
+        with self._lock:
+            return [s.state() for s in self._all.values()]
+
+    def close(self):
+        with self._lock:
+            sessions = list(self._all.values())
+            self._all.clear()
+        for jsf_session in sessions:
+            jsf_session.close()
@@ -0,0 +1,330 @@
+import json
+import os
+import time
+from typing import Optional, Dict, Any, List, Tuple
+from urllib.parse import urlparse, parse_qs
+
+import requests
+
+from handelsregister.download_cache import key_from_columns
+from handelsregister.egress import bind_default
+from handelsregister.http_search import DEFAULT_HEADERS, extract_view_state
+from handelsregister.metrics import get_metrics
+from handelsregister.si_template import SiRequestTemplate, learn_verified
+from handelsregister.throttle import mount_throttled
+
+# Migawka sesji JSF do ciepłego startu w nowym procesie: cookies, ViewState, cid, User-Agent, zapytanie,
+# czasy utworzenia / ostatniego użycia i mapowanie wierszy na requesty SI (szablon si_template albo lista).
+# Zapis w zwartym JSON (krótkie klucze, bez wcięć) - wczytanie i zbudowanie sesji to milisekundy.
+SNAPSHOT_VERSION = 1
+# SESSION_SNAPSHOT=ścieżka - silnik zapisuje migawkę po wyszukiwaniu, download_files.py z niej startuje
+SNAPSHOT_FILE_ENV = "SESSION_SNAPSHOT"
+DEFAULT_SNAPSHOT_FILE = os.path.join("sessions", "session_snapshot.json")
+# Szacowany czas bezczynności, po którym serwer porzuca sesję JSF (oszacowanie wygaśnięcia, nie gwarancja)
+DEFAULT_IDLE_TTL = float(os.environ.get("SESSION_IDLE_TTL", "900"))
+PROBE_TIMEOUT = 10
+
+
+def _cid_from_url(url: Optional[str]) -> Optional[str]:
+    if not url:
+        return None
+    return parse_qs(urlparse(url).query).get("cid", [None])[0]
+
+
+def _cache_keys(collected_links: list) -> list:
+    """[row_number, sąd, rejestr, numer, typ] dla wierszy z kolumnami - klucze DownloadCache po wczytaniu migawki."""
+    keys = []
+    for item in collected_links:
+        key = key_from_columns(item.get("columns"))
+        if key is not None:
+            keys.append([item.get("row_number"), *key])
+    return keys
+
+
+def _compact_rows(collected_links: list) -> Tuple[Optional[SiRequestTemplate], Optional[int], list]:
+    """
+    (szablon, liczba wierszy, lista) - szablon, gdy wiersze 0..N-1 są kompletne i zgodne z si_template,
+    inaczej jawna lista [row_number, link_id, parametry] dla każdego linku SI.
+    """
+    if not collected_links:
+        return None, None, []
+    complete = all(item.get("row_number") == index for index, item in enumerate(collected_links))
+    template = learn_verified(collected_links) if complete else None
+    if template is not None:
+        return template, len(collected_links), []
+    rows = []
+    for item in collected_links:
+        for link in item.get("si_links", []):
+            parameters = (link.get("request") or {}).get("parameters")
+            if parameters:
+                rows.append([item.get("row_number"), link.get("id"), parameters])
+    return None, None, rows
+
+
+class SessionSnapshot:
+    """
+    Stan jednej sesji JSF potrzebny do pobierania SI bez ponownego wyszukiwania.
+    expires_at = last_used_at + idle_ttl (serwer liczy wygaśnięcie od ostatniego żądania).
+    """
+
+    def __init__(
+        self,
+        target_url: str,
+        results_url: Optional[str],
+        cookies: List[list],
+        view_state: Optional[str] = None,
+        user_agent: Optional[str] = None,
+        query: Optional[Dict[str, str]] = None,
+        created_at: Optional[float] = None,
+        last_used_at: Optional[float] = None,
+        idle_ttl: float = DEFAULT_IDLE_TTL,
+        template: Optional[SiRequestTemplate] = None,
+        row_count: Optional[int] = None,
+        rows: Optional[list] = None,
+        cache_keys: Optional[list] = None,
+    ):
+        self.target_url = target_url
+        self.results_url = results_url.split("#")[0] if results_url else None
+        self.cid = _cid_from_url(self.results_url)
+        # [name, value, domain, path]
+        self.cookies = cookies
+        self.view_state = view_state
+        self.user_agent = user_agent or DEFAULT_HEADERS["User-Agent"]
+        self.query = query
+        self.created_at = created_at if created_at is not None else time.time()
+        self.last_used_at = last_used_at if last_used_at is not None else self.created_at
+        self.idle_ttl = idle_ttl
+        self.template = template
+        self.row_count = row_count
+        self.rows = rows or []
+        # [row_number, sąd, rejestr, numer, typ] - wiersze syntetyczne (bez kolumn) nie mają klucza
+        self.cache_keys = cache_keys or []
+
+    # --- tworzenie ---
+
+    @classmethod
+    def from_http_session(
+        cls,
+        session: requests.Session,
+        target_url: str,
+        results_url: str,
+        view_state: Optional[str] = None,
+        query: Optional[Dict[str, str]] = None,
+        collected_links: Optional[list] = None,
+    ) -> "SessionSnapshot":
+        """Migawka sesji requests (backend http, JsfSession)."""
+        cookies = [[c.name, c.value, c.domain, c.path] for c in session.cookies]
+        template, row_count, rows = _compact_rows(collected_links or [])
+        return cls(
+            target_url,
+            results_url,
+            cookies,
+            view_state=view_state,
+            user_agent=session.headers.get("User-Agent"),
+            query=query,
+            template=template,
+            row_count=row_count,
+            rows=rows,
+            cache_keys=_cache_keys(collected_links or []),
+        )
+
+    @classmethod
+    def from_driver(
+        cls,
+        driver,
+        target_url: str,
+        query: Optional[Dict[str, str]] = None,
+        collected_links: Optional[list] = None,
+    ) -> "SessionSnapshot":
+        """Migawka sesji przeglądarki - User-Agent z navigator.userAgent, bo serwer widział właśnie ten."""
+        cookies = [[c["name"], c["value"], c.get("domain"), c.get("path", "/")] for c in driver.get_cookies()]
+        template, row_count, rows = _compact_rows(collected_links or [])
+        return cls(
+            target_url,
+            driver.current_url,
+            cookies,
+            view_state=extract_view_state(driver.page_source),
+            user_agent=driver.execute_script("return navigator.userAgent;"),
+            query=query,
+            template=template,
+            row_count=row_count,
+            rows=rows,
+            cache_keys=_cache_keys(collected_links or []),
+        )
+
+    # --- wygaśnięcie ---
+
+    @property
+    def expires_at(self) -> float:
+        return self.last_used_at + self.idle_ttl
+
+    def expires_in(self, now: Optional[float] = None) -> float:
+        """Sekundy do szacowanego wygaśnięcia (ujemne = prawdopodobnie już wygasła)."""
+        return self.expires_at - (now if now is not None else time.time())
+
+    def is_expired(self, now: Optional[float] = None) -> bool:
+        return self.expires_in(now) <= 0
+
+    def touch(self):
+        self.last_used_at = time.time()
+
+    # --- zapis / odczyt ---
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "v": SNAPSHOT_VERSION,
+            "t": self.target_url,
+            "u": self.results_url,
+            "cid": self.cid,
+            "c": self.cookies,
+            "vs": self.view_state,
+            "ua": self.user_agent,
+            "q": self.query,
+            "ca": round(self.created_at, 3),
+            "lu": round(self.last_used_at, 3),
+            "ttl": self.idle_ttl,
+            "st": self.template.to_state() if self.template is not None else None,
+            "n": self.row_count,
+            "r": self.rows,
+            "k": self.cache_keys,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SessionSnapshot":
+        return cls(
+            data["t"],
+            data.get("u"),
+            data.get("c") or [],
+            view_state=data.get("vs"),
+            user_agent=data.get("ua"),
+            query=data.get("q"),
+            created_at=data.get("ca"),
+            last_used_at=data.get("lu"),
+            idle_ttl=data.get("ttl", DEFAULT_IDLE_TTL),
+            template=SiRequestTemplate.from_state(data["st"]) if data.get("st") else None,
+            row_count=data.get("n"),
+            rows=data.get("r"),
+            cache_keys=data.get("k"),
+        )
+
+    def save(self, path: str = DEFAULT_SNAPSHOT_FILE):
+        """Zapis atomowy (tmp + replace) - równoległy odczyt nie trafi na połowę pliku."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp_path, path)
+        print(f"✅ Zapisano migawkę sesji (cid={self.cid}, {len(self.cookies)} cookies, {self.request_count()} requestów SI) do {path}")
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_SNAPSHOT_FILE) -> Optional["SessionSnapshot"]:
+        """Migawka z pliku; None, gdy brak pliku, plik jest uszkodzony albo ma inną wersję formatu."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"⚠️ Błąd przy ładowaniu migawki sesji: {e}")
+            return None
+        if not isinstance(data, dict) or data.get("v") != SNAPSHOT_VERSION:
+            print(f"⚠️ Migawka sesji {path} ma nieobsługiwany format - pomijam")
+            return None
+        return cls.from_dict(data)
+
+    # --- użycie ---
+
+    def build_session(self, pool_size: int = 4) -> requests.Session:
+        """Sesja requests z cookies i User-Agentem z migawki (pula keep-alive, limiter, wyjście egress)."""
+        session = requests.Session()
+        session.headers.update(DEFAULT_HEADERS)
+        session.headers["User-Agent"] = self.user_agent
+        mount_throttled(session, pool_connections=1, pool_maxsize=pool_size)
+        bind_default(session)
+        for name, value, domain, path in self.cookies:
+            session.cookies.set(name, value, domain=domain or "", path=path or "/")
+        return session
+
+    def probe(self, session: requests.Session, timeout: float = PROBE_TIMEOUT) -> bool:
+        """
+        Czy konwersacja JSF żyje: GET strony wyników bez przekierowań (200 = tak, 440 / przekierowanie = nie).
+        Body nie jest czytane. Udana próba przedłuża sesję na serwerze, więc odświeża też last_used_at.
+        """
+        if not self.results_url:
+            return False
+        try:
+            with session.get(self.results_url, allow_redirects=False, timeout=timeout, stream=True) as response:
+                alive = response.status_code == 200
+        except requests.RequestException:
+            alive = False
+        if alive:
+            self.touch()
+        return alive
+
+    def request_count(self) -> int:
+        if self.template is not None and self.row_count:
+            return self.row_count * len(self.template.links)
+        return len(self.rows)
+
+    def si_requests(self) -> list:
+        """Requesty SI w formacie si_requests_from_links ({"row_number", "link_id", "url", "parameters", "cache_key"})."""
+        keys = {row_number: tuple(key) for row_number, *key in self.cache_keys}
+        if self.template is not None and self.row_count:
+            return [
+                {
+                    "row_number": row_index,
+                    "link_id": link.link_id(row_index),
+                    "url": self.template.url,
+                    "parameters": link.parameters(row_index),
+                    "cache_key": keys.get(row_index),
+                }
+                for row_index in range(self.row_count)
+                for link in self.template.links
+            ]
+        return [
+            {
+                "row_number": row_number,
+                "link_id": link_id,
+                "url": self.results_url,
+                "parameters": parameters,
+                "cache_key": keys.get(row_number),
+            }
+            for row_number, link_id, parameters in self.rows
+        ]
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "cid": self.cid,
+            "query": self.query,
+            "cookies": len(self.cookies),
+            "requests": self.request_count(),
+            "age": round(time.time() - self.created_at, 1),
+            "expires_in": round(self.expires_in(), 1),
+        }
+
+
+def warm_start(
+    path: str = DEFAULT_SNAPSHOT_FILE,
+    pool_size: int = 4,
+    probe: bool = True,
+) -> Optional[Tuple[SessionSnapshot, requests.Session]]:
+    """
+    Wczytuje migawkę i buduje z niej sesję gotową do pobierania. None, gdy migawki nie ma,
+    szacunkowo wygasła albo próba (probe=True) pokazała, że serwer jej już nie zna.
+    """
+    started = time.monotonic()
+    snapshot = SessionSnapshot.load(path)
+    if snapshot is None:
+        return None
+    if snapshot.is_expired():
+        print(f"⚠️ Migawka sesji {path} prawdopodobnie wygasła ({-snapshot.expires_in():.0f} s temu)")
+        return None
+    session = snapshot.build_session(pool_size)
+    if probe and not snapshot.probe(session):
+        print(f"⚠️ Sesja z migawki {path} nie jest już ważna na serwerze")
+        session.close()
+        return None
+    elapsed = time.monotonic() - started
+    get_metrics().observe("warm_start_seconds", elapsed, probe=str(probe).lower())
+    print(f"⚡ Ciepły start z migawki w {elapsed * 1000:.1f} ms: {snapshot.state()}")
+    return snapshot, session
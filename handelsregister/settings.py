@@ -1,3 +1,5 @@
+import os
+
 BOT_NAME = "handelsregister"
 
 SPIDER_MODULES = ["handelsregister.spiders"]
@@ -6,9 +8,35 @@ NEWSPIDER_MODULE = "handelsregister.spiders"
 ROBOTSTXT_OBEY = False
 
 ITEM_PIPELINES = {
-    "handelsregister.pipelines.HandelsregisterPipeline": 300,
+    "handelsregister.pipelines.ValidationPipeline": 100,
+    "handelsregister.pipelines.DeduplicationPipeline": 200,
+    "handelsregister.pipelines.BatchedStoragePipeline": 300,
 }
 
+# Dławienie: AutoThrottle dopasowuje opóźnienie do latencji serwera, BackoffMiddleware wydłuża je
+# po 403/429/440/503 i 5xx; RetryMiddleware ponawia przejściowe błędy
+CONCURRENT_REQUESTS = 8
+CONCURRENT_REQUESTS_PER_DOMAIN = 4
+DOWNLOAD_DELAY = 0.5
+RANDOMIZE_DOWNLOAD_DELAY = True
+AUTOTHROTTLE_ENABLED = True
+AUTOTHROTTLE_START_DELAY = 1.0
+AUTOTHROTTLE_MAX_DELAY = 60.0
+AUTOTHROTTLE_TARGET_CONCURRENCY = 2.0
+RETRY_ENABLED = True
+RETRY_TIMES = 3
+RETRY_HTTP_CODES = [429, 500, 502, 503, 504, 522, 524, 408]
+
+DOWNLOADER_MIDDLEWARES = {
+    # Przed RetryMiddleware (550) w kolejności process_response
+    "handelsregister.middlewares.BackoffMiddleware": 560,
+}
+
+# Zapis itemów partiami: "sqlite" (STORAGE_URI = ścieżka pliku) lub "postgres" (STORAGE_URI = DSN, wymaga psycopg2)
+STORAGE_BACKEND = os.environ.get("STORAGE_BACKEND", "sqlite")
+STORAGE_URI = os.environ.get("STORAGE_URI", os.path.join("results", "handelsregister.db"))
+STORAGE_BATCH_SIZE = 500
+
 # Plik wynikowy zapisujemy ręcznie w spiderze; tutaj wyłączamy FEEDS
 FEEDS = {}
 
@@ -0,0 +1,253 @@
+import argparse
+import glob
+import os
+import re
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Dict, Any, List, Iterator
+
+from handelsregister.jsonl import JsonlWriter
+
+# Parser pobranych dokumentów SI (XJustiz nachricht.reg.0400003) do płaskich rekordów firm.
+# iterparse + czyszczenie elementów po przetworzeniu - pamięć nie rośnie z rozmiarem dokumentu.
+XJUSTIZ_NS = "{http://www.xjustiz.de}"
+SI_FILE_PATTERN = "*+SI-*.xml"
+DEFAULT_PARSE_WORKERS = os.cpu_count() or 4
+
+# Kody rollenbezeichnung (codeliste gds.rollenbezeichnung)
+ROLE_RECHTSTRAEGER = "287"
+ROLE_REGISTERGERICHT = "288"
+ROLE_EINREICHER = "215"
+NON_OFFICER_ROLES = {ROLE_RECHTSTRAEGER, ROLE_REGISTERGERICHT, ROLE_EINREICHER}
+
+# Nazwa pliku z Content-Disposition, np. SN-Chemnitz_HRB_25386+SI-20251210175648.xml
+DOCUMENT_FILENAME_RE = re.compile(
+    r"^(?P<state>[A-Z]{2})-(?P<court>.+?)_(?P<register_type>[A-Za-z]+)_(?P<register_number>[^+]+)"
+    r"\+(?P<document_type>[A-Z]+)-(?P<timestamp>\d{14})\.xml$"
+)
+
+# Ścieżki (końcówki, bez namespace) -> pole rekordu firmy
+COMPANY_FIELDS = {
+    ("instanzdaten", "auswahl_instanzbehoerde", "gericht", "code"): "court_code",
+    ("aktenzeichen.strukturiert", "register", "code"): "register_type",
+    ("aktenzeichen.strukturiert", "laufendeNummer"): "register_number",
+    ("rechtstraeger", "bezeichnung", "bezeichnung.aktuell"): "company_name",
+    ("rechtstraeger", "angabenZurRechtsform", "rechtsform", "code"): "legal_form_code",
+    ("rechtstraeger", "sitz", "ort"): "seat",
+    ("rechtstraeger", "anschrift", "strasse"): "street",
+    ("rechtstraeger", "anschrift", "hausnummer"): "house_number",
+    ("rechtstraeger", "anschrift", "postleitzahl"): "postal_code",
+    ("rechtstraeger", "anschrift", "ort"): "city",
+    ("basisdatenRegister", "gegenstand"): "purpose",
+    ("satzungsdatum", "aktuellesSatzungsdatum"): "statute_date",
+    ("auszug", "abrufdatum"): "retrieved_at",
+    ("auszug", "letzteEintragung"): "last_entry_date",
+    ("nachrichtenkopf", "erstellungszeitpunkt"): "created_at",
+}
+# Pola, dla których etykietę bierzemy z komentarza przed <code> (np. <!--Amtsgericht Stendal-->)
+LABEL_FIELDS = {"court_code": "court_name", "legal_form_code": "legal_form"}
+CAPITAL_ELEMENTS = {"stammkapital", "grundkapital"}
+
+
+def parse_document_filename(file_name: str) -> Optional[Dict[str, str]]:
+    """
+    Rozbija nazwę pliku dokumentu na części:
+    SN-Chemnitz_HRB_25386+SI-20251210175648.xml -> state=SN, court=Chemnitz, register_type=HRB,
+    register_number=25386, document_type=SI, timestamp=20251210175648.
+    """
+    match = DOCUMENT_FILENAME_RE.match(os.path.basename(file_name))
+    return match.groupdict() if match else None
+
+
+def _local(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _endswith(stack: List[str], suffix: tuple) -> bool:
+    return tuple(stack[-len(suffix):]) == suffix
+
+
+def _fix_mojibake(text: str) -> str:
+    # Etykiety w komentarzach bywają podwójnie zakodowane (np. "RechtstrÃ¤ger")
+    try:
+        return text.encode("latin-1").decode("utf-8")
+    except (UnicodeEncodeError, UnicodeDecodeError):
+        return text
+
+
+def _empty_company() -> Dict[str, Any]:
+    record = {field: None for field in COMPANY_FIELDS.values()}
+    record.update({label: None for label in LABEL_FIELDS.values()})
+    record.update({"capital_amount": None, "capital_currency": None, "officers": []})
+    return record
+
+
+def _finish_participant(record: Dict[str, Any], participant: Dict[str, Any]):
+    """Rozdziela beteiligung: rechtsträger/sąd uzupełniają rekord firmy, pozostałe role to officers."""
+    role_codes = {code for code, _ in participant["roles"]}
+    if ROLE_REGISTERGERICHT in role_codes and not record["court_name"]:
+        record["court_name"] = participant["name"]
+    if ROLE_RECHTSTRAEGER in role_codes:
+        record["company_name"] = record["company_name"] or participant["name"]
+        record["seat"] = record["seat"] or participant["seat"]
+
+    for code, label in participant["roles"]:
+        if code in NON_OFFICER_ROLES:
+            continue
+        record["officers"].append({
+            "role_code": code,
+            "role": label,
+            "name": participant["name"],
+            "first_name": participant["first_name"],
+            "last_name": participant["last_name"],
+            "birth_date": participant["birth_date"],
+            "city": participant["city"] or participant["seat"],
+            "is_person": participant["is_person"],
+        })
+
+
+def parse_si_file(path: str) -> Dict[str, Any]:
+    """
+    Parsuje jeden dokument SI strumieniowo (iterparse) do płaskiego rekordu firmy:
+    nazwa, siedziba, sąd rejestrowy, forma prawna, kapitał, lista officers (zarząd/likwidatorzy/...).
+    """
+    record = _empty_company()
+    record["file_name"] = os.path.basename(path)
+    filename_parts = parse_document_filename(path) or {}
+    record["register_state"] = filename_parts.get("state")
+    record["register_court"] = filename_parts.get("court")
+    record["document_type"] = filename_parts.get("document_type")
+
+    stack: List[str] = []
+    last_comment: Optional[str] = None
+    participant: Optional[Dict[str, Any]] = None
+
+    for event, elem in ET.iterparse(path, events=("start", "end", "comment")):
+        if event == "comment":
+            last_comment = (elem.text or "").strip()
+            continue
+
+        name = _local(elem.tag)
+        if event == "start":
+            stack.append(name)
+            if name != "code":
+                last_comment = None
+            if name == "beteiligung":
+                participant = {
+                    "roles": [], "name": None, "first_name": None, "last_name": None,
+                    "birth_date": None, "city": None, "seat": None, "is_person": False,
+                }
+            continue
+
+        text = (elem.text or "").strip() or None
+        if participant is not None:
+            if _endswith(stack, ("rollenbezeichnung", "code")):
+                participant["roles"].append((text, _fix_mojibake(last_comment) if last_comment else None))
+            elif _endswith(stack, ("organisation", "bezeichnung", "bezeichnung.aktuell")):
+                participant["name"] = text
+            elif _endswith(stack, ("vollerName", "vorname")):
+                participant["first_name"] = text
+                participant["is_person"] = True
+            elif _endswith(stack, ("vollerName", "nachname")):
+                participant["last_name"] = text
+                participant["is_person"] = True
+            elif _endswith(stack, ("geburt", "geburtsdatum")):
+                participant["birth_date"] = text
+            elif _endswith(stack, ("sitz", "ort")):
+                participant["seat"] = text
+            elif _endswith(stack, ("anschrift", "ort")):
+                participant["city"] = text
+            elif name == "beteiligung":
+                if participant["is_person"]:
+                    participant["name"] = " ".join(p for p in (participant["first_name"], participant["last_name"]) if p)
+                _finish_participant(record, participant)
+                participant = None
+        else:
+            for suffix, field in COMPANY_FIELDS.items():
+                if _endswith(stack, suffix):
+                    record[field] = text
+                    if field in LABEL_FIELDS and last_comment:
+                        record[LABEL_FIELDS[field]] = _fix_mojibake(last_comment)
+                    break
+            else:
+                if name == "zahl" and len(stack) > 1 and stack[-2] in CAPITAL_ELEMENTS:
+                    record["capital_amount"] = float(text) if text else None
+                elif name == "code" and _endswith(stack, ("waehrung", "code")) and CAPITAL_ELEMENTS & set(stack):
+                    record["capital_currency"] = text
+
+        stack.pop()
+        # Element przetworzony - zwalniamy jego poddrzewo
+        elem.clear()
+
+    record["officers_count"] = len(record["officers"])
+    return record
+
+
+def officer_records(record: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Spłaszcza officers rekordu firmy do osobnych wierszy (z kluczem rejestru)."""
+    key = {
+        "register_type": record.get("register_type"),
+        "register_number": record.get("register_number"),
+        "court_code": record.get("court_code"),
+    }
+    return [dict(key, **officer) for officer in record.get("officers", [])]
+
+
+def _parse_si_file_safe(path: str) -> Dict[str, Any]:
+    try:
+        return parse_si_file(path)
+    except Exception as e:
+        return {"file_name": os.path.basename(path), "error": str(e)}
+
+
+def iter_si_files(directory: str, pattern: str = SI_FILE_PATTERN) -> List[str]:
+    return sorted(glob.glob(os.path.join(directory, pattern)))
+
+
+def iter_parsed_directory(
+    directory: str,
+    workers: int = DEFAULT_PARSE_WORKERS,
+    pattern: str = SI_FILE_PATTERN,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Parsuje wszystkie pliki SI z katalogu w puli procesów i zwraca rekordy w kolejności plików.
+    Błędny plik daje rekord {"file_name", "error"} zamiast przerywać całość.
+    """
+    paths = iter_si_files(directory, pattern)
+    if workers <= 1 or len(paths) <= 1:
+        yield from (_parse_si_file_safe(path) for path in paths)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunksize = max(1, len(paths) // (workers * 4))
+        yield from executor.map(_parse_si_file_safe, paths, chunksize=chunksize)
+
+
+def parse_si_directory(
+    directory: str,
+    output_path: str = os.path.join("results", "si_records.jsonl"),
+    workers: int = DEFAULT_PARSE_WORKERS,
+) -> Dict[str, int]:
+    """Parsuje katalog plików SI i zapisuje rekordy firm przyrostowo do JSONL."""
+    parsed = failed = 0
+    with JsonlWriter(output_path, truncate=True, key_func=lambda r: r.get("file_name")) as writer:
+        for record in iter_parsed_directory(directory, workers):
+            if record.get("error"):
+                failed += 1
+                print(f"❌ {record['file_name']}: {record['error']}")
+                continue
+            writer.write(record)
+            parsed += 1
+
+    print(f"✅ Sparsowano {parsed} dokumentów SI ({failed} błędów) -> {output_path}")
+    return {"parsed": parsed, "failed": failed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parsowanie pobranych dokumentów SI do rekordów firm (JSONL)")
+    parser.add_argument("directory", nargs="?", default=os.environ.get("XML_DIR", "plikiXML"))
+    parser.add_argument("-o", "--output", default=os.path.join("results", "si_records.jsonl"))
+    parser.add_argument("-w", "--workers", type=int, default=DEFAULT_PARSE_WORKERS)
+    args = parser.parse_args()
+
+    parse_si_directory(args.directory, output_path=args.output, workers=args.workers)
@@ -0,0 +1,178 @@
+import re
+from typing import Optional, Dict, Any, List, Tuple
+
+import requests
+
+from handelsregister.onclick_parser import DEFAULT_FORM_NAME, ROW_MARK, SI_PROPERTY
+from handelsregister.utils import RESULTS_TABLE_ID
+
+# Synteza requestów SI bez DOM-u: wszystkie POST-y SI mają ten sam URL, formularz i property,
+# a różnią się tylko indeksem wiersza w id linku (ergebnissForm:selectedSuchErgebnisFormTable:X:j_idt219:6:fade_).
+# Szablon id (j_idt... zmienia się między wdrożeniami) uczymy się z jednego sparsowanego wiersza,
+# sprawdzamy na próbce, a potem generujemy parametry dla wszystkich rowCount wierszy.
+VERIFY_SAMPLE_SIZE = 5
+PROBE_TIMEOUT = 30
+
+_ROW_ID_RE = re.compile(re.escape(RESULTS_TABLE_ID) + r":(\d+):")
+
+
+def _to_template(text: str, row_index: int) -> str:
+    return _ROW_ID_RE.sub(
+        lambda m: f"{RESULTS_TABLE_ID}:{ROW_MARK}:" if int(m.group(1)) == row_index else m.group(0),
+        text,
+    )
+
+
+class SiLinkTemplate:
+    """Szablon jednego linku SI w wierszu: id i pary parametrów POST z indeksem wiersza jako zmienną."""
+
+    __slots__ = ("id_template", "pairs", "form_name", "property")
+
+    def __init__(self, id_template: str, pairs: Tuple[Tuple[str, str], ...], form_name: str, property: Optional[str]):
+        self.id_template = id_template
+        self.pairs = pairs
+        self.form_name = form_name
+        self.property = property
+
+    @classmethod
+    def learn(cls, link_info: Dict[str, Any], row_index: int) -> Optional["SiLinkTemplate"]:
+        """Szablon z link_info (link_info_from_attrs); None, gdy id nie zawiera indeksu wiersza."""
+        link_id = link_info.get("id") or ""
+        parameters = (link_info.get("request") or {}).get("parameters") or {}
+        id_template = _to_template(link_id, row_index)
+        if ROW_MARK not in id_template or not parameters:
+            return None
+        pairs = tuple((_to_template(key, row_index), _to_template(value, row_index)) for key, value in parameters.items())
+        return cls(id_template, pairs, link_info.get("form_name") or DEFAULT_FORM_NAME, link_info.get("property"))
+
+    def link_id(self, row_index: int) -> str:
+        return self.id_template.replace(ROW_MARK, str(row_index))
+
+    def parameters(self, row_index: int) -> Dict[str, str]:
+        index = str(row_index)
+        return {key.replace(ROW_MARK, index): value.replace(ROW_MARK, index) for key, value in self.pairs}
+
+    def link_info(self, row_index: int, url: str) -> Dict[str, Any]:
+        """link_info w formacie link_info_from_attrs (bez tekstu / onclick - wiersz nie był renderowany)."""
+        return {
+            "href": "#",
+            "id": self.link_id(row_index),
+            "element_id": self.link_id(row_index),
+            "property": self.property or SI_PROPERTY,
+            "form_name": self.form_name,
+            "request_url": url,
+            "request": {
+                "method": "POST",
+                "url": url,
+                "content_type": "application/x-www-form-urlencoded",
+                "parameters": self.parameters(row_index),
+            },
+            "actual_url": url,
+        }
+
+    def to_state(self) -> list:
+        """Zwarta postać do zapisu (SessionSnapshot): [id_template, pary, form_name, property]."""
+        return [self.id_template, [list(pair) for pair in self.pairs], self.form_name, self.property]
+
+    @classmethod
+    def from_state(cls, state: list) -> "SiLinkTemplate":
+        id_template, pairs, form_name, property = state
+        return cls(id_template, tuple(tuple(pair) for pair in pairs), form_name, property)
+
+
+class SiRequestTemplate:
+    """
+    Szablon requestów SI całej tabeli wyników: URL (z cid) i szablony linków SI jednego wiersza.
+    learn() z jednego wiersza → verify() na próbce sparsowanych wierszy → row_data() / synthesize() dla reszty.
+    """
+
+    __slots__ = ("url", "links")
+
+    def __init__(self, url: str, links: List[SiLinkTemplate]):
+        self.url = url
+        self.links = links
+
+    @classmethod
+    def learn(cls, row_data: Dict[str, Any]) -> Optional["SiRequestTemplate"]:
+        """Uczy się z jednego wiersza collected_links; None, gdy wiersz nie ma linków SI z indeksem w id."""
+        row_index = row_data.get("row_number")
+        si_links = row_data.get("si_links") or []
+        if row_index is None or not si_links:
+            return None
+        links = [SiLinkTemplate.learn(link, row_index) for link in si_links]
+        url = (si_links[0].get("request") or {}).get("url") or si_links[0].get("request_url")
+        if not url or any(link is None for link in links):
+            return None
+        return cls(url, links)
+
+    def to_state(self) -> Dict[str, Any]:
+        return {"url": self.url, "links": [link.to_state() for link in self.links]}
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "SiRequestTemplate":
+        return cls(state["url"], [SiLinkTemplate.from_state(link) for link in state["links"]])
+
+    def row_data(self, row_index: int) -> Dict[str, Any]:
+        """row_data jak build_row_data; synthesized=True, bo bez kolumn (firma, sąd...) z tabeli."""
+        return {
+            "row_number": row_index,
+            "row_display": row_index + 1,
+            "si_links": [link.link_info(row_index, self.url) for link in self.links],
+            "synthesized": True,
+        }
+
+    def synthesize(self, start: int, stop: int) -> list:
+        """collected_links dla wierszy [start, stop)."""
+        return [self.row_data(row_index) for row_index in range(start, stop)]
+
+    def matches(self, row_data: Dict[str, Any]) -> bool:
+        """Czy wygenerowane id / URL / parametry są identyczne z faktycznie sparsowanym wierszem."""
+        expected = self.row_data(row_data["row_number"])["si_links"]
+        actual = row_data.get("si_links") or []
+        if len(expected) != len(actual):
+            return False
+        for generated, parsed in zip(expected, actual):
+            request = parsed.get("request") or {}
+            if (
+                generated["id"] != parsed.get("id")
+                or generated["request"]["url"] != request.get("url")
+                or generated["request"]["parameters"] != request.get("parameters")
+            ):
+                return False
+        return True
+
+    def verify(self, collected_links: list, sample_size: int = VERIFY_SAMPLE_SIZE) -> bool:
+        """
+        Sprawdza szablon na próbce wierszy (pierwszy, ostatni i rozłożone między nimi) z collected_links.
+        Wymaga co najmniej dwóch wierszy - jeden wiersz to ten, z którego szablon powstał.
+        """
+        if len(collected_links) < 2:
+            return False
+        step = max(1, (len(collected_links) - 1) // max(1, sample_size - 1))
+        sample = collected_links[::step][:sample_size - 1] + [collected_links[-1]]
+        return all(self.matches(row_data) for row_data in sample)
+
+    def probe(self, session: requests.Session, row_index: int, timeout: float = PROBE_TIMEOUT) -> bool:
+        """
+        Kontrola na żywo: POST wygenerowanego requestu dla row_index (np. wiersza spoza strony 1)
+        i sprawdzenie, że serwer zwraca plik (200 + Content-Disposition). Body nie jest pobierane.
+        """
+        link = self.links[0]
+        with session.post(
+            self.url,
+            data=link.parameters(row_index),
+            headers={"Referer": self.url.split("?")[0]},
+            timeout=timeout,
+            stream=True,
+        ) as response:
+            return response.status_code == 200 and "attachment" in response.headers.get("Content-Disposition", "")
+
+
+def learn_verified(collected_links: list, sample_size: int = VERIFY_SAMPLE_SIZE) -> Optional[SiRequestTemplate]:
+    """Szablon z pierwszego wiersza, zweryfikowany na próbce pozostałych; None, gdy próbka się nie zgadza."""
+    if not collected_links:
+        return None
+    template = SiRequestTemplate.learn(collected_links[0])
+    if template is None or not template.verify(collected_links, sample_size):
+        return None
+    return template
@@ -1,36 +1,315 @@
 import os
-import json
-from scrapy import Spider
+import time
+from urllib.parse import urljoin
+
+from scrapy import Spider, Request
+from scrapy.http import FormRequest
+
+from handelsregister.download_cache import DEFAULT_CACHE_DIR, DownloadCache, key_from_columns
+from handelsregister.engine import run_etap1_scrape, run_http_search
+from handelsregister.http_search import (
+    PARTIAL_HEADERS,
+    collect_form_fields,
+    extract_paging_info,
+    extract_submit_params,
+    find_option_value,
+    page_request_fields,
+    parse_partial_response,
+    welcome_url,
+)
+from handelsregister.items import DocumentItem, HandelsItem
+from handelsregister.jsonl import JsonlWriter, jsonl_to_legacy
+from handelsregister.metrics import export_to_stats, get_metrics, write_from_env
+from handelsregister.results_parser import parse_result_rows
+from handelsregister.throttle import SESSION_EXPIRED_STATUS
+from handelsregister.utils import (
+    SEARCH_NUMBER,
+    SEARCH_TYPE,
+    SEARCH_TOWN,
+    build_row_data,
+    filename_from_content_disposition,
+)
+
+# Tryby jednorazowe (blokujące): "selenium" (przeglądarka) lub "http" (bez przeglądarki, JSF po HTTP)
+SEARCH_MODES = {
+    "selenium": run_etap1_scrape,
+    "http": run_http_search,
+}
+# Tryb "scrapy" - natywny łańcuch requestów Scrapy (search → results → SI download)
+SCRAPY_MODE = "scrapy"
+
+# Wiersze trafiają do JSONL od razu po wyciągnięciu; items.json ({"count", "items"}) powstaje przy zamknięciu
+RESULTS_JSONL = os.path.join("results", "items.jsonl")
+RESULTS_JSON = os.path.join("results", "items.json")
+# 440 = wygasła sesja JSF - przepuszczana tylko dla POST-ów stronicowania i SI (meta), które ją logują
+EXPIRED_META = {"handle_httpstatus_list": [SESSION_EXPIRED_STATUS]}
+
+# Początek body, w którym szukamy <partial-response> (ajax JSF też ma Content-Type text/xml)
+PARTIAL_RESPONSE_PREFIX = 256
+
+
+def is_document_response(response, content_disposition: str) -> bool:
+    """Plik SI = Content-Disposition z załącznikiem albo XML, który nie jest <partial-response> JSF."""
+    if "attachment" in content_disposition.lower() or filename_from_content_disposition(content_disposition):
+        return True
+    content_type = response.headers.get("Content-Type", b"").decode("latin-1").lower()
+    return "xml" in content_type and b"<partial-response" not in response.body[:PARTIAL_RESPONSE_PREFIX]
 
-from handelsregister.utils import run_etap1_scrape
 
 class HandelsSpider(Spider):
     name = "handels_spider"
 
-    def __init__(self, target_url=None, download_dir=None, *args, **kwargs):
+    def __init__(self, target_url=None, download_dir=None, mode=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.target_url = target_url or os.environ.get(
             "TARGET_URL", "https://www.handelsregister.de/"
         )
-        self.download_dir = download_dir or ""
+        self.download_dir = download_dir or os.environ.get("XML_DIR", "plikiXML")
+        self.mode = mode or os.environ.get("SEARCH_MODE", SCRAPY_MODE)
+        if self.mode != SCRAPY_MODE and self.mode not in SEARCH_MODES:
+            raise ValueError(
+                f"Nieznany tryb '{self.mode}', dostępne: {SCRAPY_MODE}, {', '.join(SEARCH_MODES)}"
+            )
+        self.query = {"search_type": SEARCH_TYPE, "search_number": SEARCH_NUMBER, "search_town": SEARCH_TOWN}
+        self.writer = JsonlWriter(RESULTS_JSONL, index=True, truncate=True)
+        # Cache dokumentów (DOWNLOAD_CACHE_DIR="" wyłącza) - świeże SI nie są pobierane ponownie
+        cache_dir = os.environ.get("DOWNLOAD_CACHE_DIR", DEFAULT_CACHE_DIR)
+        self.cache = DownloadCache(cache_dir) if cache_dir else None
 
     def start_requests(self):
-        # Uruchamiamy selenium ETAP1 i zbieramy linki z wyników wyszukiwania
-        collected_links = run_etap1_scrape(self.target_url, self.download_dir)
-        
-        # Zapisujemy wyniki do JSON (z count i items)
-        wynik = {"count": len(collected_links), "items": collected_links}
-        os.makedirs("results", exist_ok=True)
-        out_path = os.path.join("results", "items.json")
-        with open(out_path, "w", encoding="utf-8") as f:
-            json.dump(wynik, f, indent=4, ensure_ascii=False)
-        
-        self.logger.info(
-            "SUKCES! Zebrano %d wierszy z linkami. Wynik zapisano w %s",
-            len(collected_links),
-            out_path,
+        if self.mode in SEARCH_MODES:
+            yield from self._run_blocking_search()
+            return
+
+        # main_page - GET strony startowej (JSESSIONID + ViewState trzyma CookiesMiddleware)
+        yield Request(welcome_url(self.target_url), callback=self.parse_welcome)
+
+    def _run_blocking_search(self):
+        # Uruchamiamy ETAP1 (selenium lub http) i zbieramy linki z wyników wyszukiwania
+        run_search = SEARCH_MODES[self.mode]
+        collected_links = run_search(
+            self.target_url,
+            on_page=lambda page_number, page_links: self.writer.write_many(page_links),
+        )
+        self._write_results()
+
+        # Jeden HandelsItem na wiersz (pipeline'y zapisują je partiami)
+        for row_data in collected_links:
+            yield self._row_item(row_data, row_data["si_links"][0].get("request_url"))
+
+    def parse_welcome(self, response):
+        # search_page - "Normale Suche" to commandLink w naviForm
+        self.logger.info("ETAP1 - NORMAL SUCHE")
+        yield FormRequest.from_response(
+            response,
+            formid="naviForm",
+            formdata=extract_submit_params(response.text, "naviForm:normaleSucheLink"),
+            dont_click=True,
+            callback=self.parse_search_form,
+        )
+
+    def parse_search_form(self, response):
+        self.logger.info("ETAP2 - WYBOR Z FORMULARZA")
+        register_art = find_option_value(response.text, "form:registerArt_input", SEARCH_TYPE)
+        gericht = find_option_value(response.text, "form:registergericht_input", SEARCH_TOWN)
+        if register_art is None or gericht is None:
+            self.logger.error("Nie znaleziono opcji %s / %s w formularzu wyszukiwania", SEARCH_TYPE, SEARCH_TOWN)
+            return
+
+        formdata = {
+            "form:registerArt_input": register_art,
+            "form:registerNummer": SEARCH_NUMBER,
+            "form:registergericht_input": gericht,
+            "form:btnSuche": "",
+        }
+        per_page = find_option_value(response.text, "form:ergebnisseProSeite_input", "100")
+        if per_page is not None:
+            formdata["form:ergebnisseProSeite_input"] = per_page
+
+        # search_request - Suchen
+        yield FormRequest.from_response(
+            response,
+            formid="form",
+            formdata=formdata,
+            dont_click=True,
+            callback=self.parse_results,
+        )
+
+    def parse_results(self, response):
+        self.logger.info("ETAP3 - ZBIERANIE LINKOW SI")
+        current_url = response.url.split("#")[0]
+
+        # Pola ergebnissForm (ViewState itd.) zbieramy raz - każdy POST SI to submit tego formularza
+        action, form_fields = collect_form_fields(response.text, "ergebnissForm")
+        post_url = urljoin(response.url, action) if action else current_url
+
+        rows = parse_result_rows(response.text)
+        self.logger.info("Strona 1: znaleziono wierszy: %d", len(rows))
+        yield from self._handle_rows(rows, current_url, post_url, form_fields)
+
+        # Kolejne strony: ajax POST stronicowania; SI ze strony 1 pobierają się w tym czasie równolegle
+        paging = extract_paging_info(response.text)
+        if paging is not None and paging["row_count"] > paging["rows"]:
+            self.logger.info("Wyników: %d, wierszy na stronę: %d", paging["row_count"], paging["rows"])
+            yield self._page_request(current_url, post_url, form_fields, paging, paging["rows"])
+
+    def _page_request(self, current_url, post_url, form_fields, paging, first):
+        return FormRequest(
+            post_url,
+            formdata=page_request_fields(form_fields, first, paging["rows"]),
+            headers=dict(PARTIAL_HEADERS, Referer=current_url),
+            callback=self.parse_results_page,
+            meta=EXPIRED_META,
+            cb_kwargs={
+                "current_url": current_url,
+                "post_url": post_url,
+                "form_fields": form_fields,
+                "paging": paging,
+                "first": first,
+            },
+            dont_filter=True,
         )
 
-        # Zwracamy jeden item
-        yield wynik
+    def parse_results_page(self, response, current_url, post_url, form_fields, paging, first):
+        page_number = first // paging["rows"] + 1
+        if response.status == SESSION_EXPIRED_STATUS:
+            # Body 440 to nie <partial-response> - bez parsowania, dalszych stron tej sesji już nie będzie
+            get_metrics().inc("session_expired_total")
+            self.logger.warning("Sesja wygasła (440) przy stronicowaniu - strony od %d pominięte", page_number)
+            return
+        rows, view_state = parse_partial_response(response.body)
+        self.logger.info("Strona %d: znaleziono wierszy: %d", page_number, len(rows))
+        if view_state:
+            form_fields = dict(form_fields, **{"javax.faces.ViewState": view_state})
+        yield from self._handle_rows(rows, current_url, post_url, form_fields)
+
+        next_first = first + paging["rows"]
+        if rows and next_first < paging["row_count"]:
+            yield self._page_request(current_url, post_url, form_fields, paging, next_first)
+
+    def _handle_rows(self, rows, current_url, post_url, form_fields):
+        metrics = get_metrics()
+        metrics.inc("pages_total", backend=SCRAPY_MODE)
+        for row in rows:
+            row_index = row["index"]
+            row_data = build_row_data(row_index, row["links"], current_url, row["columns"])
+            if not row_data["si_links"]:
+                continue
+            metrics.inc("rows_total", backend=SCRAPY_MODE)
+            metrics.inc("si_links_total", len(row_data["si_links"]), backend=SCRAPY_MODE)
+
+            self.writer.write(row_data)
+            yield self._row_item(row_data, current_url)
+
+            cache_key = key_from_columns(row_data.get("columns"))
+            entry = self.cache.lookup(cache_key) if self.cache else None
+            if entry is not None:
+                metrics.inc("downloads_total", result="cached")
+                yield self._cached_document(entry, row_index, row_data["si_links"][0].get("id"))
+                continue
+
+            # Follow-up POST dla każdego linku SI z post_parameters z onclick
+            for link_info in row_data["si_links"]:
+                formdata = dict(form_fields)
+                formdata.update(link_info["request"]["parameters"])
+                yield FormRequest(
+                    post_url,
+                    formdata=formdata,
+                    headers={"Referer": current_url},
+                    callback=self.parse_document,
+                    meta=EXPIRED_META,
+                    cb_kwargs={"row_number": row_index, "link_id": link_info.get("id"), "cache_key": cache_key},
+                    dont_filter=True,
+                )
+
+    def parse_document(self, response, row_number, link_id, cache_key=None):
+        metrics = get_metrics()
+        if response.status == SESSION_EXPIRED_STATUS:
+            metrics.inc("downloads_total", result=response.status)
+            metrics.inc("session_expired_total")
+            self.logger.warning("Sesja wygasła (440) przy pobieraniu SI dla wiersza %d", row_number)
+            return
+
+        content_disposition = response.headers.get("Content-Disposition", b"").decode("latin-1")
+        if not is_document_response(response, content_disposition):
+            # Strona błędu / ponownie wyrenderowany widok zamiast pliku - nie zapisujemy i nie cache'ujemy
+            metrics.inc("downloads_total", result="invalid")
+            self.logger.warning(
+                "Wiersz %d: odpowiedź bez pliku SI (Content-Type: %s) - pomijam",
+                row_number,
+                response.headers.get("Content-Type", b"").decode("latin-1") or "-",
+            )
+            return
+        metrics.inc("downloads_total", result=response.status)
+        if "download_latency" in response.meta:
+            metrics.observe("download_seconds", response.meta["download_latency"])
+        metrics.inc("download_bytes_total", len(response.body))
+
+        filename = filename_from_content_disposition(content_disposition) or f"row_{row_number}+SI.xml"
+        final_path = os.path.join(self.download_dir, filename)
+
+        os.makedirs(self.download_dir or ".", exist_ok=True)
+        with open(final_path, "wb") as f:
+            f.write(response.body)
+        if self.cache is not None:
+            # Ten sam klucz co przy lookup (z kolumn) - z nazwy pliku sąd wychodzi inaczej, np. BE-Charlottenburg
+            self.cache.store(final_path, key=cache_key)
 
+        yield DocumentItem(
+            row_number=row_number,
+            link_id=link_id,
+            document_type="SI",
+            file_name=filename,
+            file_path=final_path,
+            size=len(response.body),
+            status=response.status,
+            downloaded_at=time.strftime("%Y-%m-%dT%H:%M:%S"),
+        )
+
+    def _cached_document(self, entry, row_number, link_id) -> DocumentItem:
+        file_path = self.cache.materialize(entry, self.download_dir)
+        self.logger.info("Wiersz %d: SI z cache (%s)", row_number, entry["file_name"])
+        return DocumentItem(
+            row_number=row_number,
+            link_id=link_id,
+            document_type="SI",
+            file_name=entry["file_name"],
+            file_path=file_path,
+            size=entry["size"],
+            status=200,
+            downloaded_at=time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(entry["fetched_at"])),
+        )
+
+    def _row_item(self, row_data, results_url) -> HandelsItem:
+        return HandelsItem(
+            row_number=row_data["row_number"],
+            links=row_data["si_links"],
+            columns=row_data.get("columns") or [],
+            results_url=results_url,
+            query=self.query,
+            scraped_at=time.strftime("%Y-%m-%dT%H:%M:%S"),
+        )
+
+    def closed(self, reason):
+        if self.mode == SCRAPY_MODE:
+            self._write_results()
+        self.writer.close()
+        if self.cache is not None:
+            self.logger.info("Cache dokumentów: %s", self.cache.stats())
+            self.cache.close()
+        # Czasy kroków i liczniki (silnik, pobieranie, limiter) -> statystyki Scrapy + METRICS_FILE
+        export_to_stats(self.crawler.stats)
+        write_from_env()
+
+    def _write_results(self) -> dict:
+        # Domykamy JSONL i konwertujemy do dotychczasowego JSON (z count i items)
+        self.writer.close()
+        wynik = jsonl_to_legacy(RESULTS_JSONL, RESULTS_JSON)
+
+        self.logger.info(
+            "SUKCES! Zebrano %d wierszy z linkami. Wynik zapisano w %s (przyrostowo w %s)",
+            wynik["count"],
+            RESULTS_JSON,
+            RESULTS_JSONL,
+        )
+        return wynik
@@ -0,0 +1,276 @@
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Callable, List
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from handelsregister.metrics import get_metrics
+
+# Wspólny (na proces) limiter żądań do handelsregister.de: token bucket, którego tempo adaptuje się
+# do odpowiedzi serwera (AIMD) - rośnie liniowo przy szybkich 200, spada mnożnikowo przy 440/429/503
+# i błędach, a po serii błędów wszyscy workerzy czekają losowy (jitter) wykładniczy backoff.
+DEFAULT_RATE = float(os.environ.get("THROTTLE_RATE", "2.0"))  # żądań na sekundę
+DEFAULT_MIN_RATE = 0.2
+DEFAULT_MAX_RATE = float(os.environ.get("THROTTLE_MAX_RATE", "8.0"))
+DEFAULT_BURST = 4
+# Powyżej tej latencji (EWMA, sekundy) serwer uznajemy za przeciążony i lekko zwalniamy
+DEFAULT_LATENCY_TARGET = 2.0
+LATENCY_SMOOTHING = 0.2
+RATE_INCREASE_STEP = 0.05
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+
+# 440 = wygasła sesja JSF (w praktyce zwykle po zbyt szybkim ruchu), 403/429/503 = blokada / przeciążenie
+THROTTLE_STATUSES = {403, 429, 440, 503}
+# Po wygaśnięciu sesji 440 dostają wszystkie żądania w locie - to jedno zdarzenie na generację sesji
+# (pierwsze 440 po session_started), a nie sygnał przeciążenia od każdej odpowiedzi
+SESSION_EXPIRED_STATUS = 440
+# Mnożnik tempa: sygnał "zwolnij" / inny 5xx / timeout lub błąd połączenia / latencja ponad cel
+THROTTLE_DECREASE = 0.5
+SERVER_ERROR_DECREASE = 0.75
+LATENCY_DECREASE = 0.9
+
+
+def backoff_delay(failures: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_MAX) -> float:
+    """Wykładniczy backoff z pełnym jitterem: losowo z [0, min(cap, base * 2^(failures-1))]."""
+    if failures <= 0:
+        return 0.0
+    return random.uniform(0, min(cap, base * 2 ** (failures - 1)))
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Nagłówek Retry-After w sekundach (format daty HTTP jest ignorowany)."""
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+
+class AdaptiveRateLimiter:
+    """
+    Token bucket współdzielony przez wątki (HTTP i przeglądarki).
+    acquire() blokuje do dostępności tokenu i końca ewentualnego backoffu,
+    observe(status, latency) koryguje tempo na podstawie odpowiedzi.
+    """
+
+    def __init__(
+        self,
+        rate: float = DEFAULT_RATE,
+        min_rate: float = DEFAULT_MIN_RATE,
+        max_rate: float = DEFAULT_MAX_RATE,
+        burst: int = DEFAULT_BURST,
+        latency_target: float = DEFAULT_LATENCY_TARGET,
+    ):
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.rate = min(max(rate, min_rate), max_rate)
+        self.burst = burst
+        self.latency_target = latency_target
+        self.tokens = float(burst)
+        self.latency: Optional[float] = None
+        self.failures = 0
+        self.blocked_until = 0.0
+        # Początek bieżącej blokady - łączny backoff jednej serii błędów nie przekracza BACKOFF_MAX
+        self.blocked_since = 0.0
+        # Generacja sesji JSF i generacja, w której 440 zostało już policzone
+        self.session_generation = 0
+        self.expired_generation: Optional[int] = None
+        self.counts = {"requests": 0, "ok": 0, "throttled": 0, "errors": 0, "expired_ignored": 0, "waited": 0.0}
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def configure(self, rate: Optional[float] = None, max_rate: Optional[float] = None):
+        """Zmienia parametry w miejscu - sesje trzymające ten limiter od razu widzą nowe tempo."""
+        with self._lock:
+            if max_rate is not None:
+                self.max_rate = max(max_rate, self.min_rate)
+            if rate is not None:
+                self.rate = rate
+            self.rate = min(max(self.rate, self.min_rate), self.max_rate)
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self) -> float:
+        """Czeka na token (i koniec backoffu). Zwraca łączny czas oczekiwania w sekundach."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self.blocked_until:
+                    delay = self.blocked_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    self.counts["requests"] += 1
+                    self.counts["waited"] += waited
+                    return waited
+                else:
+                    delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def session_started(self):
+        """Nowa sesja JSF (wyszukiwanie / odnowienie po 440) - kolejne 440 znów jest sygnałem dla limitera."""
+        with self._lock:
+            self.session_generation += 1
+
+    def observe(self, status: Optional[int], latency: float, retry_after: Optional[float] = None):
+        """
+        Koryguje tempo po odpowiedzi: status None = timeout / błąd połączenia.
+        Sygnały przeciążenia zmniejszają tempo i ustawiają backoff dla wszystkich workerów.
+        440 liczy się raz na generację sesji - pozostałe 440 tej sesji są tylko zliczane.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if status == SESSION_EXPIRED_STATUS:
+                if self.expired_generation == self.session_generation:
+                    self.counts["expired_ignored"] += 1
+                    return
+                self.expired_generation = self.session_generation
+            if status is None or status in THROTTLE_STATUSES or status >= 500:
+                throttled = status is None or status in THROTTLE_STATUSES
+                self.counts["throttled" if throttled else "errors"] += 1
+                self.failures += 1
+                self.rate = max(self.min_rate, self.rate * (THROTTLE_DECREASE if throttled else SERVER_ERROR_DECREASE))
+                pause = max(backoff_delay(self.failures), retry_after or 0.0)
+                if now >= self.blocked_until:
+                    self.blocked_since = now
+                # Kolejne błędy w trakcie blokady mogą ją wydłużyć najwyżej do blocked_since + BACKOFF_MAX
+                # (albo Retry-After, jeśli serwer poprosił o dłuższą przerwę)
+                ceiling = self.blocked_since + max(BACKOFF_MAX, retry_after or 0.0)
+                self.blocked_until = min(max(self.blocked_until, now + pause), ceiling)
+                # Po backoffie startujemy z pustym wiadrem - bez paczki żądań naraz
+                self.tokens = min(self.tokens, 0.0)
+                return
+
+            self.counts["ok"] += 1
+            self.failures = 0
+            self.latency = latency if self.latency is None else (
+                LATENCY_SMOOTHING * latency + (1 - LATENCY_SMOOTHING) * self.latency
+            )
+            if self.latency > self.latency_target:
+                self.rate = max(self.min_rate, self.rate * LATENCY_DECREASE)
+            else:
+                self.rate = min(self.max_rate, self.rate + RATE_INCREASE_STEP)
+
+    @contextmanager
+    def track(self, status: int = 200):
+        """
+        Dla kroków przeglądarki (bez dostępu do statusu HTTP): token przed krokiem,
+        latencja kroku po nim; wyjątek (np. TimeoutException) liczy się jak timeout.
+        """
+        self.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        except Exception:
+            self.observe(None, time.monotonic() - started)
+            raise
+        self.observe(status, time.monotonic() - started)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(
+                self.counts,
+                waited=round(self.counts["waited"], 3),
+                rate=round(self.rate, 3),
+                latency=round(self.latency, 3) if self.latency is not None else None,
+            )
+
+
+_default_limiter: Optional[AdaptiveRateLimiter] = None
+_default_lock = threading.Lock()
+
+
+def get_limiter() -> AdaptiveRateLimiter:
+    """Domyślny limiter procesu - jeden dla wszystkich sesji HTTP i przeglądarek."""
+    global _default_limiter
+    with _default_lock:
+        if _default_limiter is None:
+            _default_limiter = AdaptiveRateLimiter()
+        return _default_limiter
+
+
+class ThrottledAdapter(HTTPAdapter):
+    """
+    HTTPAdapter, który przed każdym żądaniem pobiera token, a po nim raportuje status i latencję.
+    proxy_limiter - limiter wyjścia (handelsregister.egress) obowiązujący razem z limiter, nie zamiast niego:
+    tempo per IP nie może przekroczyć wspólnego limitu procesu.
+    observers - dodatkowe callbacki (status, latency), np. ocena zdrowia proxy (handelsregister.egress).
+    """
+
+    def __init__(self, limiter: Optional[AdaptiveRateLimiter] = None, **kwargs):
+        self.limiter = limiter or get_limiter()
+        self.proxy_limiter: Optional[AdaptiveRateLimiter] = None
+        self.observers: List[Callable[[Optional[int], float], None]] = []
+        super().__init__(**kwargs)
+
+    @property
+    def limiters(self) -> List[AdaptiveRateLimiter]:
+        """Limiter wyjścia (jeśli jest) i wspólny - token najpierw z węższego, żeby nie blokować wspólnego."""
+        proxy_limiter = self.proxy_limiter
+        if proxy_limiter is None or proxy_limiter is self.limiter:
+            return [self.limiter]
+        return [proxy_limiter, self.limiter]
+
+    def _notify(self, status: Optional[int], latency: float):
+        for observer in self.observers:
+            observer(status, latency)
+
+    def send(self, request, **kwargs):
+        metrics = get_metrics()
+        limiters = self.limiters
+        metrics.inc("throttle_wait_seconds_total", sum(limiter.acquire() for limiter in limiters))
+        started = time.monotonic()
+        try:
+            response = super().send(request, **kwargs)
+        except requests.RequestException:
+            latency = time.monotonic() - started
+            metrics.inc("http_requests_total", status="none")
+            metrics.observe("http_request_seconds", latency)
+            for limiter in limiters:
+                limiter.observe(None, latency)
+            self._notify(None, latency)
+            raise
+        # Przy stream=True to czas do nagłówków - body nie liczy się do latencji serwera
+        latency = time.monotonic() - started
+        metrics.inc("http_requests_total", status=response.status_code)
+        metrics.observe("http_request_seconds", latency)
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        for limiter in limiters:
+            limiter.observe(response.status_code, latency, retry_after=retry_after)
+        self._notify(response.status_code, latency)
+        return response
+
+
+def session_limiters(session: requests.Session) -> List[AdaptiveRateLimiter]:
+    """Limitery zamontowane w sesji requests (adaptery ThrottledAdapter); bez nich - domyślny limiter procesu."""
+    limiters = []
+    for adapter in session.adapters.values():
+        if isinstance(adapter, ThrottledAdapter):
+            limiters.extend(limiter for limiter in adapter.limiters if limiter not in limiters)
+    return limiters or [get_limiter()]
+
+
+def session_started(session: requests.Session):
+    """
+    Nowa sesja JSF na session: nowa generacja w limiterach faktycznie zamontowanych w sesji
+    (po bind_session także w limiterze wyjścia, nie tylko w domyślnym limiterze procesu).
+    """
+    for limiter in session_limiters(session):
+        limiter.session_started()
+
+
+def mount_throttled(session: requests.Session, limiter: Optional[AdaptiveRateLimiter] = None, **adapter_kwargs) -> requests.Session:
+    """Podpina ThrottledAdapter pod http:// i https:// sesji (adapter_kwargs np. pool_maxsize)."""
+    adapter = ThrottledAdapter(limiter, **adapter_kwargs)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
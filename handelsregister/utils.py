@@ -2,25 +2,29 @@ import json
 import os
 import re
 import time
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator
 from urllib.parse import unquote
 
 import undetected_chromedriver as uc
-from selenium.common.exceptions import TimeoutException, StaleElementReferenceException
 from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 
+from handelsregister.metrics import get_metrics
+from handelsregister.onclick_parser import parse_onclick, parse_si_request, si_request_from_parsed
+from handelsregister.throttle import get_limiter
+from handelsregister.waits import (
+    POLL_FREQUENCY,
+    wait_for_ajax_idle,
+)
+
 # Parametry wyszukiwania (takie same jak w SeleniumScraper.py)
 SEARCH_NUMBER = "25386"
 SEARCH_TYPE = "HRB"
 SEARCH_TOWN = "alle"
 SESSION_COOKIES_FILE = "session_cookies.json"
-
-# Globalna zmienna do przechowywania przechwyconych requestów (podobne do UrlHistory)
-_captured_requests = []
-
+# Katalog na cookies wielu niezależnych sesji (SessionPool) - jeden plik na sesję
+SESSIONS_DIR = "sessions"
 
 def inject_request_interceptor(driver):
     """
@@ -153,165 +157,81 @@ def inject_request_interceptor(driver):
         print(f"⚠️ Błąd przy wstrzykiwaniu interceptor: {e}")
 
 
-def get_captured_requests(driver) -> list:
-    """Pobiera przechwycone requesty z JavaScript (podobne do UrlHistory.getStore())."""
-    try:
-        captured = driver.execute_script("return window._capturedRequests || [];")
-        return captured if captured else []
-    except Exception:
-        return []
-
-
-def extract_params_from_onclick(onclick: str, link_id: str, current_url: str) -> Optional[dict]:
+def extract_params_from_onclick(onclick: str, current_url: str) -> Optional[dict]:
     """
     Wyciąga parametry POST z onclick BEZ wykonywania kliknięcia.
-    NIE KLIKA - tylko parsuje JavaScript z onclick.
+    NIE KLIKA - tylko parsuje JavaScript z onclick (handelsregister.onclick_parser).
     Zwraca dict z URL i parametrami POST.
     """
-    try:
-        if not onclick or "PrimeFaces" not in onclick or "Global.Dokumentart.SI" not in onclick:
-            return None
-        
-        # Wyciągamy form name z onclick
-        form_match = re.search(r"submit\(['\"]([^'\"]+)['\"]\)", onclick)
-        form_name = form_match.group(1) if form_match else "ergebnissForm"
-        
-        # Budujemy słownik parametrów POST na podstawie onclick
-        post_params = {}
-        
-        # Wyciągamy wszystkie parametry z onclick (wszystkie pary key:value)
-        all_params_match = re.findall(r"'([^']+)':\s*'([^']*)'", onclick)
-        for key, value in all_params_match:
-            # Usuwamy spacje z klucza (czasami jest spacja po dwukropku)
-            key = key.strip()
-            post_params[key] = value
-        
-        # Tworzymy dict z parametrami requestu
-        return {
-            "url": current_url.split("#")[0],
-            "method": "POST",
-            "post_data": "&".join([f"{k}={v}" for k, v in post_params.items()]),
-            "post_parameters": post_params,
-            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
-            "document_type": "SI",
-        }
-        
-    except Exception as e:
-        print(f"⚠️ Błąd przy wyciąganiu parametrów z onclick: {e}")
+    onclick_request = parse_si_request(onclick, current_url)
+    if onclick_request is None:
         return None
+    return {
+        "url": onclick_request.url,
+        "method": "POST",
+        "post_data": onclick_request.post_data,
+        "post_parameters": onclick_request.parameters,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "document_type": "SI",
+    }
 
 
-def reconstruct_download_url(driver, link_element, onclick: str) -> tuple[Optional[str], Optional[dict], Optional[dict]]:
+def link_info_from_attrs(attrs: Dict[str, Any], current_url: Optional[str] = None) -> Dict[str, Any]:
     """
-    Wyciąga parametry POST z onclick BEZ wykonywania kliknięcia i BEZ pobierania pliku.
-    TYLKO parsuje JavaScript z onclick - NIE KLIKA!
-    Zwraca tuple: (base_url, post_params_dict, captured_request_dict)
+    Buduje link_info (ten sam format co extract_link_info) z gotowego słownika atrybutów linku.
+    Klucze attrs: href, text, title, onclick, id, data_url, formaction.
+    Używane zarówno przez Selenium (atrybuty z WebElementu), jak i tryb HTTP (atrybuty z HTML).
+    Parametry POST linku SI są trzymane raz - w link_info["request"]["parameters"].
     """
     try:
-        current_url = driver.current_url.split("#")[0]
-        link_id = link_element.get_attribute("id") or ""
-        
-        # Wyciągamy parametry z onclick BEZ klikania
-        captured_request = extract_params_from_onclick(onclick, link_id, current_url)
-        
-        if captured_request:
-            url = captured_request.get("url")
-            post_params = captured_request.get("post_parameters", {})
-            return url, post_params, captured_request
-        
-        return None, None, None
-        
-    except Exception as e:
-        print(f"⚠️ Błąd przy wyciąganiu parametrów z onclick: {e}")
-        return None, None, None
+        href = attrs.get("href") or "#"
+        onclick = attrs.get("onclick") or ""
+        id_attr = attrs.get("id") or ""
 
-
-def extract_link_info(link_element, driver=None) -> Dict[str, Any]:
-    """
-    Wyciąga szczegółowe informacje o linku, w tym rzeczywisty URL dla linków z href="#".
-    Dla PrimeFaces linków z onclick, próbuje wyciągnąć parametry z JavaScript.
-    """
-    try:
-        href = link_element.get_attribute("href") or "#"
-        text = link_element.text.strip()
-        title = link_element.get_attribute("title") or ""
-        onclick = link_element.get_attribute("onclick") or ""
-        id_attr = link_element.get_attribute("id") or ""
-        
         # Sprawdzamy różne atrybuty, które mogą zawierać URL
-        data_url = link_element.get_attribute("data-url") or link_element.get_attribute("data-href")
-        formaction = link_element.get_attribute("formaction")
-        
+        data_url = attrs.get("data_url")
+        formaction = attrs.get("formaction")
+
         link_info = {
             "href": href,
-            "text": text,
-            "title": title,
+            "text": (attrs.get("text") or "").strip(),
+            "title": attrs.get("title") or "",
             "id": id_attr,
-            "onclick": onclick[:500] if onclick else "",  # Pierwsze 500 znaków onclick
+            "onclick": onclick,
             "data_url": data_url,
             "formaction": formaction,
         }
-        
-        # Jeśli href to "#", próbujemy wyciągnąć więcej informacji
-        if href == "#" or href.startswith("javascript:") or (href and "#" in href and href.endswith("#")):
-            # Dla PrimeFaces - wyciągamy ID elementu i parametry z onclick
+
+        # Jedno parsowanie onclick (parser z pamięcią szablonów) na property, formularz i request SI
+        parsed = parse_onclick(onclick)
+
+        # Jeśli href to "#", dla PrimeFaces zapisujemy ID elementu, property i formularz z onclick
+        if href == "#" or href.startswith("javascript:") or href.endswith("#"):
             if id_attr:
                 link_info["element_id"] = id_attr
-                
-            # Próbujemy wyciągnąć parametry z onclick (dla PrimeFaces)
-            if "PrimeFaces" in onclick:
-                property_match = re.search(r"'property':\s*'([^']+)'", onclick)
-                if property_match:
-                    link_info["property"] = property_match.group(1)
-
-                form_match = re.search(r"submit\(['\"]([^'\"]+)['\"]\)", onclick)
-                if form_match:
-                    link_info["form_name"] = form_match.group(1)
+            if parsed is not None:
+                form_name, property_value, _ = parsed
+                if property_value:
+                    link_info["property"] = property_value
+                if form_name:
+                    link_info["form_name"] = form_name
 
         actual_url = href
         if data_url:
             actual_url = data_url
         elif formaction:
             actual_url = formaction
-        elif href != "#" and not href.startswith("javascript:") and not (href.endswith("#") and "#" in href):
-            actual_url = href
-
-        if driver and "PrimeFaces" in onclick and "Global.Dokumentart.SI" in onclick:
-            try:
-                base_url, post_params, captured_request = reconstruct_download_url(driver, link_element, onclick)
-                if base_url and post_params:
-                    link_info["request_url"] = base_url
-                    actual_url = base_url
-                    
-                    # Szczegółowe informacje o POST request
-                    link_info["request"] = {
-                        "method": "POST",
-                        "url": base_url,
-                        "content_type": "application/x-www-form-urlencoded",
-                        "parameters": post_params,
-                    }
-                    
-                    # Jeśli przechwyciliśmy rzeczywisty request, dodajemy szczegóły z pełnymi danymi
-                    if captured_request:
-                        link_info["captured_request"] = {
-                            "url": captured_request.get("url"),
-                            "method": captured_request.get("method"),
-                            "post_data": captured_request.get("post_data"),  # Surowy string POST data
-                            "post_parameters": captured_request.get("post_parameters"),  # Parsowane parametry
-                            "timestamp": captured_request.get("timestamp"),
-                            "document_type": captured_request.get("document_type", "SI"),
-                        }
-                    
-                    # Dodatkowo: URL z parametrami jako GET (dla informacji, choć faktycznie to POST)
-                    get_params = "&".join([f"{k}={v}" for k, v in post_params.items()])
-                    link_info["request_url_with_params"] = f"{base_url}?{get_params}"
-            except Exception as e:
-                print(f"⚠️ Błąd przy przechwytywaniu requestu dla linku {id_attr}: {e}")
-        
+
+        onclick_request = si_request_from_parsed(parsed, current_url) if current_url else None
+        if onclick_request is not None:
+            link_info["request_url"] = onclick_request.url
+            link_info["request"] = onclick_request.to_request()
+            actual_url = onclick_request.url
+
         link_info["actual_url"] = actual_url
-        
+
         return link_info
-        
+
     except Exception as e:
         return {
             "href": "#",
@@ -322,21 +242,227 @@ def extract_link_info(link_element, driver=None) -> Dict[str, Any]:
         }
 
 
-def build_driver() -> uc.Chrome:
-    """Konfiguracja sterownika Chrome - TYLKO do przechwytywania requestów, NIE pobiera plików."""
+def extract_link_info(link_element, driver=None) -> Dict[str, Any]:
+    """
+    Wyciąga szczegółowe informacje o linku, w tym rzeczywisty URL dla linków z href="#".
+    Dla PrimeFaces linków z onclick, próbuje wyciągnąć parametry z JavaScript.
+    """
+    try:
+        attrs = {
+            "href": link_element.get_attribute("href"),
+            "text": link_element.text,
+            "title": link_element.get_attribute("title"),
+            "onclick": link_element.get_attribute("onclick"),
+            "id": link_element.get_attribute("id"),
+            "data_url": link_element.get_attribute("data-url") or link_element.get_attribute("data-href"),
+            "formaction": link_element.get_attribute("formaction"),
+        }
+        current_url = driver.current_url.split("#")[0] if driver else None
+        return link_info_from_attrs(attrs, current_url)
+
+    except Exception as e:
+        return {
+            "href": "#",
+            "text": "",
+            "title": "",
+            "error": str(e),
+            "actual_url": "#"
+        }
+
+
+def build_row_data(row_index: int, links_attrs: list, current_url: str, columns: Optional[list] = None) -> Dict[str, Any]:
+    """
+    Buduje row_data ({"row_number", "row_display", "si_links"}) dla jednego wiersza wyników
+    z listy słowników atrybutów linków. Wspólne dla trybu Selenium i HTTP.
+    Jeśli podano columns (teksty komórek wiersza: firma, siedziba, sąd...), trafiają do row_data["columns"].
+    """
+    row_data = {
+        "row_number": row_index,  # 0-based index (jak w ID)
+        "row_display": row_index + 1,  # 1-based dla wyświetlania
+        "si_links": []
+    }
+    if columns is not None:
+        row_data["columns"] = columns
+
+    for attrs in links_attrs:
+        try:
+            # Sprawdzamy czy to faktycznie link SI
+            onclick = attrs.get("onclick") or ""
+            if "Global.Dokumentart.SI" not in onclick:
+                continue
+
+            # Sprawdzamy czy ID ma poprawny format z numerem wiersza
+            link_id = attrs.get("id") or ""
+            expected_id_pattern = f"ergebnissForm:selectedSuchErgebnisFormTable:{row_index}:"
+            if expected_id_pattern not in link_id:
+                print(f"⚠️ Wiersz {row_index}: Nieoczekiwany format ID: {link_id}")
+                continue
+
+            link_info = link_info_from_attrs(attrs, current_url)
+
+            if link_info.get("request"):
+                row_data["si_links"].append(link_info)
+            else:
+                print(f"⚠️ Wiersz {row_index}: Nie udało się przechwycić requestu dla linku SI")
+
+        except Exception as e:
+            print(f"⚠️ Błąd przy zbieraniu linku SI w wierszu {row_index}: {e}")
+            continue
+
+    return row_data
+
+
+# Jeden execute_script serializuje całą tabelę wyników do JSON (zamiast setek round tripów WebDrivera)
+ROWS_EXTRACT_SCRIPT = """
+    var tbody = document.getElementById(arguments[0]);
+    var result = {url: window.location.href.split('#')[0], rows: []};
+    if (!tbody) { return result; }
+    var trs = tbody.querySelectorAll(':scope > tr');
+    for (var i = 0; i < trs.length; i++) {
+        var tr = trs[i];
+        var columns = [];
+        for (var c = 0; c < tr.cells.length; c++) {
+            columns.push((tr.cells[c].innerText || '').replace(/\\s+/g, ' ').trim());
+        }
+        var links = [];
+        var anchors = tr.querySelectorAll("a[onclick*='Global.Dokumentart.SI']");
+        for (var a = 0; a < anchors.length; a++) {
+            var el = anchors[a];
+            links.push({
+                id: el.id || '',
+                href: el.href || '#',
+                text: el.innerText || '',
+                title: el.getAttribute('title') || '',
+                onclick: el.getAttribute('onclick') || '',
+                data_url: el.getAttribute('data-url') || el.getAttribute('data-href'),
+                formaction: el.getAttribute('formaction')
+            });
+        }
+        // data-ri = globalny indeks wiersza PrimeFaces (poprawny także na kolejnych stronach)
+        var ri = parseInt(tr.getAttribute('data-ri'), 10);
+        result.rows.push({index: isNaN(ri) ? i : ri, columns: columns, links: links});
+    }
+    return result;
+"""
+RESULTS_TBODY_ID = "ergebnissForm:selectedSuchErgebnisFormTable_data"
+RESULTS_TABLE_ID = "ergebnissForm:selectedSuchErgebnisFormTable"
+
+# Klik "następna strona" paginatora tabeli wyników; zwraca data-ri pierwszego wiersza przed klikiem
+# albo null, jeśli to ostatnia strona (przycisk ukryty/wyłączony)
+NEXT_PAGE_SCRIPT = """
+    var table = document.getElementById(arguments[0]);
+    if (!table) { return null; }
+    var next = table.querySelector('.ui-paginator-next');
+    if (!next || next.classList.contains('ui-state-disabled')) { return null; }
+    var first = document.querySelector("[id='" + arguments[1] + "'] > tr");
+    var before = first ? first.getAttribute('data-ri') : '';
+    next.click();
+    return before || '';
+"""
+FIRST_ROW_INDEX_SCRIPT = """
+    var first = document.querySelector("[id='" + arguments[0] + "'] > tr");
+    return first ? first.getAttribute('data-ri') : null;
+"""
+
+
+def extract_result_rows(driver, tbody_id: str = RESULTS_TBODY_ID) -> Dict[str, Any]:
+    """
+    Pobiera wszystkie wiersze tabeli wyników jednym wywołaniem execute_script.
+    Zwraca {"url": current_url, "rows": [{"index", "columns", "links": [attrs...]}, ...]}.
+    """
+    with get_metrics().span("extract_rows_script"):
+        payload = driver.execute_script(ROWS_EXTRACT_SCRIPT, tbody_id) or {}
+    return {"url": payload.get("url") or "", "rows": payload.get("rows") or []}
+
+
+def click_next_results_page(driver, timeout: float = 15) -> bool:
+    """
+    Przechodzi paginatorem PrimeFaces na następną stronę wyników.
+    Zwraca False na ostatniej stronie; czeka aż tbody zostanie podmienione (zmiana data-ri pierwszego wiersza).
+    Kliknięcie = żądanie do serwera, więc przechodzi przez wspólny limiter (throttle).
+    """
+    with get_metrics().span("next_page"), get_limiter().track():
+        before = driver.execute_script(NEXT_PAGE_SCRIPT, RESULTS_TABLE_ID, RESULTS_TBODY_ID)
+        if before is None:
+            return False
+        WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(
+            lambda d: d.execute_script(FIRST_ROW_INDEX_SCRIPT, RESULTS_TBODY_ID) not in (None, before)
+        )
+    wait_for_ajax_idle(driver)
+    return True
+
+
+def iter_result_pages(driver, max_pages: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """Generator stron wyników (Selenium): bieżąca strona, potem kolejne przez paginator."""
+    page = 0
+    while True:
+        yield extract_result_rows(driver)
+        page += 1
+        if max_pages is not None and page >= max_pages:
+            return
+        if not click_next_results_page(driver):
+            return
+
+
+def collect_links_from_rows(rows: list, current_url: str) -> list:
+    """Buduje collected_links z zserializowanych wierszy (extract_result_rows lub parser HTML)."""
+    collected_links = []
+    for row in rows:
+        row_index = row["index"]
+        try:
+            row_data = build_row_data(row_index, row.get("links") or [], current_url, row.get("columns"))
+        except Exception as e:
+            print(f"❌ Błąd przy rekordzie {row_index}: {e}")
+            continue
+
+        if row_data["si_links"]:
+            collected_links.append(row_data)
+            print(f"Wiersz {row_index} (firma {row_index + 1}): Znaleziono {len(row_data['si_links'])} linków SI")
+    return collected_links
+
+
+def filename_from_content_disposition(content_disposition: str) -> Optional[str]:
+    """
+    Wyciąga nazwę pliku z nagłówka Content-Disposition.
+    Np. attachment;filename="SN-Chemnitz_HRB_25386+SI-20251210175648.xml"
+    """
+    if not content_disposition:
+        return None
+    filename_match = re.search(r'filename[^;=\n]*=(([\'"]).*?\2|[^;\n]*)', content_disposition)
+    if not filename_match:
+        return None
+    filename = filename_match.group(1).strip('"\'')
+    # Dekodujemy URL encoding jeśli potrzeba
+    try:
+        filename = unquote(filename)
+    except Exception:
+        pass
+    return os.path.basename(filename) or None
+
+
+def build_driver(proxy: Optional[str] = None, headless: bool = True) -> uc.Chrome:
+    """
+    Konfiguracja sterownika Chrome - TYLKO do przechwytywania requestów, NIE pobiera plików.
+    proxy - np. "socks5://10.0.0.2:1080" (Proxy.chrome_server() z puli egress),
+    headless=False - widoczne okno (debugowanie).
+    """
     options = uc.ChromeOptions()
     options.add_argument("--disable-blink-features=AutomationControlled")
     options.add_argument("--disable-gpu")
     options.add_argument("--no-sandbox")
     options.add_argument("--window-size=1280,720")
-    options.add_argument("--headless")
+    if headless:
+        options.add_argument("--headless")
+    if proxy:
+        options.add_argument(f"--proxy-server={proxy}")
     
     # NIE ustawiamy download directory - nie pobieramy plików!
 
     # Włączamy logi performance, żeby przechwycić requesty sieciowe
     options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
     
-    driver = uc.Chrome(options=options)
+    with get_metrics().span("build_driver"):
+        driver = uc.Chrome(options=options)
     
     # Włączamy tylko nasłuch sieci w CDP (bez blokowania requestów)
     try:
@@ -349,18 +475,30 @@ def build_driver() -> uc.Chrome:
 
 def wait_for_loading_gone(driver, timeout=10):
     """Czeka aż zniknie spinner ładowania."""
-    try:
-        WebDriverWait(driver, timeout).until(
-            EC.invisibility_of_element_located((By.CLASS_NAME, "ui-icon-loading"))
-        )
-    except Exception:
-        pass
-    try:
-        WebDriverWait(driver, timeout).until(
-            EC.invisibility_of_element_located((By.ID, "j_idt15:statusDialog"))
-        )
-    except Exception:
-        pass
+    metrics = get_metrics()
+    with metrics.span("wait_for_loading_gone"):
+        try:
+            WebDriverWait(driver, timeout).until(
+                EC.invisibility_of_element_located((By.CLASS_NAME, "ui-icon-loading"))
+            )
+        except Exception:
+            metrics.inc("wait_timeouts_total", wait="loading_icon")
+        try:
+            WebDriverWait(driver, timeout).until(
+                EC.invisibility_of_element_located((By.ID, "j_idt15:statusDialog"))
+            )
+        except Exception:
+            metrics.inc("wait_timeouts_total", wait="status_dialog")
+
+
+def session_cookies_file(session_id: Optional[str] = None, sessions_dir: str = SESSIONS_DIR) -> str:
+    """
+    Zwraca plik cookies dla danej sesji. Bez session_id - globalny SESSION_COOKIES_FILE (tryb jednej sesji),
+    z session_id - osobny plik w sessions_dir, żeby równoległe sesje nie nadpisywały sobie cookies.
+    """
+    if session_id is None:
+        return SESSION_COOKIES_FILE
+    return os.path.join(sessions_dir, f"session_cookies_{session_id}.json")
 
 
 def save_session_cookies(driver, cookies_file: str = SESSION_COOKIES_FILE):
@@ -369,7 +507,7 @@ def save_session_cookies(driver, cookies_file: str = SESSION_COOKIES_FILE):
         cookies = driver.get_cookies()
         os.makedirs(os.path.dirname(cookies_file) or ".", exist_ok=True)
         with open(cookies_file, "w", encoding="utf-8") as f:
-            json.dump(cookies, f, indent=2, ensure_ascii=False)
+            json.dump(cookies, f, ensure_ascii=False, separators=(",", ":"))
         print(f"✅ Zapisano {len(cookies)} cookies do {cookies_file}")
         return True
     except Exception as e:
@@ -388,197 +526,3 @@ def load_session_cookies(cookies_file: str = SESSION_COOKIES_FILE):
     except Exception as e:
         print(f"⚠️ Błąd przy ładowaniu cookies: {e}")
         return []
-
-
-def run_etap1_scrape(target_url: str, download_dir: str = "") -> list:
-    """Uruchamia scrapowanie i zwraca listę linków z wyników wyszukiwania."""
-    driver = None
-    collected_links = []
-    
-    try:
-        driver = build_driver()
-        driver.get(target_url)
-        
-        # Wstrzykujemy JavaScript interceptor PRZED interakcją ze stroną
-        inject_request_interceptor(driver)
-
-        wait = WebDriverWait(driver, 15)
-        print("ETAP1 - NORMAL SUCHE")
-        normale_suche = wait.until(
-            EC.element_to_be_clickable((By.ID, "naviForm:normaleSucheLink"))
-        )
-        normale_suche.click()
-        wait_for_loading_gone(driver)
-        time.sleep(1)
-
-        # 3. Wypełnianie formularza (INPUT DATA)
-        print("ETAP2 - WYBOR Z FORMULARZA")
-
-        # HRB (Registerart)
-        register_label = wait.until(
-            EC.element_to_be_clickable((By.ID, "form:registerArt_label"))
-        )
-        register_label.click()
-        time.sleep(1)
-        hrb_option = wait.until(
-            EC.element_to_be_clickable(
-                (By.XPATH, f"//li[contains(text(), '{SEARCH_TYPE}')]")
-            )
-        )
-        hrb_option.click()
-        wait_for_loading_gone(driver)
-        time.sleep(1)
-
-        try:
-            driver.find_element(By.TAG_NAME, "body").send_keys(Keys.ESCAPE)
-            WebDriverWait(driver, 5).until(
-                EC.invisibility_of_element_located((By.ID, "form:registerArt_panel"))
-            )
-        except Exception:
-            driver.execute_script("document.body.click();")
-
-        # NUMBER (Registernummer)
-        register_input = wait.until(
-            EC.presence_of_element_located((By.ID, "form:registerNummer"))
-        )
-        register_input.clear()
-        register_input.send_keys(SEARCH_NUMBER)
-        time.sleep(1)
-
-        # ALL (Registergericht - miasto/sąd)
-        register_label1 = wait.until(
-            EC.element_to_be_clickable((By.ID, "form:registergericht_label"))
-        )
-        register_label1.click()
-        time.sleep(2)
-        town_option = wait.until(
-            EC.element_to_be_clickable(
-                (
-                    By.XPATH,
-                    f"//ul[@id='form:registergericht_items']//li[@data-label='{SEARCH_TOWN}']",
-                )
-            )
-        )
-        town_option.click()
-        wait_for_loading_gone(driver)
-        time.sleep(1)
-
-        # Opcjonalnie: Ustawienie 100 wyników
-        try:
-            per_page_label = driver.find_element(By.ID, "form:ergebnisseProSeite_label")
-            per_page_label.click()
-            per_page_100 = wait.until(
-                EC.element_to_be_clickable((By.XPATH, "//li[contains(@data-label, '100')]"))
-            )
-            per_page_100.click()
-            wait_for_loading_gone(driver)
-            time.sleep(1)
-        except Exception:
-            print("⚠️ Nie udało się zmienić liczby wyników na 100, zostawiam domyślną.")
-
-        suche_btn = wait.until(
-            EC.element_to_be_clickable((By.ID, "form:btnSuche"))
-        )
-        try:
-            suche_btn.click()
-        except Exception:
-            driver.execute_script("arguments[0].click();", suche_btn)
-
-        # Czekamy na załadowanie tabeli wyników
-        wait.until(EC.presence_of_element_located((By.ID, "ergebnissForm:selectedSuchErgebnisFormTable_data")))
-        time.sleep(2)
-        wait_for_loading_gone(driver)
-
-        # Zapisujemy cookies z aktywnej sesji (potrzebne do późniejszego pobierania plików)
-        save_session_cookies(driver)
-
-        print("ETAP3 - ZBIERANIE LINKOW SI")
-        
-        # Pobieramy wszystkie wiersze tabeli
-        rows = driver.find_elements(By.XPATH, "//tbody[@id='ergebnissForm:selectedSuchErgebnisFormTable_data']/tr")
-        print(f"Znaleziono wierszy: {len(rows)}")
-
-        # Iterujemy po wierszach (X = 0, 1, 2, ...)
-        for row_index, row in enumerate(rows):
-            try:
-                # Dla każdego wiersza szukamy TYLKO linków SI
-                # Format ID: ergebnissForm:selectedSuchErgebnisFormTable:X:j_idt219:6:fade_
-                # gdzie X to row_index (0, 1, 2, ...)
-                
-                # Szukamy linków z onclick zawierającym 'Global.Dokumentart.SI'
-                si_links = row.find_elements(
-                    By.XPATH, 
-                    f".//a[contains(@onclick, 'Global.Dokumentart.SI')]"
-                )
-                
-                row_data = {
-                    "row_number": row_index,  # 0-based index (jak w ID)
-                    "row_display": row_index + 1,  # 1-based dla wyświetlania
-                    "si_links": []
-                }
-
-                for link in si_links:
-                    try:
-                        # Sprawdzamy czy to faktycznie link SI
-                        onclick = link.get_attribute("onclick") or ""
-                        if "Global.Dokumentart.SI" not in onclick:
-                            continue
-
-                        # Sprawdzamy czy ID ma poprawny format z numerem wiersza
-                        link_id = link.get_attribute("id") or ""
-                        expected_id_pattern = f"ergebnissForm:selectedSuchErgebnisFormTable:{row_index}:"
-                        if expected_id_pattern not in link_id:
-                            print(f"⚠️ Wiersz {row_index}: Nieoczekiwany format ID: {link_id}")
-                            continue
-                        
-                        # Przechwytujemy request BEZ pobierania pliku
-                        link_info = extract_link_info(link, driver)
-
-                        # Sprawdzamy czy mamy przechwycony request z parametrami
-                        if link_info.get("request") or link_info.get("captured_request"):
-                            # Upewniamy się, że mamy wszystkie potrzebne parametry
-                            if not link_info.get("request") and link_info.get("captured_request"):
-                                # Jeśli mamy tylko captured_request, tworzymy request z niego
-                                captured = link_info.get("captured_request")
-                                link_info["request"] = {
-                                    "method": captured.get("method", "POST"),
-                                    "url": captured.get("url"),
-                                    "content_type": "application/x-www-form-urlencoded",
-                                    "parameters": captured.get("post_parameters", {}),
-                                }
-                            
-                            row_data["si_links"].append(link_info)
-                        else:
-                            print(f"⚠️ Wiersz {row_index}: Nie udało się przechwycić requestu dla linku SI")
-                            
-                    except Exception as e:
-                        print(f"⚠️ Błąd przy zbieraniu linku SI w wierszu {row_index}: {e}")
-                        continue
-
-                if row_data["si_links"]:
-                    collected_links.append(row_data)
-                    print(f"Wiersz {row_index} (firma {row_index + 1}): Znaleziono {len(row_data['si_links'])} linków SI")
-
-            except StaleElementReferenceException:
-                print(f"⚠️ Rekord {row_index}: Element wygasł (DOM odświeżony).")
-                continue
-            except Exception as e:
-                print(f"❌ Błąd przy rekordzie {row_index}: {e}")
-
-        print(f"SCRAPOWANIE ZAKONCZONE - SUKCES: Zebrano {len(collected_links)} wierszy z linkami SI")
-        
-        # Liczymy łącznie wszystkie przechwycone requesty SI
-        total_si_requests = sum(len(item.get("si_links", [])) for item in collected_links)
-        print(f"ℹ️ Łącznie przechwycono {total_si_requests} requestów SI z parametrami POST")
-        
-        driver.quit()
-        return collected_links
-
-    except Exception as e:
-        print(f"❌ Błąd podczas scrapowania: {e}")
-        if driver:
-            try:
-                driver.quit()
-            except:
-                pass
-        return collected_links
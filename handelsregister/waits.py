@@ -0,0 +1,116 @@
+import time
+from contextlib import contextmanager
+from typing import Optional, Dict, Iterator
+
+from selenium.webdriver.support.ui import WebDriverWait
+
+from handelsregister.metrics import get_metrics
+
+# Czekanie na rzeczywiste sygnały strony zamiast stałych time.sleep:
+# - kolejka ajax PrimeFaces / jQuery pusta,
+# - zmiana widoczności panelu (MutationObserver),
+# - przyrost window._capturedRequests.
+POLL_FREQUENCY = 0.05
+
+AJAX_IDLE_SCRIPT = """
+    var pfIdle = true;
+    try {
+        if (window.PrimeFaces && PrimeFaces.ajax && PrimeFaces.ajax.Queue) {
+            pfIdle = PrimeFaces.ajax.Queue.isEmpty();
+        }
+    } catch (e) {}
+    var jqIdle = !(window.jQuery) || jQuery.active === 0;
+    return document.readyState === 'complete' && pfIdle && jqIdle;
+"""
+
+# Async script: czeka (MutationObserver) aż panel będzie widoczny/ukryty; callback(true/false)
+PANEL_STATE_SCRIPT = """
+    var panelId = arguments[0], wantVisible = arguments[1], timeoutMs = arguments[2];
+    var done = arguments[arguments.length - 1];
+    function isVisible() {
+        var el = document.getElementById(panelId);
+        if (!el) { return false; }
+        var style = window.getComputedStyle(el);
+        return style.display !== 'none' && style.visibility !== 'hidden' && el.offsetHeight > 0;
+    }
+    if (isVisible() === wantVisible) { done(true); return; }
+    var finished = false;
+    var observer = new MutationObserver(function() {
+        if (!finished && isVisible() === wantVisible) {
+            finished = true; observer.disconnect(); done(true);
+        }
+    });
+    observer.observe(document.body, {attributes: true, childList: true, subtree: true,
+                                     attributeFilter: ['style', 'class']});
+    setTimeout(function() {
+        if (!finished) { finished = true; observer.disconnect(); done(isVisible() === wantVisible); }
+    }, timeoutMs);
+"""
+
+
+def wait_for_ajax_idle(driver, timeout: float = 10) -> bool:
+    """Czeka aż kolejka ajax PrimeFaces i jQuery będą puste (zamiast time.sleep po kliknięciu)."""
+    try:
+        WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(
+            lambda d: d.execute_script(AJAX_IDLE_SCRIPT)
+        )
+        return True
+    except Exception:
+        get_metrics().inc("wait_timeouts_total", wait="ajax_idle")
+        return False
+
+
+def wait_for_panel(driver, panel_id: str, visible: bool = True, timeout: float = 5) -> bool:
+    """Czeka na pokazanie/ukrycie panelu (np. form:registerArt_panel) sygnalizowane mutacją DOM."""
+    try:
+        driver.set_script_timeout(timeout + 1)
+        if driver.execute_async_script(PANEL_STATE_SCRIPT, panel_id, visible, int(timeout * 1000)):
+            return True
+    except Exception:
+        pass
+    get_metrics().inc("wait_timeouts_total", wait="panel")
+    return False
+
+
+class StepTimer:
+    """
+    Pomiar czasu poszczególnych kroków (np. normale_suche, registerart, suche) w sekundach.
+    Każdy pomiar trafia też do histogramu step_seconds{flow=name, step=...} (handelsregister.metrics).
+    """
+
+    def __init__(self, name: str = ""):
+        self.name = name
+        self.steps: Dict[str, float] = {}
+        self._started = time.monotonic()
+        self._last_lap = self._started
+
+    @contextmanager
+    def step(self, step_name: str) -> Iterator[None]:
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(step_name, time.monotonic() - started)
+
+    def record(self, step_name: str, seconds: float):
+        self.steps[step_name] = self.steps.get(step_name, 0.0) + seconds
+        get_metrics().observe("step_seconds", seconds, flow=self.name, step=step_name)
+
+    def lap(self, step_name: str):
+        """Zapisuje czas od poprzedniego lap (lub startu) jako krok step_name - dla liniowych przepływów."""
+        now = time.monotonic()
+        self.record(step_name, now - self._last_lap)
+        self._last_lap = now
+
+    @property
+    def total(self) -> float:
+        return time.monotonic() - self._started
+
+    def summary(self) -> Dict[str, float]:
+        result = {name: round(seconds, 3) for name, seconds in self.steps.items()}
+        result["total"] = round(self.total, 3)
+        return result
+
+    def print_summary(self, prefix: Optional[str] = None):
+        parts = ", ".join(f"{name}={seconds:.2f}s" for name, seconds in self.summary().items())
+        print(f"⏱️ {prefix or self.name}: {parts}")
@@ -0,0 +1,62 @@
+import os
+import sys
+
+import pytest
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from bench.mock_server import MockHandelsregister, row_html
+from handelsregister import throttle
+from handelsregister.metrics import get_metrics
+from handelsregister.utils import RESULTS_TBODY_ID
+
+# Testy działają na lokalnym zamienniku handelsregister.de (bench/mock_server.py) - bez sieci i przeglądarki.
+# Limiter procesu dostaje wysokie tempo, żeby testy mierzyły logikę, a nie dławienie.
+TEST_RATE = 1000.0
+TEST_DOC_SIZE = 2000
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """Każdy test we własnym katalogu - cookies, results/, sessions/ i plikiXML/ nie mieszają się między testami."""
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture(autouse=True)
+def fast_limiter(monkeypatch):
+    """Świeży limiter procesu (bez backoffu z poprzednich testów) i wyzerowane metryki."""
+    limiter = throttle.AdaptiveRateLimiter(rate=TEST_RATE, max_rate=TEST_RATE)
+    monkeypatch.setattr(throttle, "_default_limiter", limiter)
+    get_metrics().reset()
+    return limiter
+
+
+@pytest.fixture
+def mock_factory():
+    """Uruchamia MockHandelsregister z podanymi parametrami; wszystkie serwery są zatrzymywane po teście."""
+    servers = []
+
+    def _start(**kwargs) -> MockHandelsregister:
+        kwargs.setdefault("doc_size", TEST_DOC_SIZE)
+        server = MockHandelsregister(**kwargs).start()
+        servers.append(server)
+        return server
+
+    yield _start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def mock_server(mock_factory) -> MockHandelsregister:
+    """Mock z 30 wierszami (jedna strona wyników po 100)."""
+    return mock_factory(row_count=30)
+
+
+def results_table(indexes) -> str:
+    """Tabela wyników (tbody RESULTS_TBODY_ID) z wierszami mocka o podanych indeksach."""
+    rows = "".join(row_html(index) for index in indexes)
+    return f'<table><tbody id="{RESULTS_TBODY_ID}">{rows}</tbody></table>'
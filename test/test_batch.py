@@ -0,0 +1,64 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from handelsregister import batch
+from handelsregister.batch import IN_FLIGHT_PER_WORKER, load_queries, run_batch
+from handelsregister.jsonl import iter_jsonl
+
+WORKERS = 2
+
+
+class _TrackingExecutor(ThreadPoolExecutor):
+    """Executor liczący zadania przekazane, a jeszcze nieukończone (szczyt = ile batch trzyma w locie)."""
+
+    peak = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._outstanding = 0
+        self._tracking_lock = threading.Lock()
+
+    def _finished(self, future):
+        with self._tracking_lock:
+            self._outstanding -= 1
+
+    def submit(self, *args, **kwargs):
+        with self._tracking_lock:
+            self._outstanding += 1
+            _TrackingExecutor.peak = max(_TrackingExecutor.peak, self._outstanding)
+        future = super().submit(*args, **kwargs)
+        future.add_done_callback(self._finished)
+        return future
+
+
+def _queries_file(path, count: int) -> str:
+    lines = ["register_type,register_number,court"] + [f"HRB,{1000 + n},alle" for n in range(count)]
+    # Duplikat i niepełny wiersz - pomijane
+    lines += ["HRB,1000,alle", "HRB,,alle"]
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_load_queries_normalizes_and_skips_incomplete(tmp_path):
+    queries = load_queries(_queries_file(tmp_path / "queries.csv", 2))
+
+    assert queries[0] == {"search_type": "HRB", "search_number": "1000", "search_town": "alle"}
+    assert len(queries) == 3
+
+
+def test_batch_runs_all_queries_with_bounded_submissions(mock_factory, tmp_path, monkeypatch):
+    mock = mock_factory(row_count=5)
+    monkeypatch.setattr(batch, "ThreadPoolExecutor", _TrackingExecutor)
+    queries_path = _queries_file(tmp_path / "queries.csv", 15)
+
+    result = run_batch(queries_path, output_path="batch.jsonl", state_path="state.db", target_url=mock.url, workers=WORKERS)
+
+    assert result == {"total": 16, "done": 15, "failed": 0}
+    assert _TrackingExecutor.peak <= WORKERS * IN_FLIGHT_PER_WORKER
+    records = list(iter_jsonl("batch.jsonl"))
+    assert len(records) == 15 and all(record["count"] == 5 for record in records)
+
+    # Drugi przebieg - wszystkie zapytania ukończone
+    rerun = run_batch(queries_path, output_path="batch.jsonl", state_path="state.db", target_url=mock.url, workers=WORKERS)
+    assert rerun == {"total": 16, "done": 0, "failed": 0}
+    assert mock.stats()["search"] == 15
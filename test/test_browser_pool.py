@@ -0,0 +1,100 @@
+import threading
+
+import pytest
+
+from handelsregister.browser_pool import BrowserPool
+from handelsregister.egress import EgressPool, Proxy
+
+
+class _FakeDriver:
+    """Zamiennik WebDrivera: zlicza wywołania; alive=False udaje martwą sesję przeglądarki."""
+
+    def __init__(self, proxy=None):
+        self.proxy = proxy
+        self.alive = True
+        self.quit_called = False
+        self.visited = []
+
+    def delete_all_cookies(self):
+        pass
+
+    def get(self, url):
+        self.visited.append(url)
+
+    def execute_script(self, script):
+        if not self.alive:
+            raise RuntimeError("invalid session id")
+        return 1
+
+    def quit(self):
+        self.quit_called = True
+
+
+@pytest.fixture
+def drivers():
+    return []
+
+
+@pytest.fixture
+def make_pool(drivers):
+    def _make(**kwargs) -> BrowserPool:
+        def _factory(**factory_kwargs):
+            driver = _FakeDriver(**factory_kwargs)
+            drivers.append(driver)
+            return driver
+
+        return BrowserPool("http://localhost/", driver_factory=_factory, **kwargs)
+
+    return _make
+
+
+def test_browser_is_reused_and_recycled_after_max_uses(make_pool, drivers):
+    pool = make_pool(size=1, max_uses=2)
+    with pool.lease() as first:
+        pass
+    with pool.lease() as second:
+        assert second is first
+    with pool.lease() as third:
+        assert third is not first
+
+    assert drivers[0].quit_called
+    assert pool.recycled == 1
+    assert drivers[0].visited == ["http://localhost/rp_web/welcome.xhtml"] * 2
+
+
+def test_crashed_browser_is_replaced(make_pool, drivers):
+    pool = make_pool(size=1)
+    with pytest.raises(RuntimeError):
+        with pool.lease() as browser:
+            browser.driver.alive = False
+            raise RuntimeError("chrome not reachable")
+
+    with pool.lease() as browser:
+        assert browser.driver is drivers[1]
+    pool.close()
+    assert drivers[1].quit_called
+
+
+def test_waiter_gets_replacement_when_browser_is_discarded(make_pool, drivers):
+    pool = make_pool(size=1, max_uses=1)
+    leased = []
+
+    def _waiter():
+        with pool.lease(timeout=5) as browser:
+            leased.append(browser)
+
+    with pool.lease():
+        thread = threading.Thread(target=_waiter)
+        thread.start()
+    thread.join(timeout=5)
+
+    assert len(leased) == 1 and leased[0].driver is drivers[1]
+
+
+def test_browsers_get_separate_exits(make_pool, drivers):
+    egress = EgressPool([Proxy("http://10.0.0.1:3128"), Proxy("socks5h://10.0.0.2:1080")])
+    pool = make_pool(size=2, egress=egress)
+    with pool.lease(), pool.lease():
+        pass
+
+    assert sorted(driver.proxy for driver in drivers) == ["http://10.0.0.1:3128", "socks5://10.0.0.2:1080"]
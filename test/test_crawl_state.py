@@ -0,0 +1,48 @@
+from handelsregister.crawl_state import CrawlState, query_key
+
+QUERY = {"search_type": "HRB", "search_number": "25386", "search_town": "alle"}
+
+
+def _page(row_numbers) -> list:
+    return [
+        {"row_number": row_number, "si_links": [{"id": f"link-{row_number}"}]}
+        for row_number in row_numbers
+    ]
+
+
+def test_resume_skips_completed_pages_and_downloads(tmp_path):
+    path = str(tmp_path / "state.db")
+    key = query_key(QUERY)
+    state = CrawlState(path)
+    state.add_queries([QUERY, QUERY])
+    state.start_query(key)
+    state.record_page(key, 1, _page(range(0, 3)))
+    state.finish_download(key, "link-0", 0, "plikiXML/a.xml")
+    state.finish_download(key, "link-1", 1, error="HTTP 440")
+    state.close()
+
+    # Przerwany przebieg: zapytanie running wraca do kolejki, strona 1 i pobranie link-0 są ukończone
+    state = CrawlState(path)
+    assert state.pending_queries() == [QUERY]
+    assert state.completed_pages(key) == {1}
+    assert state.is_download_done(key, "link-0")
+    assert not state.is_download_done(key, "link-1")
+    assert [row["row_number"] for row in state.query_rows(key)] == [0, 1, 2]
+
+    state.finish_query(key)
+    assert state.is_query_done(key)
+    assert state.pending_queries() == []
+    summary = state.summary()
+    assert summary["queries"] == {"done": 1}
+    assert summary["downloads"] == {"done": 1, "failed": 1, "pending": 1}
+    state.close()
+
+
+def test_failed_queries_are_retried_only_on_request(tmp_path):
+    state = CrawlState(str(tmp_path / "state.db"))
+    state.add_queries([QUERY])
+    state.finish_query(query_key(QUERY), error="timeout")
+
+    assert state.pending_queries(retry_failed=True) == [QUERY]
+    assert state.pending_queries(retry_failed=False) == []
+    state.close()
@@ -0,0 +1,62 @@
+import os
+import time
+
+from handelsregister.download_cache import DownloadCache, key_from_columns, key_from_filename
+
+COLUMNS = ["Beispiel GmbH", "Berlin", "Amtsgericht Berlin (Charlottenburg) HRB 12345 B", "aktuell"]
+
+
+def _document(tmp_path, name: str, body: bytes = b"<xml/>") -> str:
+    path = tmp_path / name
+    path.write_bytes(body)
+    return str(path)
+
+
+def test_key_from_columns_and_filename():
+    assert key_from_columns(COLUMNS) == ("berlin (charlottenburg)", "HRB", "12345B", "SI")
+    assert key_from_columns(["Amtsgericht Chemnitz HRB 25386"]) == key_from_filename("SN-Chemnitz_HRB_25386+SI-20251210175648.xml")
+    assert key_from_columns(["bez numeru"]) is None
+    assert key_from_columns(None) is None
+
+
+def test_store_lookup_and_materialize(tmp_path):
+    cache = DownloadCache(str(tmp_path / "cache"))
+    key = key_from_columns(COLUMNS)
+    path = _document(tmp_path, "BE-Charlottenburg_HRB_12345_B+SI-20251210175648.xml")
+
+    assert cache.lookup(key) is None
+    # Klucz z kolumn (spider, download_files) - nie z nazwy pliku, z której sąd wychodzi inaczej
+    cache.store(path, key=key)
+    entry = cache.lookup(key)
+
+    assert entry is not None and entry["size"] == 6
+    restored = cache.materialize(entry, str(tmp_path / "out"))
+    assert os.path.basename(restored) == os.path.basename(path)
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+    cache.close()
+
+
+def test_identical_content_is_stored_once(tmp_path):
+    cache = DownloadCache(str(tmp_path / "cache"))
+    first = cache.store(_document(tmp_path, "SN-Chemnitz_HRB_1+SI-20251210175648.xml"))
+    second = cache.store(_document(tmp_path, "SN-Chemnitz_HRB_2+SI-20251210175648.xml"))
+
+    assert first["sha256"] == second["sha256"]
+    assert cache.stats()["entries"] == 2
+    objects = [name for _, _, names in os.walk(cache.objects_dir) for name in names]
+    assert objects == [first["sha256"]]
+    cache.close()
+
+
+def test_expired_entries_are_misses_and_evicted(tmp_path):
+    cache = DownloadCache(str(tmp_path / "cache"), ttl=60)
+    key = key_from_columns(["Amtsgericht Chemnitz HRB 1"])
+    entry = cache.store(_document(tmp_path, "plik.xml"), key=key)
+    with cache.connection:
+        cache.connection.execute("UPDATE entries SET fetched_at = ?", (time.time() - 120,))
+
+    assert not cache.is_fresh(key)
+    assert cache.lookup(key) is None
+    assert cache.evict() == 1
+    assert not os.path.exists(cache.object_path(entry["sha256"]))
+    cache.close()
@@ -0,0 +1,122 @@
+import pytest
+import requests
+
+import download_files
+from download_files import SESSION_EXPIRED_STATUS, SessionRefresher, is_session_expired, search_and_download
+from handelsregister import engine
+from handelsregister.crawl_state import CrawlState
+from handelsregister.download_cache import DownloadCache
+
+OUTPUT_DIR = "plikiXML"
+
+
+def _ok(statuses) -> int:
+    return sum(1 for status in statuses if status["status"] == 200)
+
+
+@pytest.fixture
+def closed_refreshers(monkeypatch):
+    """Liczy SessionRefresher.close() - sesje refreshera muszą być zamykane także po błędzie."""
+    calls = []
+    close = SessionRefresher.close
+
+    def _close(self):
+        calls.append(self)
+        close(self)
+
+    monkeypatch.setattr(SessionRefresher, "close", _close)
+    return calls
+
+
+def test_downloads_all_documents(mock_factory):
+    mock = mock_factory(row_count=30)
+
+    statuses = search_and_download(mock.url, output_dir=OUTPUT_DIR, workers=4)
+
+    assert _ok(statuses) == 30
+    assert [status["row_number"] for status in statuses] == list(range(30))
+    assert mock.stats()["si"] == 30
+
+
+def test_session_expiry_refreshes_and_replays_only_page_one(mock_factory):
+    mock = mock_factory(row_count=150, expire_every=60)
+
+    statuses = search_and_download(mock.url, output_dir=OUTPUT_DIR, workers=4, synthesize=False)
+
+    stats = mock.stats()
+    assert _ok(statuses) == 150
+    assert stats["search"] > 1
+    # Stronicowanie tylko w pierwszym wyszukiwaniu - odnowienia syntetyzują requesty SI ze strony 1
+    assert stats["page"] == 1
+
+
+def test_paging_440_resumes_from_refreshed_search(mock_factory, monkeypatch, closed_refreshers, capsys):
+    mock = mock_factory(row_count=250)
+    iter_results_pages = engine.iter_results_pages
+
+    def _expire_after_first_page(*args, **kwargs):
+        for page_number, rows in iter_results_pages(*args, **kwargs):
+            yield page_number, rows
+            if page_number == 1:
+                for session in list(mock.sessions.values()):
+                    mock.expire(session)
+
+    monkeypatch.setattr(engine, "iter_results_pages", _expire_after_first_page)
+
+    statuses = search_and_download(mock.url, output_dir=OUTPUT_DIR, workers=4, synthesize=False)
+
+    assert _ok(statuses) == 250
+    assert sorted(status["row_number"] for status in statuses) == list(range(250))
+    assert len(closed_refreshers) == 1
+    assert "Stronicowanie przerwane przez 440" in capsys.readouterr().out
+
+
+def test_no_refresh_fails_fast_with_440(mock_factory):
+    mock = mock_factory(row_count=30, expire_every=5)
+
+    statuses = search_and_download(mock.url, output_dir=OUTPUT_DIR, workers=2, auto_refresh=False)
+
+    assert 0 < _ok(statuses) < 30
+    assert all(status["status"] in (200, SESSION_EXPIRED_STATUS) for status in statuses)
+    assert mock.stats()["search"] == 1
+
+
+def test_search_error_is_raised_and_recorded(mock_factory, closed_refreshers):
+    mock = mock_factory(row_count=10)
+    mock.stop()
+    state = CrawlState("state.db")
+
+    with pytest.raises(requests.RequestException):
+        search_and_download(mock.url, output_dir=OUTPUT_DIR, state=state)
+
+    assert state.summary()["queries"] == {"failed": 1}
+    assert len(closed_refreshers) == 1
+    state.close()
+
+
+def test_cached_and_completed_downloads_are_skipped(mock_factory):
+    mock = mock_factory(row_count=20)
+    cache = DownloadCache("cache")
+
+    search_and_download(mock.url, output_dir=OUTPUT_DIR, workers=2, cache=cache)
+    statuses = search_and_download(mock.url, output_dir=OUTPUT_DIR, workers=2, cache=cache)
+
+    assert _ok(statuses) == 20
+    assert all(status["cached"] for status in statuses)
+    assert mock.stats()["si"] == 20
+    cache.close()
+
+    state = CrawlState("state.db")
+    search_and_download(mock.url, output_dir=OUTPUT_DIR, workers=2, state=state)
+    assert search_and_download(mock.url, output_dir=OUTPUT_DIR, workers=2, state=state) == []
+    assert mock.stats()["si"] == 40
+    state.close()
+
+
+def test_is_session_expired():
+    response = requests.Response()
+    response.status_code = SESSION_EXPIRED_STATUS
+
+    assert is_session_expired(requests.HTTPError(response=response))
+    assert not is_session_expired(requests.ConnectionError())
+    assert download_files.DEFAULT_QUERY == SessionRefresher(None).query
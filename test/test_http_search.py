@@ -0,0 +1,79 @@
+import pytest
+import requests
+
+from handelsregister.engine import run_http_search
+from handelsregister.http_search import (
+    build_http_session,
+    collect_all_pages,
+    extract_paging_info,
+    parse_partial_response,
+    perform_http_search,
+)
+from handelsregister.utils import SESSION_COOKIES_FILE
+
+
+def _row_numbers(collected_links) -> list:
+    return [row["row_number"] for row in collected_links]
+
+
+def test_search_over_http_walks_all_pages(mock_factory):
+    mock = mock_factory(row_count=250)
+    pages = []
+
+    collected_links = run_http_search(
+        mock.url, on_page=lambda page_number, page_links: pages.append(page_number), synthesize=False
+    )
+
+    assert _row_numbers(collected_links) == list(range(250))
+    assert pages == [1, 2, 3]
+    assert mock.stats()["page"] == 2
+    # Cookies w formacie Selenium - download_files może pobierać bez przeglądarki
+    assert "JSESSIONID" in open(SESSION_COOKIES_FILE, encoding="utf-8").read()
+
+
+def test_synthesized_search_fetches_only_page_one(mock_factory):
+    mock = mock_factory(row_count=250)
+
+    collected_links = run_http_search(mock.url, synthesize=True)
+
+    assert _row_numbers(collected_links) == list(range(250))
+    assert mock.stats()["page"] == 0
+    assert collected_links[-1]["synthesized"]
+
+
+def test_skip_pages_are_not_requested(mock_factory):
+    mock = mock_factory(row_count=250)
+
+    collected_links = run_http_search(mock.url, skip_pages={1, 2}, synthesize=False)
+
+    assert _row_numbers(collected_links) == list(range(200, 250))
+    assert mock.stats()["page"] == 1
+
+
+def test_paging_on_expired_session_raises_440(mock_factory):
+    mock = mock_factory(row_count=250)
+    session = build_http_session()
+    response = perform_http_search(session, mock.url)
+    assert extract_paging_info(response.text) == {"row_count": 250, "rows": 100}
+
+    for session_data in list(mock.sessions.values()):
+        mock.expire(session_data)
+    with pytest.raises(requests.HTTPError) as error:
+        collect_all_pages(session, response)
+    assert error.value.response.status_code == 440
+    session.close()
+
+
+def test_search_errors_raise_only_on_request(mock_factory):
+    mock = mock_factory(row_count=10)
+    mock.stop()
+
+    assert run_http_search(mock.url) == []
+    with pytest.raises(requests.RequestException):
+        run_http_search(mock.url, raise_errors=True)
+
+
+def test_partial_response_without_table_update():
+    content = b"<?xml version='1.0'?><partial-response><changes></changes></partial-response>"
+    with pytest.raises(ValueError):
+        parse_partial_response(content)
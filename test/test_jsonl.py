@@ -0,0 +1,38 @@
+import json
+
+from handelsregister.jsonl import JsonlWriter, iter_jsonl, jsonl_to_legacy, load_index, read_record
+
+
+def test_indexed_records_are_readable_by_offset(tmp_path):
+    path = str(tmp_path / "items.jsonl")
+    with JsonlWriter(path, index=True, truncate=True) as writer:
+        writer.write_many([{"row_number": n, "firma": f"Beispiel {n} GmbH"} for n in range(5)])
+
+    index = load_index(path)
+    assert len(index) == 5
+    for key, (offset, length) in index.items():
+        assert str(read_record(path, offset, length)["row_number"]) == key
+
+
+def test_truncated_last_line_is_skipped(tmp_path):
+    path = tmp_path / "items.jsonl"
+    with JsonlWriter(str(path)) as writer:
+        writer.write({"row_number": 0})
+        writer.write({"row_number": 1})
+    # Awaria w trakcie zapisu - urwany ostatni rekord
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"row_number": 2, "si_li')
+
+    assert [record["row_number"] for record in iter_jsonl(str(path))] == [0, 1]
+
+
+def test_legacy_conversion(tmp_path):
+    path = str(tmp_path / "items.jsonl")
+    with JsonlWriter(path, truncate=True) as writer:
+        writer.write({"row_number": 0})
+    output = tmp_path / "items.json"
+
+    result = jsonl_to_legacy(path, str(output))
+
+    assert result == {"count": 1, "items": [{"row_number": 0}]}
+    assert json.loads(output.read_text(encoding="utf-8")) == result
@@ -0,0 +1,55 @@
+import urllib.request
+
+import pytest
+
+from handelsregister.metrics import MetricsRegistry, get_metrics, serve_prometheus
+from handelsregister.waits import StepTimer
+
+
+def test_counters_histograms_and_prometheus_format():
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    registry.inc("downloads_total", result=200)
+    registry.inc("downloads_total", 2, result=200)
+    registry.observe("download_seconds", 0.5)
+
+    text = registry.render_prometheus()
+
+    assert registry.value("downloads_total", result=200) == 3
+    assert 'handelsregister_downloads_total{result="200"} 3' in text
+    assert 'handelsregister_download_seconds_bucket{le="0.1"} 0' in text
+    assert 'handelsregister_download_seconds_bucket{le="+Inf"} 1' in text
+    assert registry.snapshot()["download_seconds_count"] == 1
+
+
+def test_span_counts_errors():
+    registry = MetricsRegistry()
+    with pytest.raises(ValueError):
+        with registry.span("search", backend="http"):
+            raise ValueError("brak ViewState")
+
+    assert registry.value("span_errors_total", span="search", backend="http") == 1
+    assert registry.snapshot()['span_seconds_count{backend="http",span="search"}'] == 1
+
+
+def test_step_timer_feeds_step_histogram():
+    timer = StepTimer("run_http_search")
+    with timer.step("suche"):
+        pass
+    timer.lap("wyniki")
+
+    assert set(timer.summary()) == {"suche", "wyniki", "total"}
+    assert get_metrics().snapshot()['step_seconds_count{flow="run_http_search",step="suche"}'] == 1
+
+
+def test_metrics_endpoint():
+    registry = MetricsRegistry()
+    registry.inc("rows_total", 5, backend="http")
+    server = serve_prometheus(0, registry, host="127.0.0.1")
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_address[1]}/metrics") as response:
+            body = response.read().decode("utf-8")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert 'handelsregister_rows_total{backend="http"} 5' in body
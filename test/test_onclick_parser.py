@@ -0,0 +1,39 @@
+from handelsregister.onclick_parser import SI_PROPERTY, parse_onclick, parse_si_request, submit_params
+from handelsregister.results_parser import parse_result_rows
+
+from conftest import results_table
+
+RESULTS_URL = "http://localhost/rp_web/sucheErgebnisse/welcome.xhtml?cid=3"
+
+
+def _onclick(index: int) -> str:
+    rows = parse_result_rows(results_table([index]))
+    return rows[0]["links"][0]["onclick"]
+
+
+def test_si_request_keeps_row_index_in_parameters():
+    request = parse_si_request(_onclick(7), RESULTS_URL + "#top")
+
+    link_id = "ergebnissForm:selectedSuchErgebnisFormTable:7:j_idt161:4:fade_"
+    assert request.is_si
+    assert request.form_name == "ergebnissForm"
+    assert request.url == RESULTS_URL
+    assert request.parameters == {link_id: link_id, "property": SI_PROPERTY}
+
+
+def test_memoized_template_is_reused_for_other_rows():
+    # Ten sam szablon dla różnych wierszy - parametry muszą mieć właściwy indeks, nie ten z cache
+    first = parse_onclick(_onclick(1))
+    second = parse_onclick(_onclick(42))
+
+    assert any(":1:" in key for key in first[2])
+    assert any(":42:" in key for key in second[2])
+    assert not any(":1:" in key for key in second[2])
+
+
+def test_non_si_and_non_primefaces_links():
+    navi = "PrimeFaces.addSubmitParam('naviForm',{'naviForm:normaleSucheLink':'naviForm:normaleSucheLink'}).submit('naviForm');"
+
+    assert parse_si_request(navi, RESULTS_URL) is None
+    assert submit_params(navi) == {"naviForm:normaleSucheLink": "naviForm:normaleSucheLink"}
+    assert parse_onclick("window.open('/x')") is None
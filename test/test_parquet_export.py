@@ -0,0 +1,44 @@
+import json
+import os
+from decimal import Decimal
+
+import pytest
+
+pq = pytest.importorskip("pyarrow.parquet")
+
+from handelsregister.jsonl import JsonlWriter
+from handelsregister.parquet_export import SCHEMA_FILE, export_parquet, normalize_record
+from handelsregister.si_parser import parse_si_file
+
+from test_si_parser import DOCUMENT, FILE_NAME
+
+
+def _record(tmp_path) -> dict:
+    path = tmp_path / FILE_NAME
+    path.write_text(DOCUMENT, encoding="utf-8")
+    return parse_si_file(str(path))
+
+
+def test_normalized_record_types(tmp_path):
+    row = normalize_record(_record(tmp_path))
+
+    assert row["capital_amount"] == Decimal("25000")
+    assert row["officers"][0]["birth_date"].isoformat() == "1980-01-02"
+    assert normalize_record({})["register_court"] == "unknown"
+
+
+def test_export_is_partitioned_by_register(tmp_path):
+    source = str(tmp_path / "si_records.jsonl")
+    with JsonlWriter(source, truncate=True) as writer:
+        writer.write(_record(tmp_path))
+        writer.write({"file_name": "zly.xml", "error": "not well-formed"})
+    root = str(tmp_path / "parquet")
+
+    result = export_parquet(source, root_path=root, batch_size=1, workers=1)
+
+    assert result == {"written": 1, "skipped": 1}
+    assert os.path.isdir(os.path.join(root, "register_type=HRB", "register_court=Chemnitz"))
+    table = pq.read_table(root, filters=[("register_type", "=", "HRB")])
+    assert table.column("company_name").to_pylist() == ["Beispiel GmbH"]
+    with open(os.path.join(root, SCHEMA_FILE), encoding="utf-8") as f:
+        assert json.load(f)["partition_cols"] == ["register_type", "register_court"]
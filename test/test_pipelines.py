@@ -0,0 +1,74 @@
+import logging
+import sqlite3
+
+import pytest
+from scrapy.exceptions import DropItem
+
+from handelsregister.items import DocumentItem, HandelsItem
+from handelsregister.pipelines import (
+    BatchedStoragePipeline,
+    DeduplicationPipeline,
+    SQLiteBackend,
+    StorageBackend,
+    ValidationPipeline,
+)
+
+QUERY = {"search_type": "HRB", "search_number": "25386", "search_town": "alle"}
+
+
+class _Spider:
+    logger = logging.getLogger("test")
+
+
+def _row(row_number: int, parameters=None) -> HandelsItem:
+    link = {"id": f"link-{row_number}", "request": {"parameters": parameters if parameters is not None else {"property": "SI"}}}
+    return HandelsItem(row_number=row_number, links=[link], columns=["Beispiel GmbH"], results_url="http://x", query=QUERY)
+
+
+def _document(row_number: int, status: int = 200) -> DocumentItem:
+    return DocumentItem(
+        row_number=row_number, link_id=f"link-{row_number}", document_type="SI", file_name=f"{row_number}.xml",
+        file_path=f"plikiXML/{row_number}.xml", size=100, status=status, downloaded_at="2025-12-10T17:56:48",
+    )
+
+
+def test_storage_backend_is_abstract():
+    with pytest.raises(TypeError):
+        StorageBackend()
+
+    class Incomplete(StorageBackend):
+        def open(self):
+            pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_validation_and_deduplication():
+    validation = ValidationPipeline()
+    deduplication = DeduplicationPipeline()
+
+    for item in (_row(-1), _row(1, parameters={}), _document(1, status=440)):
+        with pytest.raises(DropItem):
+            validation.process_item(item, _Spider())
+    assert deduplication.process_item(_row(1), _Spider())["row_number"] == 1
+    with pytest.raises(DropItem):
+        deduplication.process_item(_row(1), _Spider())
+
+
+def test_items_are_written_in_batches(tmp_path):
+    path = str(tmp_path / "handelsregister.db")
+    pipeline = BatchedStoragePipeline(SQLiteBackend(path), batch_size=3)
+    pipeline.open_spider(_Spider())
+    for row_number in range(4):
+        pipeline.process_item(_row(row_number), _Spider())
+    # Pierwsza partia (3) zapisana w trakcie, reszta przy zamknięciu
+    assert pipeline.stored == 3
+    pipeline.process_item(_document(0), _Spider())
+    pipeline.process_item(_row(0), _Spider())
+    pipeline.close_spider(_Spider())
+
+    connection = sqlite3.connect(path)
+    assert connection.execute("SELECT COUNT(*) FROM result_rows").fetchone()[0] == 4
+    assert connection.execute("SELECT COUNT(*) FROM documents").fetchone()[0] == 1
+    connection.close()
@@ -0,0 +1,37 @@
+import pytest
+
+from handelsregister.results_parser import parse_result_rows, parse_results_files
+
+from conftest import results_table
+
+
+@pytest.mark.parametrize("use_lxml", [True, False])
+def test_rows_with_columns_and_links(use_lxml):
+    rows = parse_result_rows(results_table([0, 1, 2]), use_lxml=use_lxml)
+
+    assert [row["index"] for row in rows] == [0, 1, 2]
+    assert rows[1]["columns"][:3] == ["Beispiel 1 GmbH", "Chemnitz", "Amtsgericht Chemnitz HRB 25387"]
+    assert rows[1]["links"][0]["id"] == "ergebnissForm:selectedSuchErgebnisFormTable:1:j_idt161:4:fade_"
+    assert "Global.Dokumentart.SI" in rows[1]["links"][0]["onclick"]
+
+
+def test_lxml_and_stdlib_paths_agree():
+    html = results_table(range(20))
+    assert parse_result_rows(html, use_lxml=True) == parse_result_rows(html, use_lxml=False)
+
+
+def test_missing_table_gives_no_rows():
+    assert parse_result_rows("<html><body><p>Keine Treffer</p></body></html>") == []
+
+
+def test_parse_saved_results_files(tmp_path):
+    paths = []
+    for page in range(3):
+        path = tmp_path / f"page{page}.html"
+        path.write_text(results_table(range(page * 10, page * 10 + 10)), encoding="utf-8")
+        paths.append(str(path))
+
+    results = parse_results_files(paths, "http://localhost/rp_web/sucheErgebnisse/welcome.xhtml?cid=1", workers=2)
+
+    assert [len(results[path]) for path in paths] == [10, 10, 10]
+    assert results[paths[2]][0]["row_number"] == 20
@@ -0,0 +1,61 @@
+import pytest
+
+from handelsregister.session_pool import SessionPool
+
+
+@pytest.fixture
+def pool(mock_server):
+    pool = SessionPool(mock_server.url, size=1, sessions_dir="sessions")
+    yield pool
+    pool.close()
+
+
+def _expire_all(mock):
+    for session in list(mock.sessions.values()):
+        mock.expire(session)
+
+
+def test_sessions_have_independent_conversations(mock_server):
+    pool = SessionPool(mock_server.url, size=2, sessions_dir="sessions")
+    with pool.lease() as first, pool.lease() as second:
+        first.search()
+        second.search()
+        assert first.session.cookies.get("JSESSIONID") != second.session.cookies.get("JSESSIONID")
+        assert first.cookies_file != second.cookies_file
+    assert mock_server.stats()["sessions"] == 2
+    pool.close()
+
+
+def test_session_is_replaced_after_exception(pool):
+    with pytest.raises(RuntimeError):
+        with pool.lease() as jsf_session:
+            first_id = jsf_session.session_id
+            jsf_session.search()
+            raise RuntimeError("błąd w bloku lease")
+
+    with pool.lease() as jsf_session:
+        assert jsf_session.session_id != first_id
+
+
+def test_session_is_replaced_after_440(pool, mock_server):
+    with pool.lease() as jsf_session:
+        first_id = jsf_session.session_id
+        collected_links = jsf_session.search()
+        assert len(collected_links) == 30 and jsf_session.healthy
+        _expire_all(mock_server)
+        assert jsf_session.session.get(jsf_session.results_url, allow_redirects=False).status_code == 440
+        assert not jsf_session.healthy
+
+    with pool.lease() as jsf_session:
+        assert jsf_session.session_id != first_id
+        assert jsf_session.healthy
+
+
+def test_health_check_replaces_dead_sessions(pool, mock_server):
+    with pool.lease() as jsf_session:
+        jsf_session.search()
+        first_id = jsf_session.session_id
+    _expire_all(mock_server)
+
+    assert pool.health_check() == {first_id: False}
+    assert [state["session_id"] for state in pool.stats()] != [first_id]
@@ -0,0 +1,49 @@
+import time
+
+import pytest
+
+from download_files import download_from_snapshot
+from handelsregister.download_cache import DownloadCache
+from handelsregister.session_pool import SessionPool
+from handelsregister.session_snapshot import SessionSnapshot, warm_start
+
+SNAPSHOT_PATH = "sessions/session_snapshot.json"
+
+
+@pytest.fixture
+def snapshot(mock_server) -> SessionSnapshot:
+    pool = SessionPool(mock_server.url, size=1, sessions_dir="sessions")
+    with pool.lease() as jsf_session:
+        collected_links = jsf_session.search()
+        snapshot = jsf_session.snapshot(collected_links)
+    snapshot.save(SNAPSHOT_PATH)
+    pool.close()
+    return snapshot
+
+
+def test_snapshot_is_compact_and_round_trips(snapshot):
+    loaded = SessionSnapshot.load(SNAPSHOT_PATH)
+
+    # Wiersze 0..N-1 zgodne z szablonem - zapisany szablon zamiast listy requestów
+    assert loaded.template is not None and loaded.rows == []
+    assert loaded.request_count() == 30
+    assert loaded.si_requests() == snapshot.si_requests()
+    assert loaded.si_requests()[3]["cache_key"] == ("chemnitz", "HRB", "25389", "SI")
+
+
+def test_download_from_snapshot_without_search(snapshot, mock_server):
+    statuses = download_from_snapshot(SNAPSHOT_PATH, output_dir="plikiXML", workers=2, cache=DownloadCache("cache"))
+
+    assert sum(1 for status in statuses if status["status"] == 200) == 30
+    assert mock_server.stats()["search"] == 1
+
+
+def test_expired_snapshot_is_rejected(snapshot, mock_server):
+    for session in list(mock_server.sessions.values()):
+        mock_server.expire(session)
+    assert warm_start(SNAPSHOT_PATH) is None
+
+    snapshot.last_used_at = time.time() - snapshot.idle_ttl - 1
+    snapshot.save(SNAPSHOT_PATH)
+    assert warm_start(SNAPSHOT_PATH, probe=False) is None
+    assert SessionSnapshot.load("brak.json") is None
@@ -0,0 +1,78 @@
+from handelsregister.si_parser import officer_records, parse_document_filename, parse_si_directory, parse_si_file
+from handelsregister.jsonl import iter_jsonl
+
+FILE_NAME = "SN-Chemnitz_HRB_25386+SI-20251210175648.xml"
+# Skrócony dokument XJustiz (SI) - etykiety kodów w komentarzach, część podwójnie zakodowana jak na serwerze
+DOCUMENT = """<?xml version="1.0" encoding="UTF-8"?>
+<tns:nachricht.reg.0400003 xmlns:tns="http://www.xjustiz.de">
+  <tns:nachrichtenkopf><tns:erstellungszeitpunkt>2025-12-10T17:56:48</tns:erstellungszeitpunkt></tns:nachrichtenkopf>
+  <tns:grunddaten><tns:verfahrensdaten>
+    <tns:instanzdaten><tns:auswahl_instanzbehoerde><tns:gericht><!--Amtsgericht Chemnitz--><code>U1206</code></tns:gericht></tns:auswahl_instanzbehoerde>
+      <tns:aktenzeichen><tns:aktenzeichen.strukturiert><tns:register><code>HRB</code></tns:register><tns:laufendeNummer>25386</tns:laufendeNummer></tns:aktenzeichen.strukturiert></tns:aktenzeichen>
+    </tns:instanzdaten>
+    <tns:beteiligung>
+      <tns:rolle><tns:rollenbezeichnung><!--RechtstrÃ¤ger--><code>287</code></tns:rollenbezeichnung></tns:rolle>
+      <tns:beteiligter><tns:auswahl_beteiligter><tns:organisation>
+        <tns:bezeichnung><tns:bezeichnung.aktuell>Beispiel GmbH</tns:bezeichnung.aktuell></tns:bezeichnung>
+        <tns:sitz><tns:ort>Chemnitz</tns:ort></tns:sitz>
+      </tns:organisation></tns:auswahl_beteiligter></tns:beteiligter>
+    </tns:beteiligung>
+    <tns:beteiligung>
+      <tns:rolle><tns:rollenbezeichnung><!--GeschÃ¤ftsfÃ¼hrer--><code>086</code></tns:rollenbezeichnung></tns:rolle>
+      <tns:beteiligter><tns:auswahl_beteiligter><tns:natuerlichePerson>
+        <tns:vollerName><tns:vorname>Anna</tns:vorname><tns:nachname>Muster</tns:nachname></tns:vollerName>
+        <tns:geburt><tns:geburtsdatum>1980-01-02</tns:geburtsdatum></tns:geburt>
+        <tns:anschrift><tns:ort>Leipzig</tns:ort></tns:anschrift>
+      </tns:natuerlichePerson></tns:auswahl_beteiligter></tns:beteiligter>
+    </tns:beteiligung>
+  </tns:verfahrensdaten></tns:grunddaten>
+  <tns:fachdatenRegister><tns:basisdatenRegister>
+    <tns:rechtstraeger><tns:angabenZurRechtsform><tns:rechtsform><!--Gesellschaft mit beschrÃ¤nkter Haftung--><code>GmbH</code></tns:rechtsform></tns:angabenZurRechtsform></tns:rechtstraeger>
+    <tns:gegenstand>Handel mit Waren aller Art</tns:gegenstand>
+  </tns:basisdatenRegister>
+  <tns:zusatzGmbH><tns:stammkapital><tns:zahl>25000.00</tns:zahl><tns:waehrung><code>EUR</code></tns:waehrung></tns:stammkapital></tns:zusatzGmbH>
+  </tns:fachdatenRegister>
+</tns:nachricht.reg.0400003>
+"""
+
+
+def _write(directory, name: str = FILE_NAME, content: str = DOCUMENT) -> str:
+    path = directory / name
+    path.write_text(content, encoding="utf-8")
+    return str(path)
+
+
+def test_company_record_from_document(tmp_path):
+    record = parse_si_file(_write(tmp_path))
+
+    assert record["register_state"] == "SN" and record["register_court"] == "Chemnitz"
+    assert record["court_code"] == "U1206" and record["court_name"] == "Amtsgericht Chemnitz"
+    assert record["register_type"] == "HRB" and record["register_number"] == "25386"
+    assert record["company_name"] == "Beispiel GmbH" and record["seat"] == "Chemnitz"
+    assert record["legal_form"] == "Gesellschaft mit beschränkter Haftung"
+    assert record["purpose"] == "Handel mit Waren aller Art"
+    assert (record["capital_amount"], record["capital_currency"]) == (25000.0, "EUR")
+
+
+def test_officers_exclude_company_role(tmp_path):
+    record = parse_si_file(_write(tmp_path))
+
+    assert record["officers_count"] == 1
+    officer = officer_records(record)[0]
+    assert officer["role"] == "Geschäftsführer"
+    assert officer["name"] == "Anna Muster" and officer["is_person"]
+    assert officer["birth_date"] == "1980-01-02" and officer["city"] == "Leipzig"
+    assert officer["register_number"] == "25386"
+
+
+def test_directory_with_broken_file(tmp_path):
+    directory = tmp_path / "plikiXML"
+    directory.mkdir()
+    _write(directory)
+    _write(directory, "SN-Chemnitz_HRB_1+SI-20251210175648.xml", "<nie-xml")
+
+    result = parse_si_directory(str(directory), output_path="records.jsonl", workers=1)
+
+    assert result == {"parsed": 1, "failed": 1}
+    assert [record["file_name"] for record in iter_jsonl("records.jsonl")] == [FILE_NAME]
+    assert parse_document_filename("dowolny.xml") is None
@@ -0,0 +1,36 @@
+from handelsregister.results_parser import parse_result_rows
+from handelsregister.si_template import SiRequestTemplate, learn_verified
+from handelsregister.utils import collect_links_from_rows
+
+from conftest import results_table
+
+RESULTS_URL = "http://localhost/rp_web/sucheErgebnisse/welcome.xhtml?cid=5"
+
+
+def _collected_links(indexes) -> list:
+    return collect_links_from_rows(parse_result_rows(results_table(indexes)), RESULTS_URL)
+
+
+def test_synthesized_rows_match_parsed_rows():
+    collected_links = _collected_links(range(10))
+    template = learn_verified(collected_links)
+
+    assert template is not None
+    # Wiersze spoza próbki (np. ze strony 3) - wygenerowane requesty jak sparsowane z tabeli
+    for row_data in _collected_links([250, 251]):
+        assert template.matches(row_data)
+    synthesized = template.synthesize(10, 13)
+    assert [row["row_number"] for row in synthesized] == [10, 11, 12]
+    assert all(row["synthesized"] for row in synthesized)
+
+
+def test_state_round_trip():
+    template = SiRequestTemplate.learn(_collected_links([0])[0])
+    restored = SiRequestTemplate.from_state(template.to_state())
+
+    assert restored.row_data(99) == template.row_data(99)
+
+
+def test_single_row_is_not_verified():
+    assert learn_verified(_collected_links([0])) is None
+    assert learn_verified([]) is None
@@ -0,0 +1,111 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+from scrapy import Request
+from scrapy.http import FormRequest, HtmlResponse, TextResponse
+
+from handelsregister.items import DocumentItem, HandelsItem
+from handelsregister.metrics import get_metrics
+from handelsregister.results_parser import parse_result_rows
+from handelsregister.spiders.handels_spider import HandelsSpider
+
+from conftest import REPO_ROOT, results_table
+
+RESULTS_URL = "http://localhost/rp_web/sucheErgebnisse/welcome.xhtml?cid=1"
+PAGING = {"row_count": 250, "rows": 100}
+DOCUMENT = b"<?xml version='1.0' encoding='UTF-8'?><tns:nachricht.reg.0400003 xmlns:tns='http://www.xjustiz.de'/>"
+
+
+@pytest.fixture
+def spider():
+    spider = HandelsSpider(target_url="http://localhost/", download_dir="plikiXML", mode="scrapy")
+    yield spider
+    spider.writer.close()
+    spider.cache.close()
+
+
+def _response(status=200, body=b"", headers=None, cls=TextResponse) -> TextResponse:
+    return cls(RESULTS_URL, status=status, body=body, headers=headers or {}, request=Request(RESULTS_URL))
+
+
+def _document_response(body=DOCUMENT, **headers) -> TextResponse:
+    return _response(body=body, headers=headers)
+
+
+def test_paging_and_si_requests_let_440_through(spider):
+    rows = parse_result_rows(results_table([0]))
+    requests = list(spider._handle_rows(rows, RESULTS_URL, RESULTS_URL, {"javax.faces.ViewState": "1"}))
+    page_request = spider._page_request(RESULTS_URL, RESULTS_URL, {}, PAGING, 100)
+
+    si_request = next(r for r in requests if isinstance(r, FormRequest))
+    assert si_request.meta["handle_httpstatus_list"] == [440]
+    assert si_request.cb_kwargs["cache_key"] == ("chemnitz", "HRB", "25386", "SI")
+    assert page_request.meta["handle_httpstatus_list"] == [440]
+    assert "handle_httpstatus_list" not in HandelsSpider.__dict__
+
+
+def test_expired_paging_response_stops_paging(spider):
+    response = _response(status=440, body=b"<html>Sitzung abgelaufen</html>", cls=HtmlResponse)
+
+    results = list(spider.parse_results_page(response, RESULTS_URL, RESULTS_URL, {}, PAGING, 100))
+
+    assert results == []
+    assert get_metrics().value("session_expired_total") == 1
+
+
+def test_document_with_attachment_is_written_and_cached(spider):
+    name = "SN-Chemnitz_HRB_25386+SI-20251210175648.xml"
+    key = ("chemnitz", "HRB", "25386", "SI")
+    response = _document_response(**{"Content-Disposition": f'attachment; filename="{name}"'})
+
+    items = list(spider.parse_document(response, 0, "link-0", cache_key=key))
+
+    assert isinstance(items[0], DocumentItem)
+    assert items[0]["file_name"] == name
+    assert open(os.path.join("plikiXML", name), "rb").read() == DOCUMENT
+    # Ten sam wiersz drugi raz - z cache, bez POST-a SI
+    rows = parse_result_rows(results_table([0]))
+    results = list(spider._handle_rows(rows, RESULTS_URL, RESULTS_URL, {}))
+    assert [type(result) for result in results] == [HandelsItem, DocumentItem]
+
+
+@pytest.mark.parametrize("body, content_type", [
+    (b"<html><body>Fehler</body></html>", "text/html;charset=UTF-8"),
+    (b"<?xml version='1.0'?><partial-response id='j_id1'><changes/></partial-response>", "text/xml"),
+])
+def test_response_without_document_is_not_written(spider, body, content_type):
+    response = _document_response(body=body, **{"Content-Type": content_type})
+
+    assert list(spider.parse_document(response, 3, "link-3")) == []
+    assert not os.path.exists("plikiXML")
+    assert get_metrics().value("downloads_total", result="invalid") == 1
+    assert spider.cache.stats()["entries"] == 0
+
+
+def test_plain_xml_without_content_disposition_is_written(spider):
+    response = _document_response(**{"Content-Type": "application/xml"})
+
+    items = list(spider.parse_document(response, 4, "link-4"))
+
+    assert items[0]["file_name"] == "row_4+SI.xml"
+
+
+def test_crawl_against_mock_server(mock_factory, tmp_path):
+    mock = mock_factory(row_count=150)
+    # Reaktora Twisted nie da się uruchomić ponownie w tym samym procesie - crawl w osobnym procesie
+    output = tmp_path / "spider.json"
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT, DOWNLOAD_CACHE_DIR="")
+    subprocess.run(
+        [sys.executable, "-m", "bench.spider_runner", mock.url, "plikiXML", str(output)],
+        check=True,
+        env=env,
+        timeout=120,
+    )
+
+    result = json.loads(output.read_text(encoding="utf-8"))
+    assert result["rows"] == 150
+    assert result["docs"] == 150
+    assert mock.stats()["page"] == 1
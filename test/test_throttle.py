@@ -0,0 +1,81 @@
+import requests
+
+from handelsregister.throttle import (
+    BACKOFF_MAX,
+    AdaptiveRateLimiter,
+    ThrottledAdapter,
+    backoff_delay,
+    get_limiter,
+    mount_throttled,
+    parse_retry_after,
+    session_limiters,
+    session_started,
+)
+
+
+def test_ok_responses_raise_rate_and_throttling_halves_it():
+    limiter = AdaptiveRateLimiter(rate=2.0, max_rate=8.0)
+    limiter.observe(200, 0.1)
+    assert limiter.rate > 2.0
+
+    rate = limiter.rate
+    limiter.observe(429, 0.1, retry_after=1.0)
+    assert limiter.rate == rate / 2
+    assert limiter.blocked_until > limiter.blocked_since
+    assert limiter.stats()["throttled"] == 1
+
+
+def test_session_expiry_counts_once_per_generation():
+    limiter = AdaptiveRateLimiter(rate=4.0)
+    limiter.observe(440, 0.1)
+    rate = limiter.rate
+    # Pozostałe 440 tej samej sesji (żądania w locie) nie zwalniają dalej
+    limiter.observe(440, 0.1)
+    limiter.observe(440, 0.1)
+    assert limiter.rate == rate
+    assert limiter.stats()["expired_ignored"] == 2
+
+    limiter.session_started()
+    limiter.observe(440, 0.1)
+    assert limiter.rate == rate / 2
+
+
+def test_backoff_is_capped_per_failure_series():
+    limiter = AdaptiveRateLimiter()
+    for _ in range(20):
+        limiter.observe(503, 0.1)
+    assert limiter.blocked_until - limiter.blocked_since <= BACKOFF_MAX
+    assert backoff_delay(0) == 0.0
+    assert 0.0 <= backoff_delay(30) <= BACKOFF_MAX
+    assert parse_retry_after("5") == 5.0
+    assert parse_retry_after("Wed, 21 Oct 2025 07:28:00 GMT") is None
+
+
+def test_session_started_bumps_limiters_mounted_in_session():
+    own = AdaptiveRateLimiter()
+    session = mount_throttled(requests.Session(), own)
+    generation = get_limiter().session_generation
+
+    session_started(session)
+
+    assert own.session_generation == 1
+    assert get_limiter().session_generation == generation
+    # Sesja bez ThrottledAdapter - domyślny limiter procesu
+    session_started(requests.Session())
+    assert get_limiter().session_generation == generation + 1
+
+
+def test_proxy_limiter_is_chained_with_shared_limiter(mock_server):
+    shared = AdaptiveRateLimiter()
+    proxy_limiter = AdaptiveRateLimiter()
+    session = mount_throttled(requests.Session(), shared)
+    adapter = session.get_adapter(mock_server.url)
+    adapter.proxy_limiter = proxy_limiter
+
+    assert isinstance(adapter, ThrottledAdapter)
+    assert session_limiters(session) == [proxy_limiter, shared]
+    session.get(mock_server.url + "rp_web/welcome.xhtml").raise_for_status()
+    # Token pobrany i odpowiedź zaraportowana w obu limiterach
+    assert proxy_limiter.stats()["requests"] == shared.stats()["requests"] == 1
+    assert proxy_limiter.stats()["ok"] == shared.stats()["ok"] == 1
+    session.close()